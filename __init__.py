@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 import logging
 
+from odoo.tools import config
+
 from . import models
 from . import controllers
 from . import services
 from . import wizards
+from .services import metrics
 
 _logger = logging.getLogger(__name__)
 
+# Métricas por instancia: otra instancia en la misma máquina usa otro directorio
+metrics.set_namespace(config.get("data_dir"), config.get("http_port"))
+
 
 def _create_default_data(env):
     """
@@ -27,6 +27,8 @@
         "views/ai_watchdog_views.xml",
         "views/ai_notification_views.xml",
         "views/ai_pending_action_views.xml",
+        "views/ai_response_cache_views.xml",
+        "views/ai_request_trace_views.xml",
         "views/installation_wizard_views.xml",
         # 4. Menús (deben cargarse después de las acciones y vistas)
         "views/menu.xml",
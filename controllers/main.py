@@ -3,28 +3,125 @@
 Controller simplificado para el Asistente IA
 """
 
+import hmac
 import json
 import logging
 
-from odoo import http, fields
+from odoo import api, http, fields
 from odoo.http import request, Response
 
 from ..services import AgentCore, get_minimal_context, OllamaService
-from ..services.agent_core import parse_create_product_prompt, parse_inventory_prompt
-from ..services.sales_purchase_tools import (
-    parse_purchase_orders_prompt,
-    parse_sale_orders_prompt,
-)
-from ..services.rag_service import parse_docs_prompt, parse_mail_prompt
+from ..services import intent_router, metrics, tracing
+from ..services.agent_core import PARSE_STATS
+from ..services.circuit_breaker import breaker_stats
+from ..services.http_pool import pool_stats
+from ..services.job_executor import QUEUE_METRICS, executor_stats
+from ..services.llm_scheduler import scheduler_stats
+from ..services.load_balancer import nodes_stats
+from ..services.response_cache import CACHE_STATS
+from ..services.semantic_cache import semantic_cache_stats
+from ..services.semantic_router import semantic_router_stats
+from ..services.single_flight import single_flight_stats
 
 _logger = logging.getLogger(__name__)
 
+# La auto-aprobación por palabras clave es arriesgada.
+# Se deshabilita para favorcer el uso de botones en la UI o comandos explícitos.
+AUTO_APPROVAL = False
+
 
 class AiController(http.Controller):
 
     @http.route("/ai_assistant/ask", type="http", auth="user", cors="*", csrf=False)
     def ask(self, **kwargs):
         """Endpoint principal para consultas al asistente."""
+        data, error_response = self._read_request(kwargs)
+        if error_response is not None:
+            return error_response
+        prompt, model = data["prompt"], data["model"]
+
+        # Procesar con AgentCore
+        env = request.env
+        session = None
+        trace = tracing.start_trace("ask")
+        try:
+            session = self._open_turn(env, prompt, model)
+            agent = AgentCore(request.env)
+
+            with tracing.span("fast_path"):
+                fast_response = self._fast_path_response(env, session, agent, prompt, model)
+            if fast_response is not None:
+                self._record_trace(env, trace, session, model, "fast_path")
+                return fast_response
+
+            if data["async"]:
+                # El turno se procesa en segundo plano; la respuesta llega
+                # por el canal de bus de ai.assistant.message
+                return self._enqueue_turn(env, trace, session, data)
+
+            with tracing.span("context"):
+                context = get_minimal_context(request.env, prompt)
+            history = session._load_history()
+
+            # Procesar
+            result = agent.process(
+                prompt,
+                context,
+                model=model,
+                history=history,
+                use_cache=data["use_cache"],
+                node_url=session.ollama_node_url,
+            )
+            self._save_agent_result(env, session, agent, result)
+
+            # Añadir info del modelo usado para el frontend
+            result["model_used"] = model or "default"
+            self._record_trace(env, trace, session, model, "llm", result)
+
+            return Response(json.dumps(result), content_type="application/json")
+
+        except Exception as e:
+            _logger.error("Error en AgentCore: %s", str(e))
+            self._record_trace(env, trace, session, model, "error", {"error": str(e)})
+            return Response(
+                json.dumps({"error": str(e)}),
+                status=500,
+                content_type="application/json",
+            )
+
+    def _enqueue_turn(self, env, trace, session, data):
+        """Crea el mensaje pendiente, lo encola y responde 202 con su id."""
+        model = data["model"]
+        message = env["ai.assistant.message"].create(
+            {  # type: ignore
+                "session_id": session.id,
+                "role": "assistant",
+                "content": "<p><i>Procesando consulta...</i></p>",
+                "state": "pending",
+                "raw_prompt": data["prompt"],
+                "ollama_model": model,
+                "use_cache": data["use_cache"],
+                "expert_name": "Assistant",
+            }
+        )
+        message._enqueue()
+        self._record_trace(env, trace, session, model, "queued")
+        return Response(
+            json.dumps({
+                "status": "pending",
+                "message_id": message.id,
+                "session_id": session.id,
+                "model_used": model or "default",
+            }),
+            status=202,
+            content_type="application/json",
+        )
+
+    def _read_request(self, kwargs):
+        """
+        Extrae prompt, modelo y opciones del body JSON o de los parámetros URL.
+        Returns: (data, error_response)
+        """
         try:
             # Soporte para JSON body o parámetros URL
             if request.httprequest.data:
@@ -36,27 +133,35 @@ class AiController(http.Controller):
             model = data.get("model", "").strip()  # Modelo del frontend
 
             if not prompt:
-                return Response(
+                return None, Response(
                     json.dumps({"error": "Prompt vacío"}),
                     status=400,
                     content_type="application/json",
                 )
 
             _logger.info("AI Request: prompt='%s', model='%s'", prompt[:50], model)
+            return {
+                "prompt": prompt,
+                "model": model,
+                # Permite saltarse la caché de respuestas en una petición concreta
+                "use_cache": data.get("use_cache", True) not in (False, "0", "false"),
+                # Con "async": true, /ask responde al instante (202) y procesa el
+                # turno en segundo plano; sin él mantiene la respuesta síncrona
+                "async": data.get("async", False) in (True, "1", "true"),
+            }, None
 
         except Exception as e:
             _logger.error("Error parseando request: %s", str(e))
-            return Response(
+            return None, Response(
                 json.dumps({"error": "Request inválido"}),
                 status=400,
                 content_type="application/json",
             )
 
-        # Procesar con AgentCore
-        try:
-            env = request.env
-
-            # 1. Buscar o crear sesión (server-side safety)
+    def _open_turn(self, env, prompt, model):
+        """Busca o crea la sesión activa y guarda el mensaje del usuario."""
+        # 1. Buscar o crear sesión (server-side safety)
+        with tracing.span("session"):
             session = env["ai.assistant.session"].search(
                 [("user_id", "=", env.user.id), ("active", "=", True)],
                 limit=1,
@@ -72,7 +177,8 @@ class AiController(http.Controller):
                     }
                 )
 
-            # 2. Guardar mensaje del usuario (PERSISTENCIA IMMEDIATA)
+        # 2. Guardar mensaje del usuario (PERSISTENCIA IMMEDIATA)
+        with tracing.span("message_write"):
             env["ai.assistant.message"].create(
                 {  # type: ignore
                     "session_id": session.id,
@@ -81,453 +187,276 @@ class AiController(http.Controller):
                     "state": "done",
                 }
             )
-            agent = AgentCore(request.env)
-            if model:
-                ollama = OllamaService(request.env)
-                ollama.model = model
-
-            prompt_lower = (prompt or "").lower()
-            
-            # La auto-aprobación por palabras clave es arriesgada. 
-            # Se deshabilita para favorcer el uso de botones en la UI o comandos explícitos.
-            auto_approval = False
-
-            pending_msg = env["ai.assistant.message"].search(
-                [
-                    ("session_id", "=", session.id),
-                    ("role", "=", "assistant"),
-                    ("pending_action", "!=", False),
-                ],
-                order="create_date desc",
-                limit=1,
-            )
-
-            if pending_msg and auto_approval:
-                try:
-                    action_data = json.loads(pending_msg.pending_action)
-                    exec_result = agent.execute_approved_action(action_data)
-                    response_content = (
-                        exec_result.get("response")
-                        or exec_result.get("message")
-                        or "Acción ejecutada"
-                    )
-                    if exec_result.get("error"):
-                        response_content = f"❌ {exec_result.get('error')}"
-                    pending_msg.write({"pending_action": False})
-                    env["ai.assistant.message"].create(
-                        {  # type: ignore
-                            "session_id": session.id,
-                            "role": "assistant",
-                            "content": response_content.replace("\n", "<br>"),
-                            "state": "done",
-                            "expert_name": pending_msg.expert_name or "Assistant",
-                        }
-                    )
-                    result = {
-                        "response": response_content,
-                        "expert_name": pending_msg.expert_name or "Assistant",
-                        "model_used": model or "default",
-                    }
-                    return Response(json.dumps(result), content_type="application/json")
-                except Exception as e:
-                    _logger.error("Error ejecutando aprobación directa: %s", str(e))
-
-            # 3. Llamar al Agente con HISTORIAL
-
-            inventory_action = parse_inventory_prompt(prompt)
-            if inventory_action:
-                response_content = "[search_products] Preparando consulta..."
-                action_json = json.dumps(inventory_action)
-                message = env["ai.assistant.message"].create(
-                    {  # type: ignore
-                        "session_id": session.id,
-                        "role": "assistant",
-                        "content": response_content.replace("\n", "<br>"),
-                        "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "Assistant",
-                    }
+        return session
+
+    def _fast_path_response(self, env, session, agent, prompt, model):
+        """
+        Rutas deterministas (sin LLM). Devuelve la Response ya construida o
+        None si la consulta debe pasar por el modelo.
+        """
+        auto_approval = AUTO_APPROVAL
+
+        pending_msg = env["ai.assistant.message"].search(
+            [
+                ("session_id", "=", session.id),
+                ("role", "=", "assistant"),
+                ("pending_action", "!=", False),
+            ],
+            order="create_date desc",
+            limit=1,
+        )
+
+        if pending_msg and auto_approval:
+            try:
+                action_data = json.loads(pending_msg.pending_action)
+                exec_result = agent.execute_approved_action(action_data)
+                response_content = (
+                    exec_result.get("response")
+                    or exec_result.get("message")
+                    or "Acción ejecutada"
                 )
-                try:
-                    auto_result = agent.execute_approved_action(inventory_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución inventario: %s", str(e))
-
-                result = {
-                    "response": response_content,
-                    "expert_name": "Assistant",
-                    "model_used": model or "default",
-                }
-                return Response(json.dumps(result), content_type="application/json")
-
-            prompt_lower = (prompt or "").lower()
-            production_terms = [
-                "orden",
-                "órden",
-                "ordenes",
-                "órdenes",
-                "fabricación",
-                "fabricacion",
-                "mrp",
-                "producción",
-                "produccion",
-            ]
-            if any(term in prompt_lower for term in production_terms):
-                state = "delayed" if "retras" in prompt_lower else ""
-                production_action = {
-                    "tool": "search_mrp_orders",
-                    "params": {"state": state},
-                }
-                response_content = "[search_mrp_orders] Preparando consulta..."
-                action_json = json.dumps(production_action)
-                message = env["ai.assistant.message"].create(
+                if exec_result.get("error"):
+                    response_content = f"❌ {exec_result.get('error')}"
+                pending_msg.write({"pending_action": False})
+                env["ai.assistant.message"].create(
                     {  # type: ignore
                         "session_id": session.id,
                         "role": "assistant",
                         "content": response_content.replace("\n", "<br>"),
                         "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "Assistant",
+                        "expert_name": pending_msg.expert_name or "Assistant",
                     }
                 )
-                try:
-                    auto_result = agent.execute_approved_action(production_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución producción: %s", str(e))
-
                 result = {
                     "response": response_content,
-                    "expert_name": "Assistant",
+                    "expert_name": pending_msg.expert_name or "Assistant",
                     "model_used": model or "default",
                 }
                 return Response(json.dumps(result), content_type="application/json")
-
-            sale_action = parse_sale_orders_prompt(prompt)
-            if sale_action:
-                response_content = "[search_sale_orders] Preparando consulta..."
-                action_json = json.dumps(sale_action)
-                message = env["ai.assistant.message"].create(
-                    {
-                        "session_id": session.id,
-                        "role": "assistant",
-                        "content": response_content.replace("\n", "<br>"),
-                        "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "SalesExpert",
-                    }
-                )
-                try:
-                    auto_result = agent.execute_approved_action(sale_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución ventas: %s", str(e))
-
-                return Response(
-                    json.dumps({
-                        "response": response_content,
-                        "expert_name": "SalesExpert",
-                        "model_used": model or "default",
-                    }),
-                    content_type="application/json",
-                )
-
-            purchase_action = parse_purchase_orders_prompt(prompt)
-            if purchase_action:
-                response_content = "[search_purchase_orders] Preparando consulta..."
-                action_json = json.dumps(purchase_action)
-                message = env["ai.assistant.message"].create(
-                    {
-                        "session_id": session.id,
-                        "role": "assistant",
-                        "content": response_content.replace("\n", "<br>"),
-                        "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "PurchaseExpert",
-                    }
-                )
-                try:
-                    auto_result = agent.execute_approved_action(purchase_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución compras: %s", str(e))
-
-                return Response(
-                    json.dumps({
-                        "response": response_content,
-                        "expert_name": "PurchaseExpert",
-                        "model_used": model or "default",
-                    }),
-                    content_type="application/json",
+            except Exception as e:
+                _logger.error("Error ejecutando aprobación directa: %s", str(e))
+
+        # 3. Rutas deterministas: una sola pasada del clasificador de intención
+        intent = intent_router.route(prompt)
+        if not intent["action"]:
+            return None
+
+        action = intent["action"]
+        if intent["intent"] == "create_product":
+            if auto_approval:
+                exec_result = agent.execute_approved_action(action)
+                response_content = (
+                    exec_result.get("response")
+                    or exec_result.get("message")
+                    or "Acción ejecutada"
                 )
-
-            docs_action = parse_docs_prompt(prompt)
-            if docs_action:
-                response_content = "[search_docs] Preparando consulta..."
-                action_json = json.dumps(docs_action)
-                message = env["ai.assistant.message"].create(
-                    {
-                        "session_id": session.id,
-                        "role": "assistant",
-                        "content": response_content.replace("\n", "<br>"),
-                        "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "DocsExpert",
-                    }
-                )
-                try:
-                    auto_result = agent.execute_approved_action(docs_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución docs: %s", str(e))
-
-                return Response(
-                    json.dumps({
-                        "response": response_content,
-                        "expert_name": "DocsExpert",
-                        "model_used": model or "default",
-                    }),
-                    content_type="application/json",
-                )
-
-            mail_action = parse_mail_prompt(prompt)
-            if mail_action:
-                response_content = "[search_mail] Preparando consulta..."
-                action_json = json.dumps(mail_action)
-                message = env["ai.assistant.message"].create(
-                    {
-                        "session_id": session.id,
-                        "role": "assistant",
-                        "content": response_content.replace("\n", "<br>"),
-                        "state": "done",
-                        "pending_action": action_json,
-                        "expert_name": "MailExpert",
-                    }
-                )
-                try:
-                    auto_result = agent.execute_approved_action(mail_action)
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución correo: %s", str(e))
-
-                return Response(
-                    json.dumps({
-                        "response": response_content,
-                        "expert_name": "MailExpert",
-                        "model_used": model or "default",
-                    }),
-                    content_type="application/json",
-                )
-
-            direct_action = parse_create_product_prompt(prompt)
-            if direct_action:
-                if auto_approval:
-                    exec_result = agent.execute_approved_action(direct_action)
-                    response_content = (
-                        exec_result.get("response")
-                        or exec_result.get("message")
-                        or "Acción ejecutada"
-                    )
-                    if exec_result.get("error"):
-                        response_content = f"❌ {exec_result.get('error')}"
-                    env["ai.assistant.message"].create(
-                        {  # type: ignore
-                            "session_id": session.id,
-                            "role": "assistant",
-                            "content": response_content.replace("\n", "<br>"),
-                            "state": "done",
-                            "expert_name": "Assistant",
-                        }
-                    )
-                    result = {
-                        "response": response_content,
-                        "expert_name": "Assistant",
-                        "model_used": model or "default",
-                    }
-                    return Response(
-                        json.dumps(result), content_type="application/json"
-                    )
-
-                response_content = "He preparado esta acción. ¿Deseas proceder?"
-                action_json = json.dumps(direct_action)
+                if exec_result.get("error"):
+                    response_content = f"❌ {exec_result.get('error')}"
                 env["ai.assistant.message"].create(
                     {  # type: ignore
                         "session_id": session.id,
                         "role": "assistant",
                         "content": response_content.replace("\n", "<br>"),
                         "state": "done",
-                        "pending_action": action_json,
                         "expert_name": "Assistant",
                     }
                 )
                 result = {
                     "response": response_content,
-                    "action": direct_action,
                     "expert_name": "Assistant",
                     "model_used": model or "default",
                 }
-                return Response(json.dumps(result), content_type="application/json")
-
-            context = get_minimal_context(request.env, prompt)
-
-            # Recuperar historial de conversación reciente (memoria a corto plazo)
-            last_msgs = env["ai.assistant.message"].search(
-                [
-                    ("session_id", "=", session.id),
-                    ("role", "in", ["user", "assistant"]),
-                ],
-                order="create_date desc",
-                limit=10,
-            )  # 5 turnos de diálogo
-
-            history = []
-            for msg in reversed(last_msgs):  # Reordenar cronológicamente
-                role_label = "Usuario" if msg.role == "user" else "Asistente"
-                # Limpiar contenido de posibles JSONs antiguos
-                content = msg.content or ""
-                if content.strip().startswith("{") and '"tool":' in content:
-                    continue  # Omitir mensajes técnicos/tools del historial para no confundir
-                history.append(f"{role_label}: {content}")
-
-            # Procesar
-            result = agent.process(prompt, context, model=model, history=history)
-
-            # 5. Guardar respuesta del asistente (PERSISTENCIA CHECKPOINT)
-            response_content = result.get("response", "")
-            action_json = (
-                json.dumps(result["action"]) if result.get("action") else False
-            )
-            expert_name = result.get("expert_name", "Assistant")
-
-            if not response_content:
-                if result.get("action"):
-                    response_content = "He preparado esta acción. ¿Deseas proceder?"
-                else:
-                    response_content = "No obtuve respuesta. Intenta nuevamente."
+                return Response(
+                    json.dumps(result), content_type="application/json"
+                )
 
-            # Guardar el mensaje inicial con la acción pendiente
-            message = env["ai.assistant.message"].create(
+            response_content = "He preparado esta acción. ¿Deseas proceder?"
+            action_json = json.dumps(action)
+            env["ai.assistant.message"].create(
                 {  # type: ignore
                     "session_id": session.id,
                     "role": "assistant",
                     "content": response_content.replace("\n", "<br>"),
                     "state": "done",
                     "pending_action": action_json,
-                    "expert_name": expert_name,
+                    "expert_name": "Assistant",
                 }
             )
+            result = {
+                "response": response_content,
+                "action": action,
+                "expert_name": "Assistant",
+                "model_used": model or "default",
+            }
+            return Response(json.dumps(result), content_type="application/json")
 
-            # EJECUCIÓN AUTOMÁTICA: Si hay una acción pendiente de una herramienta segura, ejecutarla DESPUÉS de guardar
-            action_tool = result.get("action", {}).get("tool") if result else None
-            if action_tool in ["search_products", "search_mrp_orders"]:
-                try:
-                    _logger.info(
-                        "Ejecutando automáticamente acción: %s",
-                        result["action"],
-                    )
-                    auto_result = agent.execute_approved_action(result["action"])
+        # Consultas: se guardan como acción pendiente y se auto-ejecutan
+        expert_name = intent["expert_name"]
+        response_content = "[%s] Preparando consulta..." % action["tool"]
+        message = env["ai.assistant.message"].create(
+            {  # type: ignore
+                "session_id": session.id,
+                "role": "assistant",
+                "content": response_content.replace("\n", "<br>"),
+                "state": "done",
+                "pending_action": json.dumps(action),
+                "expert_name": expert_name,
+            }
+        )
+        try:
+            auto_result = agent.execute_approved_action(action)
+            response_content = auto_result.get("response", response_content)
+            message.write(
+                {
+                    "content": response_content.replace("\n", "<br>"),
+                    "pending_action": False,
+                }
+            )
+        except Exception as e:
+            _logger.error("Error en auto-ejecución %s: %s", intent["intent"], str(e))
 
-                    # Actualizar el mensaje con el resultado de la ejecución automática
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,  # Limpiar la acción pendiente
-                        }
-                    )
+        result = {
+            "response": response_content,
+            "expert_name": expert_name,
+            "model_used": model or "default",
+        }
+        return Response(json.dumps(result), content_type="application/json")
 
-                    _logger.info(
-                        "Auto-ejecución completada: %s...",
-                        response_content[:100],
-                    )
-                except Exception as e:
-                    _logger.error("Error en auto-ejecución: %s", str(e))
-                    # Si falla, mantener el mensigo original con la acción pendiente para ejecución manual
-
-            if auto_approval and action_tool in [
-                "create_product",
-                "create_mrp_order",
-                "adjust_stock",
-                "create_bom",
-            ]:
-                try:
-                    _logger.info(
-                        "Ejecutando automáticamente acción aprobada: %s",
-                        result["action"],
-                    )
-                    auto_result = agent.execute_approved_action(result["action"])
-                    response_content = auto_result.get("response", response_content)
-                    message.write(
-                        {
-                            "content": response_content.replace("\n", "<br>"),
-                            "pending_action": False,
-                        }
-                    )
-                    _logger.info(
-                        "Auto-ejecución aprobada completada: %s...",
-                        response_content[:100],
-                    )
-                except Exception as e:
-                    _logger.error(
-                        "Error en auto-ejecución aprobada: %s", str(e)
-                    )
+    def _save_agent_result(self, env, session, agent, result):
+        """Persiste la respuesta del agente y auto-ejecuta herramientas seguras."""
+        # 5. Guardar respuesta del asistente (PERSISTENCIA CHECKPOINT)
+        session._remember_node(result)
+        Message = env["ai.assistant.message"]
+        with tracing.span("message_write"):
+            message = Message.create(
+                dict(Message._agent_result_vals(result), session_id=session.id, role="assistant")
+            )
+        return message._auto_execute(agent, result, auto_approval=AUTO_APPROVAL)
 
-            # Añadir info del modelo usado para el frontend
-            result["model_used"] = model or "default"
+    @staticmethod
+    def _record_trace(env, trace, session, model, outcome, result=None, **extra):
+        """Cierra la traza del turno y la guarda en ai.request.trace."""
+        tracing.end_trace()
+        result = dict(result or {})
+        result.setdefault("model_used", model or (session.model_ollama if session else None))
+        env["ai.request.trace"]._record(trace, session, result, outcome, **extra)
 
-            return Response(json.dumps(result), content_type="application/json")
+    @http.route(
+        "/ai_assistant/ask_stream", type="http", auth="user", cors="*", csrf=False
+    )
+    def ask_stream(self, **kwargs):
+        """
+        Variante en streaming de /ask: reenvía los tokens de Ollama como
+        Server-Sent Events y persiste el mensaje final una sola vez al acabar.
+        Las rutas deterministas responden con JSON como /ask.
+        """
+        data, error_response = self._read_request(kwargs)
+        if error_response is not None:
+            return error_response
+        prompt, model = data["prompt"], data["model"]
+
+        env = request.env
+        session = None
+        trace = tracing.start_trace("ask_stream")
+        try:
+            session = self._open_turn(env, prompt, model)
+            agent = AgentCore(request.env)
+
+            with tracing.span("fast_path"):
+                fast_response = self._fast_path_response(env, session, agent, prompt, model)
+            if fast_response is not None:
+                self._record_trace(env, trace, session, model, "fast_path")
+                return fast_response
+
+            if not OllamaService(env).is_available():
+                # Circuito abierto en todos los nodos: no hay nada que
+                # retransmitir, el turno espera en la cola a que vuelvan
+                return self._enqueue_turn(env, trace, session, data)
+
+            with tracing.span("context"):
+                context = get_minimal_context(request.env, prompt)
+            history = session._load_history()
+            turn = agent.prepare_turn(
+                prompt,
+                context,
+                model=model,
+                history=history,
+                node_url=session.ollama_node_url,
+            )
+
+            with tracing.span("cache"):
+                cached = agent.lookup_cached_result(turn, prompt, data["use_cache"])
+            if cached:
+                self._save_agent_result(env, session, agent, cached)
+                cached["model_used"] = model or "default"
+                self._record_trace(env, trace, session, model, "cache", cached)
+                return Response(json.dumps(cached), content_type="application/json")
 
         except Exception as e:
-            _logger.error("Error en AgentCore: %s", str(e))
+            _logger.error("Error en AgentCore (stream): %s", str(e))
+            self._record_trace(env, trace, session, model, "error", {"error": str(e)})
             return Response(
                 json.dumps({"error": str(e)}),
                 status=500,
                 content_type="application/json",
             )
 
-    @http.route(
-        "/ai_assistant/ask_stream", type="http", auth="user", cors="*", csrf=False
-    )
-    def ask_stream(self, **kwargs):
-        """Alias para compatibilidad con frontend existente."""
-        return self.ask(**kwargs)
+        # El cursor de la petición se cierra antes de consumir el generador:
+        # la persistencia final usa un cursor propio (y la traza sigue allí).
+        tracing.end_trace()
+        stream = self._stream_turn(
+            env.registry, env.uid, dict(env.context), session.id, turn, prompt, model, trace
+        )
+        return Response(
+            stream,
+            content_type="text/event-stream",
+            headers=[("Cache-Control", "no-cache"), ("X-Accel-Buffering", "no")],
+            direct_passthrough=True,
+        )
+
+    def _stream_turn(
+        self, registry, uid, context, session_id, turn, prompt, model, trace=None
+    ):
+        """Generador SSE: tokens a medida que llegan y un evento final 'done'."""
+        final = {}
+        for event in AgentCore.stream_turn(turn):
+            if "token" in event:
+                yield self._sse(event)
+            else:
+                final = event
+
+        if trace:
+            tracing.attach(trace)
+            trace.add("llm", final.get("total_ms"))
+            trace.add_timings(final.get("timings"))
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                agent = AgentCore(env)
+                session = env["ai.assistant.session"].browse(session_id)
+                result = agent.finish_turn(final.get("response", ""), turn)
+                result["timings"] = final.get("timings") or {}
+                result["node_url"] = final.get("node_url")
+                agent.store_cached_result(turn, prompt, result)
+                self._save_agent_result(env, session, agent, result)
+                result["model_used"] = model or "default"
+                self._record_trace(
+                    env, trace, session, model, "llm", result, ttft_ms=final.get("ttft_ms")
+                )
+        except Exception as e:
+            _logger.error("Error persistiendo respuesta en streaming: %s", str(e))
+            tracing.end_trace()
+            result = {"error": str(e)}
+
+        result["model_used"] = model or "default"
+        result["ttft_ms"] = final.get("ttft_ms")
+        result["total_ms"] = final.get("total_ms")
+        result["done"] = True
+        yield self._sse(result)
+
+    @staticmethod
+    def _sse(payload):
+        return f"data: {json.dumps(payload)}\n\n".encode("utf-8")
 
     @http.route(
         "/ai_assistant/execute_action",
@@ -580,5 +509,88 @@ class AiController(http.Controller):
         kwargs = kwargs or {}
         ollama = OllamaService(request.env)
         result = ollama.test_connection()
+        result["http_pool"] = pool_stats()
+        result["ollama_nodes"] = nodes_stats()
+        result["circuit_breakers"] = breaker_stats()
+        result["response_cache"] = dict(CACHE_STATS)
+        result["response_parsing"] = dict(PARSE_STATS)
+        result["semantic_cache"] = semantic_cache_stats()
+        result["semantic_router"] = semantic_router_stats()
+        result["job_queue"] = executor_stats()
+        result["message_queue"] = QUEUE_METRICS.stats()
+        result["llm_scheduler"] = scheduler_stats()
+        result["single_flight"] = single_flight_stats()
 
         return Response(json.dumps(result), content_type="application/json")
+
+    @http.route(
+        "/ai_assistant/queue_stats", type="jsonrpc", auth="user", cors="*", csrf=False
+    )
+    def queue_stats(self, **kwargs):
+        """Profundidad, antigüedad y rendimiento de la cola de mensajes."""
+        Message = request.env["ai.assistant.message"].sudo()
+        counts = {
+            state: count
+            for state, count in Message._read_group(
+                [("state", "in", ["pending", "processing", "error"])],
+                ["state"],
+                ["__count"],
+            )
+        }
+        oldest = Message.search(
+            [("state", "in", ["pending", "processing"])], order="id", limit=1
+        )
+        return {
+            "executor": executor_stats(),
+            "throughput": QUEUE_METRICS.stats(),
+            "llm_scheduler": scheduler_stats(),
+            "pending_messages": counts.get("pending", 0),
+            "processing_messages": counts.get("processing", 0),
+            "failed_messages": counts.get("error", 0),
+            "oldest_pending_s": round(oldest._queue_age(), 1) if oldest else 0.0,
+        }
+
+    @http.route("/ai_assistant/metrics", type="http", auth="public", csrf=False)
+    def prometheus_metrics(self, **kwargs):
+        """
+        Métricas en formato Prometheus, sumadas entre todos los workers.
+
+        Acceso con 'Authorization: Bearer <ai_production_assistant.metrics_token>'
+        (para el scraper) o con una sesión de administrador.
+        """
+        token = request.env["ir.config_parameter"].sudo().get_param(
+            "ai_production_assistant.metrics_token"
+        )
+        header = request.httprequest.headers.get("Authorization", "")
+        authorized = bool(token) and hmac.compare_digest(
+            header.encode(), ("Bearer %s" % token).encode()
+        )
+        if not authorized and not request.env.user.has_group("base.group_system"):
+            return Response("Forbidden\n", status=403, content_type="text/plain")
+
+        families = metrics.collect_all(request.db)
+        # La cola se lee de la base de datos en cada scrape (no por proceso)
+        Message = request.env["ai.assistant.message"].sudo()
+        counts = dict(
+            Message._read_group(
+                [("state", "in", ["pending", "processing", "error"])],
+                ["state"],
+                ["__count"],
+            )
+        )
+        families["ai_assistant_queue_messages"] = metrics.gauge_family(
+            "Mensajes del asistente en la cola por estado",
+            ("state",),
+            {(state,): counts.get(state, 0) for state in ("pending", "processing", "error")},
+        )
+        oldest = Message.search(
+            [("state", "in", ["pending", "processing"])], order="id", limit=1
+        )
+        families["ai_assistant_queue_oldest_seconds"] = metrics.gauge_family(
+            "Antigüedad del mensaje pendiente más antiguo",
+            (),
+            {(): round(oldest._queue_age(), 1) if oldest else 0.0},
+        )
+        return Response(
+            metrics.render(families), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
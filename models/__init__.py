@@ -7,6 +7,8 @@ from . import ai_pending_action
 from . import ai_ollama_config
 from . import ai_notification
 from . import ai_watchdog
+from . import ai_response_cache
+from . import ai_request_trace
 
 _logger = logging.getLogger(__name__)
 
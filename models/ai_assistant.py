@@ -5,14 +5,44 @@ Modelos del Asistente IA - Arquitectura limpia
 
 import json
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
 
 from odoo import models, fields, api
 
+from ..services import tracing
 from ..services.agent_core import AgentCore, get_minimal_context
+from ..services.job_executor import QUEUE_METRICS, get_executor
+from ..services.ollama_service import OllamaService
 
 _logger = logging.getLogger(__name__)
 
 
+class AIBackendError(Exception):
+    """Ollama no devolvió respuesta (timeout, conexión, circuito abierto...)."""
+
+
+def _process_in_background(registry, uid, context, message_id, claimed=False):
+    """
+    Trabajo en segundo plano: procesa un mensaje con un cursor propio y
+    confirma su resultado de forma independiente. Si aún no está reclamado
+    (``claimed``) lo reclama antes; si otro worker lo tiene, no hace nada.
+    """
+    # Como en los hilos HTTP y de cron de Odoo (lo usan logs y métricas)
+    threading.current_thread().dbname = registry.db_name
+    with registry.cursor() as cr:
+        env = api.Environment(cr, uid, context)
+        message = env["ai.assistant.message"].browse(message_id)
+        if not claimed:
+            message = message._claim()
+            cr.commit()
+            if not message:
+                return
+        message._process_claimed()
+
+
 class AIAssistantSession(models.Model):
     _name = "ai.assistant.session"
     _description = "Sesión de Asistente IA"
@@ -24,10 +54,44 @@ class AIAssistantSession(models.Model):
         "res.users", string="Usuario", default=lambda self: self.env.user
     )
     model_ollama = fields.Char(string="Modelo Ollama", default="gemma3:4b")
+    ollama_node_url = fields.Char(
+        string="Nodo Ollama",
+        readonly=True,
+        help="Servidor que atendió el último turno; se reutiliza para aprovechar su caché de prompt.",
+    )
     message_ids = fields.One2many(
         "ai.assistant.message", "session_id", string="Mensajes"
     )
 
+    def _load_history(self, before_id=None):
+        """Historial reciente de la sesión (memoria a corto plazo)."""
+        self.ensure_one()
+        domain = [
+            ("session_id", "=", self.id),
+            ("role", "in", ["user", "assistant"]),
+            ("state", "not in", ["pending", "processing"]),
+        ]
+        if before_id:
+            domain.append(("id", "<", before_id))
+        last_msgs = self.env["ai.assistant.message"].search(
+            domain, order="create_date desc, id desc", limit=10
+        )  # 5 turnos de diálogo
+
+        history = []
+        for msg in reversed(last_msgs):  # Reordenar cronológicamente
+            # Limpiar contenido de posibles JSONs antiguos
+            content = msg.content or ""
+            if content.strip().startswith("{") and '"tool":' in content:
+                continue  # Omitir mensajes técnicos/tools del historial para no confundir
+            history.append({"role": msg.role, "content": content})
+        return history
+
+    def _remember_node(self, result):
+        """Afinidad de sesión: el siguiente turno vuelve al mismo nodo Ollama."""
+        self.ensure_one()
+        if result.get("node_url") and result["node_url"] != self.ollama_node_url:
+            self.ollama_node_url = result["node_url"]
+
     def action_ask_ai_async(self, prompt, context_ref=None, model_id=None):
         """
         Crea un mensaje del usuario y prepara un mensaje pendiente para el asistente.
@@ -51,12 +115,13 @@ class AIAssistantSession(models.Model):
             "content": "<p><i>Procesando consulta...</i></p>",
             "state": "pending",
             "raw_prompt": prompt,
+            "ollama_model": model_name,
             "expert_name": f"Expert ({model_name})",
         })
 
-        # 3. Procesar inmediatamente o dejar para el cron
-        # Lo procesamos inmediatamente en este hilo para que el usuario vea respuesta
-        pending_msg.process_message()
+        # 3. Procesar en segundo plano (o, con la cola llena, en el cron),
+        # por detrás del chat interactivo
+        pending_msg.with_context(ai_llm_priority="normal")._enqueue()
 
         return True
 
@@ -110,11 +175,22 @@ class AIAssistantMessage(models.Model):
     role = fields.Selection([("user", "Usuario"), ("assistant", "IA")], required=True)
     content = fields.Html(string="Contenido", sanitize=False)
     state = fields.Selection(
-        [("done", "Procesado"), ("pending", "Pendiente"), ("error", "Error")],
+        [
+            ("done", "Procesado"),
+            ("pending", "Pendiente"),
+            ("processing", "Procesando"),
+            ("error", "Error"),
+        ],
         default="done",
     )
     # Para mensajes pendientes
     raw_prompt = fields.Text(string="Prompt Original")
+    ollama_model = fields.Char(string="Modelo Ollama")
+    use_cache = fields.Boolean(string="Usar caché de respuestas", default=True)
+    # Cola: reserva, intentos y último fallo (tras agotar intentos queda en 'error')
+    claimed_at = fields.Datetime(string="Reservado el", readonly=True)
+    attempt_count = fields.Integer(string="Intentos", default=0, readonly=True)
+    last_error = fields.Text(string="Último error", readonly=True)
     pending_action = fields.Text(string="Acción Pendiente (JSON)")
     expert_name = fields.Char(string="Experto MoE")
 
@@ -136,14 +212,15 @@ class AIAssistantMessage(models.Model):
         """Envía una notificación al bus de Odoo para actualizar el chat en tiempo real."""
         self.ensure_one()
         try:
-            # Canal por usuario
-            channel = f"ai.assistant.message.{self.session_id.user_id.id}"
-            payload = {
-                "type": "new_message",
-                "session_id": self.session_id.id,
-                "message_id": self.id,
-            }
-            self.env["bus.bus"]._sendone(channel, "ai_message", payload)
+            with tracing.span("bus"):
+                # Canal por usuario
+                channel = f"ai.assistant.message.{self.session_id.user_id.id}"
+                payload = {
+                    "type": "new_message",
+                    "session_id": self.session_id.id,
+                    "message_id": self.id,
+                }
+                self.env["bus.bus"]._sendone(channel, "ai_message", payload)
         except Exception as e:
             _logger.error("Error enviando notificación al bus: %s", str(e))
 
@@ -151,25 +228,225 @@ class AIAssistantMessage(models.Model):
         """Procesa un mensaje pendiente con AgentCore."""
         self.ensure_one()
 
-        if self.state != "pending" or not self.raw_prompt:
+        if self.state not in ("pending", "processing") or not self.raw_prompt:
             return
 
+        trace = tracing.start_trace("queue")
         try:
-            agent = AgentCore(self.env)
+            with self.env.cr.savepoint():
+                result = self._run_agent()
+        except Exception as e:
+            _logger.error("Error procesando mensaje %s: %s", self.id, str(e))
+            result = {"error": str(e)}
+            self._record_failure(str(e))
+        tracing.end_trace()
+        self.env["ai.request.trace"]._record(
+            trace,
+            self.session_id,
+            dict(result, model_used=self.ollama_model or self.session_id.model_ollama),
+        )
+
+    def _run_agent(self):
+        """Ejecuta el turno con historial, modelo y nodo de la sesión."""
+        session = self.session_id
+        agent = AgentCore(self.env)
+        with tracing.span("context"):
             context = get_minimal_context(self.env, self.raw_prompt)
-            result = agent.process(self.raw_prompt, context)
-
-            response_text = result.get("response", str(result))
+        result = agent.process(
+            self.raw_prompt,
+            context,
+            model=self.ollama_model or session.model_ollama or None,
+            history=session._load_history(before_id=self.id),
+            use_cache=self.use_cache,
+            node_url=session.ollama_node_url,
+        )
+        if result.get("backend_error"):
+            # Sin respuesta del modelo: el mensaje vuelve a la cola (o dead letter)
+            raise AIBackendError(result["response"])
+        session._remember_node(result)
+        with tracing.span("message_write"):
+            self.write(self._agent_result_vals(result))
+        self._auto_execute(agent, result)
+        return result
 
-            # Si hay acción pendiente, guardarla
+    @api.model
+    def _agent_result_vals(self, result):
+        """Valores del mensaje del asistente a partir del resultado del agente."""
+        response_content = result.get("response", "")
+        if not response_content:
             if result.get("action"):
-                self.pending_action = json.dumps(result["action"])
-
-            self.write({"content": self._format_html(response_text), "state": "done"})
+                response_content = "He preparado esta acción. ¿Deseas proceder?"
+            else:
+                response_content = "No obtuve respuesta. Intenta nuevamente."
+        return {
+            "content": response_content.replace("\n", "<br>"),
+            "state": "done",
+            "pending_action": (
+                json.dumps(result["action"]) if result.get("action") else False
+            ),
+            "expert_name": result.get("expert_name", "Assistant"),
+        }
 
+    def _auto_execute(self, agent, result, auto_approval=False):
+        """
+        EJECUCIÓN AUTOMÁTICA: herramientas de consulta siempre y, con
+        auto-aprobación, también las de creación. Se ejecuta DESPUÉS de
+        guardar el mensaje. Returns: el texto final del mensaje.
+        """
+        self.ensure_one()
+        response_content = result.get("response", "")
+        action_tool = result.get("action", {}).get("tool") if result else None
+        safe = action_tool in ["search_products", "search_mrp_orders"]
+        approved = auto_approval and action_tool in [
+            "create_product",
+            "create_mrp_order",
+            "adjust_stock",
+            "create_bom",
+        ]
+        if not (safe or approved):
+            return response_content
+        try:
+            _logger.info("Ejecutando automáticamente acción: %s", result["action"])
+            auto_result = agent.execute_approved_action(result["action"])
+
+            # Actualizar el mensaje con el resultado de la ejecución automática
+            response_content = auto_result.get("response", response_content)
+            self.write(
+                {
+                    "content": response_content.replace("\n", "<br>"),
+                    "pending_action": False,  # Limpiar la acción pendiente
+                }
+            )
+            _logger.info("Auto-ejecución completada: %s...", response_content[:100])
         except Exception as e:
-            _logger.error("Error procesando mensaje %s: %s", self.id, str(e))
-            self.write({"content": f"<p>Error: {str(e)}</p>", "state": "error"})
+            _logger.error("Error en auto-ejecución: %s", str(e))
+            # Si falla, mantener el mensaje original con la acción pendiente para ejecución manual
+        return response_content
+
+    @api.model
+    def _queue_params(self):
+        params = self.env["ir.config_parameter"].sudo()
+
+        def param(key, default):
+            return int(params.get_param(f"ai_production_assistant.{key}", default) or default)
+
+        return {
+            "workers": max(param("queue_workers", 4), 1),
+            "max_attempts": param("queue_max_attempts", 3),
+            "retry_backoff": param("queue_retry_backoff", 30),
+            "lease_minutes": param("queue_lease_minutes", 10),
+            "time_budget": param("queue_time_budget", 50),
+        }
+
+    def _claim(self, limit=None):
+        """
+        Reclama mensajes de la cola pasándolos a 'processing' (los de
+        ``self`` o, si está vacío, los más antiguos). FOR UPDATE SKIP LOCKED
+        garantiza que dos workers o crons nunca cojan la misma fila. Se
+        incluyen los reintentos cuyo tiempo de espera ya pasó y las reservas
+        caducadas (worker caído). Returns: los mensajes reclamados.
+        """
+        queue = self._queue_params()
+        ids_filter = "AND id IN %(ids)s" if self.ids else ""
+        self.env.cr.execute(
+            f"""
+            UPDATE ai_assistant_message m
+               SET state = 'processing',
+                   claimed_at = (now() at time zone 'UTC'),
+                   attempt_count = COALESCE(m.attempt_count, 0) + 1
+             WHERE m.id IN (
+                    SELECT id FROM ai_assistant_message
+                     WHERE role = 'assistant'
+                       AND ((state = 'pending'
+                             AND (claimed_at IS NULL
+                                  OR claimed_at < (now() at time zone 'UTC')
+                                     - make_interval(secs => %(backoff)s * COALESCE(attempt_count, 0))))
+                         OR (state = 'processing'
+                             AND claimed_at < (now() at time zone 'UTC')
+                                 - make_interval(mins => %(lease)s)))
+                       {ids_filter}
+                     ORDER BY id
+                     LIMIT %(limit)s
+                       FOR UPDATE SKIP LOCKED)
+            RETURNING m.id
+            """,
+            {
+                "ids": tuple(self.ids),
+                "limit": limit,
+                "backoff": queue["retry_backoff"],
+                "lease": queue["lease_minutes"],
+            },
+        )
+        claimed = self.browse([row[0] for row in self.env.cr.fetchall()])
+        self.invalidate_model(["state", "claimed_at", "attempt_count"])
+        QUEUE_METRICS.record_claim(len(claimed))
+        return claimed
+
+    def _process_claimed(self):
+        """Procesa un mensaje reclamado y anota el resultado en las métricas."""
+        self.ensure_one()
+        self.process_message()
+        outcome = {"done": "done", "pending": "retry"}.get(self.state, "dead")
+        QUEUE_METRICS.record(outcome, self._queue_age())
+
+    def _queue_age(self):
+        return (fields.Datetime.now() - self.create_date).total_seconds()
+
+    def _record_failure(self, error):
+        """
+        Devuelve el mensaje a la cola hasta agotar 'queue_max_attempts'
+        (con espera creciente entre intentos); después queda en 'error'
+        con el último fallo (dead letter).
+        """
+        self.ensure_one()
+        if self.attempt_count < self._queue_params()["max_attempts"]:
+            self.write({"state": "pending", "last_error": error})
+            return
+        self.write(
+            {"content": f"<p>Error: {error}</p>", "state": "error", "last_error": error}
+        )
+
+    @api.model
+    def _dead_letter_stale(self):
+        """Reservas caducadas sin intentos restantes: el worker murió en todos."""
+        queue = self._queue_params()
+        stale = self.search(
+            [
+                ("state", "=", "processing"),
+                ("attempt_count", ">=", queue["max_attempts"]),
+                (
+                    "claimed_at",
+                    "<",
+                    fields.Datetime.now() - timedelta(minutes=queue["lease_minutes"]),
+                ),
+            ]
+        )
+        for message in stale:
+            message._record_failure(self.env._("El procesamiento no terminó (reserva caducada)"))
+            QUEUE_METRICS.record("dead", message._queue_age())
+
+    def _enqueue(self):
+        """Procesa los mensajes en el pool de segundo plano tras el commit."""
+        params = self.env["ir.config_parameter"].sudo()
+        executor = get_executor(
+            int(params.get_param("ai_production_assistant.job_workers", 0) or 0),
+            int(params.get_param("ai_production_assistant.job_queue_size", 0) or 0),
+        )
+        registry = self.env.registry
+        uid = self.env.uid
+        context = dict(self.env.context)
+        message_ids = self.ids
+
+        def submit():
+            for message_id in message_ids:
+                if not executor.submit(
+                    message_id, _process_in_background, registry, uid, context, message_id
+                ):
+                    _logger.warning(
+                        "Cola IA llena: el mensaje %s queda para el cron", message_id
+                    )
+
+        self.env.cr.postcommit.add(submit)
 
     def _format_html(self, text):
         """Convierte texto a HTML básico."""
@@ -182,14 +459,51 @@ class AIAssistantMessage(models.Model):
 
     @api.model
     def _cron_process_ai_queue(self):
-        """Cron job para procesar mensajes pendientes."""
-        pending = self.search([("state", "=", "pending")], limit=5)
-        for msg in pending:
-            try:
-                msg.process_message()
-            except Exception as e:
-                _logger.error("Error en cron para mensaje %s: %s", msg.id, str(e))
-                msg.write({"state": "error", "content": f"<p>Error: {str(e)}</p>"})
+        """
+        Cron job para procesar mensajes pendientes: los reclama en lotes y
+        los procesa con 'queue_workers' hilos, cada uno con su transacción.
+        Si se agota 'queue_time_budget' con trabajo en cola, se reprograma.
+        """
+        if not OllamaService(self.env).is_available():
+            _logger.info("Cola IA en espera: circuito de Ollama abierto")
+            return
+        queue = self._queue_params()
+        self._dead_letter_stale()
+        self.env.cr.commit()
+
+        registry = self.env.registry
+        uid = self.env.uid
+        # La cola cede el paso al chat interactivo en el planificador LLM
+        context = dict(self.env.context, ai_llm_priority="background")
+        deadline = time.monotonic() + queue["time_budget"]
+        in_flight = set()
+        # Si la última reserva llenó el lote puede quedar trabajo en la cola
+        backlog = False
+        with ThreadPoolExecutor(
+            max_workers=queue["workers"], thread_name_prefix="ai-queue"
+        ) as pool:
+            while True:
+                if len(in_flight) < queue["workers"] and time.monotonic() < deadline:
+                    limit = queue["workers"] - len(in_flight)
+                    claimed = self._claim(limit=limit)
+                    self.env.cr.commit()
+                    backlog = len(claimed) == limit
+                    in_flight.update(
+                        pool.submit(
+                            _process_in_background, registry, uid, context, message_id, True
+                        )
+                        for message_id in claimed.ids
+                    )
+                if not in_flight:
+                    break
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception():
+                        # La reserva caduca y el mensaje se reintenta más tarde
+                        _logger.error("Error en cron de cola IA: %s", future.exception())
+
+        if backlog and time.monotonic() >= deadline:
+            self.env.ref("ai_production_assistant.ir_cron_process_ai_queue")._trigger()
 
     def _process_message(self):
         return self.process_message()
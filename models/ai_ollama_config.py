@@ -1,14 +1,28 @@
 # -*- coding: utf-8 -*-
-import requests
+import logging
+import time
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
 
+from ..services import load_balancer
+from ..services.circuit_breaker import get_breaker
+from ..services.http_pool import get_session
+from ..services.llm_scheduler import DEFAULT_CLASS_LIMITS, DEFAULT_MAX_CONCURRENCY
+from ..services.semantic_cache import clear_indexes
+
+_logger = logging.getLogger(__name__)
+
+# Campos que solo escribe el health check: no invalidan la caché de respuestas
+HEALTH_FIELDS = {"health_state", "last_health_check", "avg_latency_ms"}
+
 
 class AIOllamaConfig(models.Model):
     _name = "ai.ollama.config"
     _description = "Configuración del servidor Ollama"
+    _order = "sequence, id"
 
+    sequence = fields.Integer(string="Secuencia", default=10)
     name = fields.Char(string="Nombre", default="Servidor Local", required=True)
     url = fields.Char(
         string="URL de Ollama", default="http://localhost:11434", required=True
@@ -30,26 +44,213 @@ class AIOllamaConfig(models.Model):
         help="Valor entre 0 y 1. Menor es más preciso, mayor es más creativo.",
     )
 
+    model_keep_alive = fields.Char(
+        string="Mantener modelo cargado",
+        default="30m",
+        help=(
+            "Tiempo que Ollama mantiene el modelo (y su caché de prompt) en memoria "
+            "tras cada petición, p. ej. '30m' o '-1' para siempre."
+        ),
+    )
+
+    # Pool HTTP (keep-alive compartido por proceso)
+    pool_size = fields.Integer(
+        string="Conexiones por pool",
+        default=10,
+        help="Conexiones keep-alive máximas que cada worker mantiene con Ollama.",
+    )
+    max_retries = fields.Integer(
+        string="Reintentos de conexión",
+        default=2,
+        help="Reintentos ante errores de conexión o respuestas 502/503/504.",
+    )
+    http_keep_alive = fields.Boolean(
+        string="Keep-Alive HTTP",
+        default=True,
+        help="Reutiliza las conexiones TCP entre peticiones a Ollama.",
+    )
+
+    # Reparto de carga entre servidores activos
+    weight = fields.Integer(
+        string="Peso",
+        default=1,
+        help="Capacidad relativa del servidor: con peso 2 recibe el doble de peticiones.",
+    )
+    max_concurrency = fields.Integer(
+        string="Peticiones simultáneas máx.",
+        default=0,
+        help="Límite de generaciones en paralelo contra este servidor (por worker de Odoo). "
+        "Las peticiones que superan el límite esperan un hueco. 0 = sin límite.",
+    )
+    health_state = fields.Selection(
+        [("unknown", "Sin comprobar"), ("up", "Disponible"), ("down", "Caído")],
+        string="Estado",
+        default="unknown",
+        readonly=True,
+    )
+    last_health_check = fields.Datetime(string="Última comprobación", readonly=True)
+    avg_latency_ms = fields.Float(
+        string="Latencia health check (ms)", digits=(16, 1), readonly=True
+    )
+    # Contadores en vivo del worker que sirve la vista
+    in_flight_requests = fields.Integer(
+        string="Peticiones en curso", compute="_compute_live_stats"
+    )
+    served_requests = fields.Integer(
+        string="Peticiones atendidas", compute="_compute_live_stats"
+    )
+    failed_requests = fields.Integer(
+        string="Peticiones fallidas", compute="_compute_live_stats"
+    )
+    live_latency_ms = fields.Float(
+        string="Latencia media (ms)", digits=(16, 1), compute="_compute_live_stats"
+    )
+
     active = fields.Boolean(string="Activo", default=True)
 
-    @api.model
+    @api.model_create_multi
     def create(self, vals_list):
-        # Si ya hay una configuración activa, desactivarla
-        if isinstance(vals_list, dict):
-            vals_list = [vals_list]
+        records = super().create(vals_list)
+        self.env["ai.response.cache"].sudo()._flush()
+        clear_indexes()
+        self.env.registry.clear_cache()
+        return records
 
-        for vals in vals_list:
-            if vals.get("active"):
-                self.search([("active", "=", True)]).write({"active": False})
-                break
+    def write(self, vals):
+        # Un cambio de estado de salud altera los nodos del reparto
+        health_changed = "health_state" in vals and any(
+            rec.health_state != vals["health_state"] for rec in self
+        )
+        res = super().write(vals)
+        # Las respuestas cacheadas dependen del servidor y sus parámetros
+        if set(vals) - HEALTH_FIELDS:
+            self.env["ai.response.cache"].sudo()._flush()
+            clear_indexes()
+        if health_changed or set(vals) - HEALTH_FIELDS:
+            self.env.registry.clear_cache()
+        return res
 
-        return super().create(vals_list)
+    def unlink(self):
+        res = super().unlink()
+        self.env["ai.response.cache"].sudo()._flush()
+        clear_indexes()
+        self.env.registry.clear_cache()
+        return res
 
-    def write(self, vals):
-        # Si se está activando una configuración, desactivar las demás
-        if vals.get("active"):
-            self.search([("id", "not in", self.ids)]).write({"active": False})
-        return super().write(vals)
+    @api.model
+    @tools.ormcache("self.env.company.id")
+    def _get_service_config(self):
+        """
+        Configuración de OllamaService, en la caché del registro: se
+        construye una vez por base de datos y compañía y se invalida al
+        crear, modificar o borrar servidores o cambiar parámetros del
+        sistema (clear_cache avisa al resto de workers). El resultado es
+        compartido: quien lo use debe copiarlo antes de modificarlo.
+        """
+        params = self.env["ir.config_parameter"].sudo()
+        configs = self.sudo().search([("active", "=", True)])
+        if configs:
+            # Parámetros comunes: los del primer servidor por secuencia
+            config = configs[0]
+            # Nodos del reparto: los caídos según el health check solo
+            # se usan si no queda ninguno disponible
+            available = configs.filtered(lambda c: c.health_state != "down") or configs
+            values = {
+                "timeout": max(config.timeout, 30),  # Mínimo 30s
+                "num_ctx": config.num_ctx or 1024,  # Por defecto bajo
+                "temperature": config.temperature or 0.7,
+                "model": params.get_param(
+                    "ai_production_assistant.selected_model", "gemma3:4b"
+                ),
+                "embedding_model": params.get_param(
+                    "ai_production_assistant.embedding_model", "nomic-embed-text"
+                ),
+                "pool_size": config.pool_size or 10,
+                "max_retries": config.max_retries,
+                "keep_alive": config.http_keep_alive,
+                "model_keep_alive": config.model_keep_alive or "30m",
+                "nodes": [
+                    {
+                        "url": c.url.rstrip("/"),
+                        "weight": c.weight or 1,
+                        "max_concurrency": c.max_concurrency,
+                        "timeout": max(c.timeout, 30),
+                    }
+                    for c in available
+                ],
+            }
+        else:
+            # Defaults si no hay config
+            values = {
+                "timeout": 60,
+                "num_ctx": 1024,
+                "temperature": 0.7,
+                "model": "gemma3:4b",
+                "embedding_model": "nomic-embed-text",
+                "pool_size": 10,
+                "max_retries": 2,
+                "keep_alive": True,
+                "model_keep_alive": "30m",
+                "nodes": [{"url": "http://localhost:11434", "weight": 1, "timeout": 60}],
+            }
+        values["llm_max_concurrency"] = (
+            int(params.get_param("ai_production_assistant.llm_max_concurrency", 0) or 0)
+            or DEFAULT_MAX_CONCURRENCY
+        )
+        values["llm_class_limits"] = {
+            name: int(params.get_param(f"ai_production_assistant.llm_limit_{name}", 0) or 0)
+            or limit
+            for name, limit in DEFAULT_CLASS_LIMITS.items()
+        }
+        return values
+
+    def _compute_live_stats(self):
+        for rec in self:
+            state = load_balancer.node_state(rec.url).as_dict()
+            rec.in_flight_requests = state["in_flight"]
+            rec.served_requests = state["requests"]
+            rec.failed_requests = state["failures"]
+            rec.live_latency_ms = state["latency_ms"]
+
+    @api.model
+    def _cron_health_check(self):
+        """Comprueba /api/tags en cada servidor activo y guarda su estado."""
+        for rec in self.search([]):
+            rec._check_health()
+
+    def _check_health(self):
+        self.ensure_one()
+        started = time.monotonic()
+        try:
+            response = get_session(self.url).get(
+                f"{self.url.rstrip('/')}/api/tags",
+                timeout=min(self.timeout or 10, 10),
+                allow_redirects=False,
+            )
+            healthy = response.status_code == 200
+        except Exception as e:
+            _logger.warning("Health check de %s fallido: %s", self.url, str(e))
+            healthy = False
+        latency_ms = (time.monotonic() - started) * 1000
+        load_balancer.mark_health(self.url, healthy, latency_ms if healthy else None)
+        breaker = get_breaker(self.url, "/api/tags")
+        if healthy:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        vals = {
+            "health_state": "up" if healthy else "down",
+            "last_health_check": fields.Datetime.now(),
+        }
+        if healthy:
+            vals["avg_latency_ms"] = (
+                latency_ms
+                if not self.avg_latency_ms
+                else load_balancer.EWMA_ALPHA * latency_ms
+                + (1 - load_balancer.EWMA_ALPHA) * self.avg_latency_ms
+            )
+        self.write(vals)
+        return healthy
 
     @api.constrains("url")
     def _check_url(self):
@@ -66,8 +267,8 @@ class AIOllamaConfig(models.Model):
         self.ensure_one()
         # Validación de seguridad: no permitir redirecciones a otros protocolos
         try:
-            response = requests.get(
-                f"{self.url.rstrip('/')}/api/tags", 
+            response = get_session(self.url).get(
+                f"{self.url.rstrip('/')}/api/tags",
                 timeout=self.timeout,
                 allow_redirects=False  # Prevenir SSRF via redirección
             )
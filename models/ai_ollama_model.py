@@ -7,6 +7,9 @@ import requests
 from odoo import models, fields, api
 from odoo.exceptions import UserError, ValidationError
 
+from ..services.http_pool import get_session
+from ..services.ollama_service import invalidate_model_registry
+
 _logger = logging.getLogger(__name__)
 
 
@@ -123,7 +126,7 @@ class AIOllamaModel(models.Model):
         payload = {"name": self.name}
 
         try:
-            response = requests.post(url, json=payload, timeout=10)
+            response = get_session(ollama_url).post(url, json=payload, timeout=10)
             response.raise_for_status()
             data = response.json()
 
@@ -194,7 +197,7 @@ class AIOllamaModel(models.Model):
 
         try:
             _logger.info("Creando variante personalizada: %s", variant_name)
-            response = requests.post(
+            response = get_session(ollama_url).post(
                 url, json=payload, timeout=300
             )  # 5 minutos timeout
 
@@ -204,6 +207,7 @@ class AIOllamaModel(models.Model):
                 )
 
             self.name = variant_name
+            invalidate_model_registry()
 
             return {
                 "type": "ir.actions.client",
@@ -237,7 +241,7 @@ class AIOllamaModel(models.Model):
         payload = {"name": self.name, "stream": False}
 
         try:
-            response = requests.post(
+            response = get_session(ollama_url).post(
                 url, json=payload, timeout=600
             )  # 10 minutos timeout
 
@@ -246,6 +250,8 @@ class AIOllamaModel(models.Model):
                     self.env._("Ollama respondió con error: %s") % response.text
                 )
 
+            invalidate_model_registry()
+
             return {
                 "type": "ir.actions.client",
                 "tag": "display_notification",
@@ -279,7 +285,7 @@ class AIOllamaModel(models.Model):
         _logger.info("Sincronizando todos los modelos desde %s", url)
 
         try:
-            response = requests.get(url, timeout=30)
+            response = get_session(ollama_url).get(url, timeout=30)
             response.raise_for_status()
             data = response.json()
             models_data = data.get("models", [])
@@ -313,6 +319,9 @@ class AIOllamaModel(models.Model):
             for name in missing:
                 existing_models[name].write({"active": False})
 
+            # Los servicios volverán a consultar /api/tags en la próxima llamada
+            invalidate_model_registry()
+
             model_count = len(models_data)
             _logger.info(
                 "Sincronización completada. %s modelos encontrados.", model_count
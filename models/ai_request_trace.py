@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api, tools
+
+from ..services import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Fase de la traza -> campo en milisegundos
+SPAN_FIELDS = {
+    "session": "session_ms",
+    "message_write": "message_write_ms",
+    "fast_path": "fast_path_ms",
+    "routing": "routing_ms",
+    "context": "context_ms",
+    "prompt_build": "prompt_build_ms",
+    "cache": "cache_ms",
+    "llm": "llm_ms",
+    "prompt_eval": "prompt_eval_ms",
+    "eval": "eval_ms",
+    "load": "load_ms",
+    "parse": "parse_ms",
+    "tool": "tool_ms",
+    "bus": "bus_ms",
+}
+
+
+class AIRequestTrace(models.Model):
+    _name = "ai.request.trace"
+    _description = "Traza de rendimiento de un turno del asistente"
+    _order = "id desc"
+
+    endpoint = fields.Selection(
+        [("ask", "/ask"), ("ask_stream", "/ask_stream"), ("queue", "Cola")],
+        string="Origen",
+        readonly=True,
+        index=True,
+    )
+    outcome = fields.Selection(
+        [
+            ("llm", "LLM"),
+            ("fast_path", "Ruta rápida"),
+            ("cache", "Caché"),
+            ("queued", "Encolado"),
+            ("error", "Error"),
+        ],
+        string="Resolución",
+        readonly=True,
+    )
+    session_id = fields.Many2one(
+        "ai.assistant.session", string="Sesión", ondelete="set null", readonly=True
+    )
+    user_id = fields.Many2one("res.users", string="Usuario", readonly=True)
+    expert_name = fields.Char(string="Experto MoE", readonly=True)
+    model_name = fields.Char(string="Modelo", readonly=True)
+    node_url = fields.Char(string="Nodo Ollama", readonly=True)
+
+    total_ms = fields.Float(string="Total (ms)", aggregator="avg", readonly=True)
+    session_ms = fields.Float(string="Sesión (ms)", aggregator="avg", readonly=True)
+    message_write_ms = fields.Float(
+        string="Escritura mensajes (ms)", aggregator="avg", readonly=True
+    )
+    fast_path_ms = fields.Float(string="Ruta rápida (ms)", aggregator="avg", readonly=True)
+    routing_ms = fields.Float(string="Router MoE (ms)", aggregator="avg", readonly=True)
+    context_ms = fields.Float(string="Contexto (ms)", aggregator="avg", readonly=True)
+    prompt_build_ms = fields.Float(string="Prompt (ms)", aggregator="avg", readonly=True)
+    cache_ms = fields.Float(string="Cachés (ms)", aggregator="avg", readonly=True)
+    llm_ms = fields.Float(string="Llamada LLM (ms)", aggregator="avg", readonly=True)
+    prompt_eval_ms = fields.Float(
+        string="Ollama prompt eval (ms)", aggregator="avg", readonly=True
+    )
+    eval_ms = fields.Float(string="Ollama eval (ms)", aggregator="avg", readonly=True)
+    load_ms = fields.Float(string="Ollama carga (ms)", aggregator="avg", readonly=True)
+    parse_ms = fields.Float(string="Parseo (ms)", aggregator="avg", readonly=True)
+    tool_ms = fields.Float(string="Herramienta (ms)", aggregator="avg", readonly=True)
+    bus_ms = fields.Float(string="Bus (ms)", aggregator="avg", readonly=True)
+    routing_method = fields.Selection(
+        [
+            ("keyword", "Palabras clave"),
+            ("semantic", "Semántico"),
+            ("tie_break", "Semántico (desempate por palabras)"),
+        ],
+        string="Enrutado MoE",
+        readonly=True,
+    )
+    routing_score = fields.Float(string="Similitud del experto", digits=(4, 3), readonly=True)
+    ttft_ms = fields.Float(string="Primer token (ms)", aggregator="avg", readonly=True)
+    prompt_eval_count = fields.Integer(string="Tokens prompt", aggregator="avg", readonly=True)
+    eval_count = fields.Integer(string="Tokens respuesta", aggregator="avg", readonly=True)
+    spans = fields.Text(string="Fases (JSON)", readonly=True)
+
+    @api.model
+    def _record(self, trace, session=None, result=None, outcome="llm", **extra):
+        """Guarda una traza terminada (si el trazado está activo)."""
+        if trace is None:
+            return self.browse()
+        result = result or {}
+        if result.get("error"):
+            outcome = "error"
+        elif result.get("cached"):
+            outcome = "cache"
+        metrics.REQUEST_DURATION.observe(
+            trace.total_ms / 1000,
+            endpoint=trace.endpoint,
+            expert=result.get("expert_name"),
+            outcome=outcome,
+        )
+        enabled = self.env["ir.config_parameter"].sudo().get_param(
+            "ai_production_assistant.tracing_enabled", "True"
+        )
+        if enabled not in ("True", "true", "1"):
+            return self.browse()
+        vals = {
+            "endpoint": trace.endpoint,
+            "outcome": outcome,
+            "session_id": session.id if session else False,
+            "user_id": self.env.uid,
+            "expert_name": result.get("expert_name"),
+            "model_name": result.get("model_used") or (session.model_ollama if session else False),
+            "node_url": result.get("node_url"),
+            "total_ms": trace.total_ms,
+            "prompt_eval_count": trace.counts.get("prompt_eval_count", 0),
+            "eval_count": trace.counts.get("eval_count", 0),
+            "spans": json.dumps(
+                {name: round(ms, 1) for name, ms in trace.spans.items()}, sort_keys=True
+            ),
+        }
+        vals.update(
+            {field: trace.spans.get(name, 0.0) for name, field in SPAN_FIELDS.items()}
+        )
+        vals.update({key: value for key, value in trace.meta.items() if key in self._fields})
+        vals.update(extra)
+        try:
+            with self.env.cr.savepoint():
+                return self.sudo().create(vals)
+        except Exception as e:
+            _logger.warning("No se pudo guardar la traza: %s", str(e))
+            return self.browse()
+
+    @api.model
+    def _cron_purge_traces(self):
+        """Retención: borra las trazas más antiguas que 'trace_retention_days'."""
+        days = int(
+            self.env["ir.config_parameter"].sudo().get_param(
+                "ai_production_assistant.trace_retention_days", 30
+            )
+            or 30
+        )
+        limit = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute(
+            "DELETE FROM ai_request_trace WHERE create_date < %s", [limit]
+        )
+        _logger.info("Trazas de rendimiento purgadas: %s", self.env.cr.rowcount)
+
+
+class AIRequestTraceReport(models.Model):
+    _name = "ai.request.trace.report"
+    _description = "Percentiles de rendimiento por experto y modelo"
+    _auto = False
+    _order = "date desc"
+
+    date = fields.Date(string="Día", readonly=True)
+    endpoint = fields.Selection(
+        [("ask", "/ask"), ("ask_stream", "/ask_stream"), ("queue", "Cola")],
+        string="Origen",
+        readonly=True,
+    )
+    expert_name = fields.Char(string="Experto MoE", readonly=True)
+    model_name = fields.Char(string="Modelo", readonly=True)
+    turn_count = fields.Integer(string="Turnos", readonly=True)
+    # Percentiles calculados por día/experto/modelo/origen: al agrupar más,
+    # la vista muestra la media de los p50 y el máximo de los p95. Los del
+    # LLM solo cuentan turnos que llamaron al modelo (no aciertos de caché)
+    p50_total_ms = fields.Float(string="p50 total (ms)", aggregator="avg", readonly=True)
+    p95_total_ms = fields.Float(string="p95 total (ms)", aggregator="max", readonly=True)
+    p50_llm_ms = fields.Float(string="p50 LLM (ms)", aggregator="avg", readonly=True)
+    p95_llm_ms = fields.Float(string="p95 LLM (ms)", aggregator="max", readonly=True)
+    p50_prompt_eval_ms = fields.Float(
+        string="p50 prompt eval (ms)", aggregator="avg", readonly=True
+    )
+    p95_prompt_eval_ms = fields.Float(
+        string="p95 prompt eval (ms)", aggregator="max", readonly=True
+    )
+    p50_eval_ms = fields.Float(string="p50 eval (ms)", aggregator="avg", readonly=True)
+    p95_eval_ms = fields.Float(string="p95 eval (ms)", aggregator="max", readonly=True)
+    avg_total_ms = fields.Float(string="Media total (ms)", aggregator="avg", readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(
+            f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT min(t.id) AS id,
+                       t.create_date::date AS date,
+                       t.endpoint,
+                       COALESCE(t.expert_name, '-') AS expert_name,
+                       COALESCE(t.model_name, '-') AS model_name,
+                       count(*) AS turn_count,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY t.total_ms) AS p50_total_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY t.total_ms) AS p95_total_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY t.llm_ms)
+                           FILTER (WHERE t.llm_ms > 0) AS p50_llm_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY t.llm_ms)
+                           FILTER (WHERE t.llm_ms > 0) AS p95_llm_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY t.prompt_eval_ms)
+                           FILTER (WHERE t.prompt_eval_ms > 0)
+                           AS p50_prompt_eval_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY t.prompt_eval_ms)
+                           FILTER (WHERE t.prompt_eval_ms > 0)
+                           AS p95_prompt_eval_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY t.eval_ms)
+                           FILTER (WHERE t.eval_ms > 0) AS p50_eval_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY t.eval_ms)
+                           FILTER (WHERE t.eval_ms > 0) AS p95_eval_ms,
+                       avg(t.total_ms) AS avg_total_ms
+                  FROM ai_request_trace t
+                 WHERE t.outcome != 'queued'
+                 GROUP BY t.create_date::date, t.endpoint,
+                          COALESCE(t.expert_name, '-'), COALESCE(t.model_name, '-')
+            )
+            """
+        )
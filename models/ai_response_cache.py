@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class AIResponseCache(models.Model):
+    _name = "ai.response.cache"
+    _description = "Caché de respuestas del LLM (herramientas de consulta)"
+    _order = "last_used desc"
+
+    key = fields.Char(string="Clave (hash)", required=True, index=True, readonly=True)
+    model_name = fields.Char(string="Modelo", readonly=True)
+    expert_name = fields.Char(string="Experto MoE", readonly=True)
+    query = fields.Text(string="Consulta", readonly=True)
+    action_json = fields.Text(string="Acción (JSON)", readonly=True)
+    hit_count = fields.Integer(string="Aciertos", default=0, readonly=True)
+    last_used = fields.Datetime(
+        string="Último uso", default=fields.Datetime.now, readonly=True
+    )
+
+    _key_unique = models.Constraint(
+        "UNIQUE(key)", "La clave de caché debe ser única."
+    )
+
+    @api.model
+    def _lookup(self, key, ttl):
+        """Devuelve la acción cacheada (dict) o None si no existe o ha caducado."""
+        entry = self.search([("key", "=", key)], limit=1)
+        if not entry:
+            return None
+        now = fields.Datetime.now()
+        if ttl and entry.create_date < now - timedelta(seconds=ttl):
+            entry.unlink()
+            return None
+        # hit_count/last_used se actualizan en lote (_flush_hits)
+        try:
+            return {"action": json.loads(entry.action_json), "expert_name": entry.expert_name}
+        except (TypeError, ValueError):
+            return None
+
+    @api.model
+    def _flush_hits(self, hits):
+        """
+        Suma los aciertos acumulados en memoria ({clave: n}) en una
+        transacción propia y corta, con incrementos atómicos.
+        """
+        if not hits:
+            return
+        keys, counts = zip(*hits.items())
+        with self.env.registry.cursor() as cr:
+            cr.execute(
+                """
+                UPDATE ai_response_cache c
+                   SET hit_count = c.hit_count + h.n, last_used = %s
+                  FROM unnest(%s::varchar[], %s::int[]) AS h(key, n)
+                 WHERE c.key = h.key
+                """,
+                [fields.Datetime.now(), list(keys), list(counts)],
+            )
+
+    @api.model
+    def _store(self, key, vals, max_entries):
+        """Guarda una entrada y aplica la expulsión LRU por encima del máximo."""
+        vals = dict(vals, key=key, last_used=fields.Datetime.now())
+        try:
+            # Dos peticiones idénticas concurrentes: la segunda no debe abortar
+            with self.env.cr.savepoint():
+                self.create(vals)
+        except Exception as e:
+            _logger.debug("Entrada de caché %s no guardada: %s", key, str(e))
+            return
+        if max_entries and self.search_count([]) > max_entries:
+            stale = self.search([], order="last_used desc", offset=max_entries)
+            stale.unlink()
+
+    @api.model
+    def _flush(self):
+        """Vacía la caché (p. ej. al cambiar la configuración de Ollama)."""
+        self.search([]).unlink()
+        _logger.info("Caché de respuestas del LLM vaciada")
+
+    def action_flush_cache(self):
+        self._flush()
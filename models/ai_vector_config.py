@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
+import logging
+import time
+
 import requests
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.exceptions import ValidationError
+from ..services import metrics
 from ..services.rag_service import VectorRagService
 
+_logger = logging.getLogger(__name__)
+
 
 class AIVectorConfig(models.Model):
     _name = "ai.vector.config"
@@ -30,12 +36,39 @@ class AIVectorConfig(models.Model):
                 self.search([("active", "=", True)]).write({"active": False})
                 break
 
-        return super().create(vals_list)
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return records
 
     def write(self, vals):
         if vals.get("active"):
             self.search([("id", "not in", self.ids)]).write({"active": False})
-        return super().write(vals)
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.model
+    @tools.ormcache("self.env.company.id")
+    def _get_service_config(self):
+        """
+        Configuración activa para VectorRagService, en la caché del registro
+        (se invalida al crear, modificar o borrar configuraciones).
+        Returns: dict con url, collection_name y api_key, o None.
+        """
+        config = self.sudo().search([("active", "=", True)], limit=1)
+        if not config:
+            return None
+        return {
+            "id": config.id,
+            "url": config.url,
+            "collection_name": config.collection_name,
+            "api_key": config.api_key,
+        }
 
     @api.constrains("url")
     def _check_url(self):
@@ -84,8 +117,17 @@ class AIVectorConfig(models.Model):
         last_docs = rag.get_param("ai_production_assistant.rag_docs_last_indexed")
         last_mail = rag.get_param("ai_production_assistant.rag_mail_last_indexed")
         service = VectorRagService(self.env)
+        if not service.is_available() or not service.ollama.is_available():
+            _logger.info("Indexación RAG omitida: Qdrant u Ollama no disponibles")
+            return
+        started = time.monotonic()
         docs_count = service.index_documents(last_docs or None)
+        metrics.RAG_INDEX_DURATION.observe(time.monotonic() - started, source="documents")
+        metrics.RAG_INDEXED.inc(docs_count or 0, source="documents")
+        started = time.monotonic()
         mail_count = service.index_mail(last_mail or None)
+        metrics.RAG_INDEX_DURATION.observe(time.monotonic() - started, source="mail")
+        metrics.RAG_INDEXED.inc(mail_count or 0, source="mail")
 
         now = fields.Datetime.now().isoformat()
         if docs_count:
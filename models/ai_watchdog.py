@@ -1,13 +1,38 @@
 # -*- coding: utf-8 -*-
+import json
 import logging
+import time
+from datetime import datetime, time as dt_time, timedelta
 
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
+from odoo.exceptions import ValidationError
 from odoo.tools.safe_eval import safe_eval
 
+from ..services import metrics
 from ..services.agent_core import AgentCore
 
 _logger = logging.getLogger(__name__)
 
+# Campos de fecha límite, por orden de preferencia
+DATE_FIELDS = ["date_deadline", "commitment_date", "date_planned"]
+# Registros (retrasados, sin stock...) que se citan en la notificación
+NOTIFY_SAMPLE = 3
+# write_date es el inicio de la transacción que escribe: una transacción
+# larga puede confirmar después de una ejecución con una fecha anterior
+WATERMARK_OVERLAP = timedelta(minutes=5)
+# Campos que cambian qué registros están en alerta: fuerzan revisión completa
+SCAN_CONFIG_FIELDS = {"model_id", "check_type", "domain_filter", "warning_threshold", "incremental"}
+RUN_RETENTION_DAYS = 30
+# Campos que cambian qué modelos se escuchan (_event_models)
+EVENT_CONFIG_FIELDS = {"active", "event_trigger", "event_debounce", "model_id", "check_type"}
+# Con disparo por eventos, el cron periódico solo revisa si lleva este tiempo sin ejecutar
+SAFETY_NET_INTERVAL = timedelta(hours=1)
+# Modelos de producto: el stock cambia en quants y reglas, no en el producto
+STOCK_EVENT_MODELS = ("stock.quant", "stock.warehouse.orderpoint")
+
+# base de datos -> instante (monotonic) de la ejecución por eventos ya programada
+_scheduled = {}
+
 
 class AiWatchdog(models.Model):
     _name = "ai.watchdog"
@@ -32,11 +57,166 @@ class AiWatchdog(models.Model):
 
     last_check = fields.Datetime(string="Última Verificación")
 
+    # Evaluación incremental: solo se revisan los registros en alerta y los
+    # modificados (write_date) desde la última ejecución
+    incremental = fields.Boolean(
+        string="Evaluación incremental",
+        default=True,
+        help="Entre revisiones completas solo se evalúan los registros modificados desde "
+        "la última ejecución, los que ya estaban en alerta y (en retrasos) los que han "
+        "vencido desde entonces. Los dominios con fechas relativas solo se recalculan "
+        "por completo en la revisión completa.",
+    )
+    full_scan_hours = fields.Integer(string="Revisión completa cada (horas)", default=24)
+    last_full_scan = fields.Datetime(string="Última revisión completa", readonly=True)
+    offending_ids = fields.Text(string="Registros en alerta (JSON)", readonly=True)
+    offending_count = fields.Integer(string="Registros en alerta", readonly=True)
+    run_ids = fields.One2many("ai.watchdog.run", "watchdog_id", string="Ejecuciones")
+
+    # Disparo por eventos: create/write en el modelo vigilado programan una
+    # ejecución incremental pasados 'event_debounce' segundos
+    event_trigger = fields.Boolean(
+        string="Disparar por cambios",
+        help="Evalúa el watchdog poco después de cada alta o modificación en el modelo "
+        "vigilado (en stock de productos, también en quants y reglas de "
+        "reabastecimiento). El cron periódico queda como red de seguridad. "
+        "Requiere evaluación incremental: solo se avisa de registros nuevos en alerta.",
+    )
+    event_debounce = fields.Integer(
+        string="Agrupar cambios (segundos)",
+        default=30,
+        help="Los cambios dentro de esta ventana se evalúan juntos en una sola ejecución.",
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        if any(records.mapped("event_trigger")):
+            self.env.registry.clear_cache()
+        return records
+
+    def write(self, vals):
+        if set(vals) & SCAN_CONFIG_FIELDS:
+            vals = dict(vals, last_full_scan=False)
+        event_config = set(vals) & EVENT_CONFIG_FIELDS and (
+            vals.get("event_trigger") or any(self.mapped("event_trigger"))
+        )
+        result = super().write(vals)
+        if event_config:
+            # Invalida _event_models en todos los workers (sin recargar el registro)
+            self.env.registry.clear_cache()
+        return result
+
+    def unlink(self):
+        event_config = any(self.mapped("event_trigger"))
+        result = super().unlink()
+        if event_config:
+            self.env.registry.clear_cache()
+        return result
+
+    @api.constrains("event_trigger", "incremental")
+    def _check_event_trigger(self):
+        # Sin el conjunto en alerta materializado cada micro-lote volvería a
+        # avisar de todos los registros
+        for rec in self:
+            if rec.event_trigger and not rec.incremental:
+                raise ValidationError(
+                    self.env._("El disparo por cambios requiere evaluación incremental.")
+                )
+
+    @api.model
+    @tools.ormcache()
+    def _event_models(self):
+        """
+        Modelo -> debounce (s) de los watchdogs activos disparados por
+        eventos. Se consulta en cada create/write (ver Base), así que va
+        cacheado en el registro.
+        """
+        watched = {}
+        for watchdog in self.sudo().search([("event_trigger", "=", True)]):
+            debounce = max(watchdog.event_debounce, 1)
+            for name in watchdog._watched_models():
+                watched[name] = min(watched.get(name, debounce), debounce)
+        return watched
+
+    def _watched_models(self):
+        """Modelos cuyos cambios pueden cambiar el resultado del watchdog."""
+        self.ensure_one()
+        names = [self.model_id.model]
+        if self.check_type == "stock_level" and names[0] in (
+            "product.product",
+            "product.template",
+        ):
+            names += STOCK_EVENT_MODELS
+        return names
+
+    def _has_changes(self):
+        """Algún modelo vigilado tiene altas o cambios desde la última ejecución."""
+        self.ensure_one()
+        if not self.last_check:
+            return True
+        return any(
+            self.env[name]
+            .sudo()
+            .with_context(active_test=False)
+            .search_count([("write_date", ">=", self._since())], limit=1)
+            for name in self._watched_models()
+            if name in self.env
+        )
+
+    @api.model
+    def _schedule_event_run(self, debounce):
+        """
+        Programa la ejecución por eventos dentro de ``debounce`` segundos.
+        Los cambios hasta entonces no programan otra: esa ejecución los
+        recoge por write_date.
+        """
+        now = time.monotonic()
+        key = self.env.cr.dbname
+        postcommit = self.env.cr.postcommit
+        if _scheduled.get(key, 0) > now or postcommit.data.get("ai_watchdog_event"):
+            return
+        cron = self.env.ref(
+            "ai_production_assistant.ir_cron_ai_watchdog_events", raise_if_not_found=False
+        )
+        if not cron:
+            return
+        postcommit.data["ai_watchdog_event"] = True
+        cron.sudo()._trigger(at=fields.Datetime.now() + timedelta(seconds=debounce))
+
+        # Si la transacción se revierte, el disparo se descarta y la ventana
+        # no debe silenciar el siguiente cambio
+        @postcommit.add
+        def _debounce():
+            _scheduled[key] = now + debounce
+
     @api.model
     def _cron_run_watchdogs(self):
         """Ejecuta todos los watchdogs activos."""
-        watchdogs = self.search([("active", "=", True)])
+        # Las llamadas al LLM de los watchdogs van por detrás del chat
+        watchdogs = self.with_context(ai_llm_priority="background").search(
+            [("active", "=", True)]
+        )
+        safety_limit = fields.Datetime.now() - SAFETY_NET_INTERVAL
         for watchdog in watchdogs:
+            # Los disparados por eventos solo se revisan aquí como red de seguridad
+            if watchdog.event_trigger and watchdog.last_check and watchdog.last_check > safety_limit:
+                continue
+            try:
+                watchdog.run_check()
+            except Exception as e:
+                _logger.error("Error en watchdog %s: %s", watchdog.name, str(e))
+        self.env["ai.watchdog.run"]._purge(RUN_RETENTION_DAYS)
+
+    @api.model
+    def _cron_run_event_watchdogs(self):
+        """Micro-lote tras cambios en modelos vigilados (ver _schedule_event_run)."""
+        watchdogs = self.with_context(
+            ai_llm_priority="background", ai_watchdog_event=True
+        ).search([("active", "=", True), ("event_trigger", "=", True)])
+        # Solo los watchdogs cuyos modelos han cambiado (el disparo puede venir
+        # de cualquier worker: se mira write_date, no un estado del proceso)
+        for watchdog in watchdogs.filtered(lambda w: w._has_changes()):
             try:
                 watchdog.run_check()
             except Exception as e:
@@ -45,49 +225,178 @@ class AiWatchdog(models.Model):
     def run_check(self):
         self._run_check()
 
+    def action_full_scan(self):
+        """Descarta el estado incremental: la próxima ejecución revisa todo."""
+        self.write({"last_full_scan": False})
+        self.run_check()
+
     def _run_check(self):
         """Ejecuta la verificación de un watchdog específico."""
         self.ensure_one()
         agent = AgentCore(self.env)
+        started = time.monotonic()
+        now = fields.Datetime.now()
+        full = self._needs_full_scan(now)
+        previous = self._offenders()
 
+        result = None
         if self.check_type == "date_delay":
-            self._check_delays(agent)
+            result = self._check_delays(agent, full)
         elif self.check_type == "stock_level":
-            self._check_stock(agent)
+            result = self._check_stock(agent, full)
         elif self.check_type == "custom_domain":
-            self._check_custom(agent)
+            result = self._check_custom(agent, full)
 
-        self.last_check = fields.Datetime.now()
+        duration = time.monotonic() - started
+        metrics.WATCHDOG_DURATION.observe(
+            duration, watchdog=self.name, check_type=self.check_type
+        )
+        vals = {"last_check": now}
+        if result is not None:
+            offenders, count, scanned = result
+            vals.update(
+                # Sin modo incremental no se guarda el conjunto, solo la cuenta
+                offending_ids=json.dumps(sorted(offenders)) if offenders is not None else False,
+                offending_count=count,
+            )
+            if full:
+                vals["last_full_scan"] = now
+            self.env["ai.watchdog.run"].create(
+                {
+                    "watchdog_id": self.id,
+                    "mode": "full" if full else "incremental",
+                    "scanned_count": scanned,
+                    "offending_count": count,
+                    "new_count": len(offenders - previous) if offenders is not None else 0,
+                    "duration_ms": duration * 1000,
+                }
+            )
+        self.write(vals)
 
-    def _check_delays(self, agent):
+    def _needs_full_scan(self, now):
+        return (
+            not self.incremental
+            or not self.last_check
+            or not self.last_full_scan
+            or self.offending_ids is False
+            or now - self.last_full_scan >= timedelta(hours=self.full_scan_hours or 24)
+        )
+
+    def _offenders(self):
+        """Conjunto materializado de ids en alerta de la última ejecución."""
+        return set(json.loads(self.offending_ids or "[]"))
+
+    def _should_notify(self, offenders, count):
+        # Las ejecuciones por eventos solo avisan si aparecen registros nuevos
+        if self.env.context.get("ai_watchdog_event") and offenders is not None:
+            return bool(offenders - self._offenders())
+        return bool(count)
+
+    def _since(self):
+        return self.last_check - WATERMARK_OVERLAP
+
+    def _filter_domain(self):
+        if not self.domain_filter:
+            return []
+        try:
+            return list(safe_eval(self.domain_filter))
+        except Exception as e:
+            _logger.warning("Dominio inválido en watchdog %s: %s", self.name, str(e))
+            return []
+
+    def _changed_ids(self, Model):
+        """Registros modificados (o archivados) desde la última ejecución."""
+        return set(
+            Model.with_context(active_test=False)
+            .search([("write_date", ">=", self._since())])
+            .ids
+        )
+
+    def _evaluate(self, Model, domain, full, extra_candidates=()):
+        """
+        Returns: (ids que cumplen ``domain`` o None, cuántos, registros revisados).
+        Sin modo incremental solo se cuentan (search_count), sin cargar ids.
+        En la revisión completa del modo incremental se cargan los ids para
+        materializar el conjunto; entre revisiones solo se evalúan los que
+        ya estaban en alerta, los modificados desde la última ejecución y
+        ``extra_candidates``.
+        """
+        if full:
+            scanned = Model.search_count(self._filter_domain())
+            if not self.incremental:
+                return None, Model.search_count(domain), scanned
+            offenders = set(Model.search(domain).ids)
+            return offenders, len(offenders), scanned
+        candidates = self._offenders() | self._changed_ids(Model) | set(extra_candidates)
+        if not candidates:
+            return set(), 0, 0
+        offenders = set(Model.search(domain + [("id", "in", list(candidates))]).ids)
+        return offenders, len(offenders), len(candidates)
+
+    @api.model
+    def _delay_domain(self, Model, since=None):
+        """
+        Dominio de registros retrasados: cada registro se juzga por el
+        primero de DATE_FIELDS que tenga informado (mismo criterio que la
+        revisión registro a registro anterior, pero resuelto en SQL).
+        Con ``since`` (fecha), solo los que han vencido desde ese día.
+        Returns: (dominio, campo para ordenar) o ([], None) si el modelo no
+        tiene ninguno de esos campos almacenado.
+        """
+        today = fields.Date.today()
+
+        def bound(field, day):
+            if Model._fields[field].type == "datetime":
+                return fields.Datetime.to_string(datetime.combine(day, dt_time.min))
+            return fields.Date.to_string(day)
+
+        candidates = [
+            name
+            for name in DATE_FIELDS
+            if name in Model._fields
+            and Model._fields[name].store
+            and Model._fields[name].type in ("date", "datetime")
+        ]
+        if not candidates:
+            return [], None
+        branches = []
+        for i, name in enumerate(candidates):
+            # Los campos anteriores vacíos y este informado y vencido
+            leaves = [(prev, "=", False) for prev in candidates[:i]]
+            leaves += [(name, "!=", False), (name, "<", bound(name, today))]
+            if since:
+                leaves.append((name, ">=", bound(name, since)))
+            branches.append(["&"] * (len(leaves) - 1) + leaves)
+        domain = ["|"] * (len(branches) - 1)
+        for branch in branches:
+            domain += branch
+        return domain, candidates[0]
+
+    def _check_delays(self, agent, full=True):
         """Verifica retrasos en modelos con fecha límite."""
         model_name = self.model_id.model
-        domain = []
+        Model = self.env[model_name]
+        delay_domain, order_field = self._delay_domain(Model)
+        if not delay_domain:
+            return None
+        domain = self._filter_domain() + delay_domain
 
-        if self.domain_filter:
-            try:
-                domain += safe_eval(self.domain_filter)
-            except Exception as e:
-                _logger.warning("Dominio inválido en watchdog %s: %s", self.name, str(e))
+        # Vencidos desde la última ejecución sin haberse modificado
+        transitions = []
+        since = self._since().date() if not full else None
+        if since and since < fields.Date.today():
+            since_domain, _order = self._delay_domain(Model, since=since)
+            transitions = Model.search(self._filter_domain() + since_domain).ids
+        offenders, count, scanned = self._evaluate(Model, domain, full, transitions)
 
-        records = self.env[model_name].search(domain)
-        delayed = []
-        today = fields.Date.today()
-        date_fields = ["date_deadline", "commitment_date", "date_planned"]
-
-        for rec in records:
-            for field in date_fields:
-                if field in rec._fields and rec[field]:
-                    date_value = rec[field]
-                    if hasattr(date_value, "date"):
-                        date_value = date_value.date()
-                    if date_value < today:
-                        delayed.append(rec)
-                    break
+        delayed = (
+            Model.search(domain, limit=NOTIFY_SAMPLE, order=f"{order_field} asc")
+            if self._should_notify(offenders, count)
+            else []
+        )
 
         if delayed:
-            count = len(delayed)
-            names = ", ".join([r.display_name for r in delayed[:3]])
+            names = ", ".join([r.display_name for r in delayed])
             title = f"⚠️ {count} Retrasos en {self.name}"
             body = f"<p>Se han detectado {count} registros retrasados: <b>{names}</b>...</p>"
 
@@ -101,33 +410,60 @@ class AiWatchdog(models.Model):
                     notification_type="warning",
                     action_payload=action_payload,
                 )
+        return offenders, count, scanned
 
-    def _check_stock(self, agent):
+    def _check_stock(self, agent, full=True):
         model_name = self.model_id.model
-        domain = []
-        if self.domain_filter:
-            try:
-                domain += safe_eval(self.domain_filter)
-            except Exception as e:
-                _logger.warning("Dominio inválido en watchdog %s: %s", self.name, str(e))
-
-        records = self.env[model_name].search(domain)
-        low_stock = []
+        domain = self._filter_domain()
         threshold = self.warning_threshold or 0
+        if model_name in ("product.product", "product.template"):
+            if model_name == "product.template":
+                domain = [("product_tmpl_id", "any", domain)]
+            product_ids = None if full else self._stock_candidates()
+            shortages, scanned = self._stock_shortages(domain, threshold, product_ids)
+            # La agregación ya da todas las faltas: el conjunto solo se guarda en incremental
+            offenders = (
+                {item["product_id"] for item in shortages} if self.incremental else None
+            )
+            count = len(shortages)
+            names = ", ".join(
+                "%s (%g/%g)" % (product.display_name, item["qty"], item["min_qty"])
+                for item, product in zip(
+                    shortages[:NOTIFY_SAMPLE],
+                    self.env["product.product"].browse(
+                        [item["product_id"] for item in shortages[:NOTIFY_SAMPLE]]
+                    ),
+                )
+            )
+            body = f"<p>{count} productos bajo su mínimo: <b>{names}</b>...</p>"
+        else:
+            # Otros modelos (p. ej. stock.quant): campo de cantidad almacenado
+            Model = self.env[model_name]
+            qty_field = next(
+                (
+                    name
+                    for name in ("qty_available", "quantity")
+                    if name in Model._fields and Model._fields[name].store
+                ),
+                None,
+            )
+            if not qty_field:
+                _logger.warning(
+                    "Watchdog %s: %s no tiene cantidad almacenada", self.name, model_name
+                )
+                return None
+            domain += [(qty_field, "<=", threshold)]
+            offenders, count, scanned = self._evaluate(Model, domain, full)
+            records = (
+                Model.search(domain, limit=NOTIFY_SAMPLE, order=f"{qty_field} asc")
+                if count
+                else Model
+            )
+            names = ", ".join(records.mapped("display_name"))
+            body = f"<p>{count} registros con stock ≤ {threshold}: <b>{names}</b>...</p>"
 
-        for rec in records:
-            qty_field = "qty_available" if "qty_available" in rec._fields else None
-            if not qty_field and "quantity" in rec._fields:
-                qty_field = "quantity"
-            if qty_field:
-                if rec[qty_field] <= threshold:
-                    low_stock.append(rec)
-
-        if low_stock:
-            count = len(low_stock)
-            names = ", ".join([r.display_name for r in low_stock[:3]])
+        if self._should_notify(offenders, count):
             title = f"⚠️ Stock crítico en {self.name}"
-            body = f"<p>{count} registros con stock ≤ {threshold}: <b>{names}</b>...</p>"
             users = self.env["res.users"].search([("share", "=", False)])
             for user in users:
                 agent.create_notification(
@@ -137,20 +473,92 @@ class AiWatchdog(models.Model):
                     notification_type="warning",
                     action_payload={"tool": "search_products", "params": {"name": ""}},
                 )
+        return offenders, count, scanned
 
-    def _check_custom(self, agent):
-        model_name = self.model_id.model
-        domain = []
-        if self.domain_filter:
-            try:
-                domain += safe_eval(self.domain_filter)
-            except Exception as e:
-                _logger.warning("Dominio inválido en watchdog %s: %s", self.name, str(e))
+    def _stock_candidates(self):
+        """
+        Productos a revisar en modo incremental: los que estaban bajo mínimo
+        y los que tienen quants, reglas de reabastecimiento o ficha
+        modificados desde la última ejecución.
+        """
+        since = self._since()
+        candidates = self._offenders() | self._changed_ids(self.env["product.product"])
+        for model in ("stock.quant", "stock.warehouse.orderpoint"):
+            candidates |= {
+                product.id
+                for (product,) in self.env[model]._read_group(
+                    [("write_date", ">=", since)], ["product_id"]
+                )
+            }
+        return candidates
+
+    @api.model
+    def _stock_shortages(self, product_domain, threshold=0, product_ids=None):
+        """
+        Productos almacenables por debajo de su mínimo, calculado por
+        conjuntos: una agregación de stock.quant en ubicaciones internas y
+        otra de los mínimos de las reglas de reabastecimiento. Sin regla,
+        el mínimo es ``threshold``. Un producto está en falta si su
+        cantidad es <= su mínimo. ``product_ids`` limita la revisión a esos
+        productos (modo incremental).
+        Returns: (lista de dicts (product_id, qty, min_qty, shortage)
+        ordenada de mayor a menor falta, productos revisados).
+        """
+        Product = self.env["product.product"]
+        product_domain = list(product_domain)
+        if "is_storable" in Product._fields:
+            product_domain.append(("is_storable", "=", True))
+        scope = []
+        if product_ids is not None:
+            if not product_ids:
+                return [], 0
+            scope = [("product_id", "in", list(product_ids))]
+            product_domain.append(("id", "in", list(product_ids)))
+        product_ids = Product.search(product_domain).ids
+        if not product_ids:
+            return [], 0
+
+        quantities = {
+            product.id: qty
+            for product, qty in self.env["stock.quant"]._read_group(
+                [("location_id.usage", "=", "internal")] + scope,
+                ["product_id"],
+                ["quantity:sum"],
+            )
+        }
+        minimums = {
+            product.id: min_qty
+            for product, min_qty in self.env["stock.warehouse.orderpoint"]._read_group(
+                [("location_id.usage", "=", "internal")] + scope,
+                ["product_id"],
+                ["product_min_qty:sum"],
+            )
+        }
 
-        records = self.env[model_name].search(domain)
-        if records:
-            count = len(records)
-            names = ", ".join([r.display_name for r in records[:3]])
+        shortages = []
+        for product_id in product_ids:
+            qty = quantities.get(product_id, 0.0)
+            min_qty = minimums.get(product_id, threshold)
+            if qty <= min_qty:
+                shortages.append(
+                    {
+                        "product_id": product_id,
+                        "qty": qty,
+                        "min_qty": min_qty,
+                        "shortage": min_qty - qty,
+                    }
+                )
+        shortages.sort(key=lambda item: (-item["shortage"], item["qty"]))
+        return shortages, len(product_ids)
+
+    def _check_custom(self, agent, full=True):
+        model_name = self.model_id.model
+        Model = self.env[model_name]
+        domain = self._filter_domain()
+        offenders, count, scanned = self._evaluate(Model, domain, full)
+        if self._should_notify(offenders, count):
+            records = Model.search(domain, limit=NOTIFY_SAMPLE)
+            names = ", ".join(records.mapped("display_name"))
             title = f"⚠️ Alerta en {self.name}"
             body = f"<p>{count} registros cumplen el dominio: <b>{names}</b>...</p>"
             users = self.env["res.users"].search([("share", "=", False)])
@@ -161,6 +569,7 @@ class AiWatchdog(models.Model):
                     body,
                     notification_type="warning",
                 )
+        return offenders, count, scanned
 
     def _action_payload_for_model(self, model_name):
         if model_name == "mrp.production":
@@ -172,3 +581,51 @@ class AiWatchdog(models.Model):
         if model_name == "product.product":
             return {"tool": "search_products", "params": {"name": ""}}
         return None
+
+
+class AiWatchdogRun(models.Model):
+    _name = "ai.watchdog.run"
+    _description = "Ejecución de un watchdog"
+    _order = "id desc"
+
+    watchdog_id = fields.Many2one(
+        "ai.watchdog", string="Watchdog", required=True, ondelete="cascade", index=True
+    )
+    mode = fields.Selection(
+        [("full", "Completa"), ("incremental", "Incremental")],
+        string="Modo",
+        readonly=True,
+    )
+    scanned_count = fields.Integer(string="Registros revisados", readonly=True)
+    offending_count = fields.Integer(string="En alerta", readonly=True)
+    new_count = fields.Integer(string="Nuevos en alerta", readonly=True)
+    duration_ms = fields.Float(string="Duración (ms)", digits=(16, 1), readonly=True)
+
+    @api.model
+    def _purge(self, days):
+        limit = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute("DELETE FROM ai_watchdog_run WHERE create_date < %s", [limit])
+
+
+class Base(models.AbstractModel):
+    """create/write de cualquier modelo avisan a los watchdogs por eventos."""
+
+    _inherit = "base"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records._ai_watchdog_changed()
+        return records
+
+    def write(self, vals):
+        result = super().write(vals)
+        self._ai_watchdog_changed()
+        return result
+
+    def _ai_watchdog_changed(self):
+        if not self.env.registry.ready:
+            return
+        debounce = self.env["ai.watchdog"]._event_models().get(self._name)
+        if debounce:
+            self.env["ai.watchdog"]._schedule_event_run(debounce)
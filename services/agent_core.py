@@ -7,12 +7,20 @@ Arquitectura limpia y optimizada para modelos locales (gemma3:4b)
 import json
 import re
 import logging
+import time
 from datetime import datetime
 
+from .intent_router import fast_path
+from .json_extractor import extract_json
 from .ollama_service import OllamaService
+from .prompt_budget import PromptBudget, RESPONSE_TOKENS
 from .moe_router import MoERouter
 from .sales_purchase_tools import execute_sale_orders, execute_purchase_orders
 from .rag_service import VectorRagService
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .single_flight import SingleFlight, make_key, normalize_params
+from . import tracing
 
 _logger = logging.getLogger(__name__)
 
@@ -73,6 +81,70 @@ TOOLS = {
 }
 
 
+# Herramientas de solo lectura: seguras para auto-ejecución y cacheables
+READ_TOOLS = (
+    "search_products",
+    "search_mrp_orders",
+    "search_sale_orders",
+    "search_purchase_orders",
+    "search_docs",
+    "search_mail",
+)
+
+# Consultas idénticas simultáneas (p. ej. muchos usuarios pulsando la misma
+# notificación) se resuelven con una sola ejecución
+TOOL_FLIGHTS = SingleFlight("tools")
+
+# Tipos JSON de los parámetros (por defecto string) para la salida estructurada
+PARAM_SCHEMAS = {
+    "price": {"type": "number"},
+    "cost": {"type": "number"},
+    "quantity": {"type": "number"},
+    "product_id": {"type": "integer"},
+    "components": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {
+                "product_id": {"type": "integer"},
+                "qty": {"type": "number"},
+            },
+            "required": ["product_id", "qty"],
+        },
+    },
+}
+
+# Contadores del proceso: cómo se interpretaron las respuestas del modelo
+PARSE_STATS = {"structured": 0, "structured_failures": 0, "fallback_scans": 0}
+
+
+def build_tool_schema(expert_tools):
+    """
+    JSON schema para el parámetro ``format`` de Ollama: una llamada
+    {"tool", "params"} a alguna de las herramientas del experto.
+    Las respuestas de texto van por la herramienta "message".
+    """
+    variants = []
+    for name in expert_tools:
+        param_names = TOOLS.get(name, {}).get("params", [])
+        params = {
+            "type": "object",
+            "properties": {
+                p: PARAM_SCHEMAS.get(p, {"type": "string"}) for p in param_names
+            },
+        }
+        if name == "message":
+            params["required"] = ["content"]
+        variants.append(
+            {
+                "type": "object",
+                "properties": {"tool": {"enum": [name]}, "params": params},
+                "required": ["tool", "params"],
+            }
+        )
+    return {"anyOf": variants}
+
+
 # ============================================================================
 # SYSTEM PROMPT (CORTO Y EFECTIVO)
 # ============================================================================
@@ -93,7 +165,7 @@ HERRAMIENTAS DISPONIBLES:
 - message: responder texto normal.
 
 REGLAS IMPORTANTES:
-1. Si te preguntan la hora, responde con la fecha y hora indicadas arriba.
+1. Si te preguntan la hora, responde con la fecha y hora indicadas en DATOS DEL TURNO.
 2. Para consultas de búsqueda (search_products, search_mrp_orders, search_sale_orders, search_purchase_orders, search_docs, search_mail), responde SOLO con el JSON de la herramienta.
 3. Para acciones de creación, espera confirmación del usuario.
 4. Si faltan datos para una herramienta (ej: precio), PREGUNTA al usuario antes de generar el JSON. NO inventes datos.
@@ -104,6 +176,19 @@ REGLAS IMPORTANTES:
 {context}"""
 
 
+_QUOTED_NAME_RE = re.compile(r"\"([^\"]+)\"|'([^']+)'")
+_PRICE_RE = re.compile(r"(?:venta|precio|pvp|importe)\s*[:=]?\s*([0-9]+(?:[\.,][0-9]+)?)")
+_COST_RE = re.compile(r"(?:coste|costo|cost)\s*[:=]?\s*([0-9]+(?:[\.,][0-9]+)?)")
+_NAME_RE = re.compile(r"\b(?:nombre|name|producto)\s*[:=]?\s*([^,;]+)", re.IGNORECASE)
+_NAME_FILLER_RE = re.compile(r"\b(crear|crea|producto|un|una)\b", re.IGNORECASE)
+_NAME_END_RE = re.compile(r"\b(venta|precio|pvp|coste|costo|cost|cantidad|tipo)\b", re.IGNORECASE)
+_INVENTORY_RE = re.compile(
+    r"(?:inventario|stock|existencias|cantidad|cuantos)\s*(?:de|del|de la|de los|de las)?\s*([^,;\n]+)",
+    re.IGNORECASE,
+)
+
+
+@fast_path("create_product")
 def parse_create_product_prompt(prompt):
     if not prompt:
         return None
@@ -123,10 +208,10 @@ def parse_create_product_prompt(prompt):
         .replace("‘", "'")
         .replace("=", ":")
     )
-    normalized = re.sub(r"\s+", " ", normalized).strip()
+    normalized = " ".join(normalized.split())
 
     def _extract_quoted_name(source):
-        matches = re.findall(r"\"([^\"]+)\"|'([^']+)'", source)
+        matches = _QUOTED_NAME_RE.findall(source)
         for m in matches:
             candidate = m[0] or m[1]
             candidate = candidate.strip(" .,-;:")
@@ -134,9 +219,8 @@ def parse_create_product_prompt(prompt):
                 return candidate
         return None
 
-    def _extract_number(keywords):
-        pattern = r"(?:" + "|".join(keywords) + r")\s*[:=]?\s*([0-9]+(?:[\.,][0-9]+)?)"
-        match = re.search(pattern, normalized)
+    def _extract_number(pattern):
+        match = pattern.search(normalized)
         if not match:
             return None
         value = match.group(1).replace(",", ".")
@@ -145,8 +229,8 @@ def parse_create_product_prompt(prompt):
         except Exception:
             return None
 
-    price = _extract_number(["venta", "precio", "pvp", "importe"])
-    cost = _extract_number(["coste", "costo", "cost"])
+    price = _extract_number(_PRICE_RE)
+    cost = _extract_number(_COST_RE)
 
     if price is None or cost is None:
         return None
@@ -154,21 +238,13 @@ def parse_create_product_prompt(prompt):
     name = None
     name = _extract_quoted_name(text)
     if not name:
-        name_match = re.search(
-            r"\b(?:nombre|name|producto)\s*[:=]?\s*([^,;]+)",
-            normalized,
-            flags=re.IGNORECASE,
-        )
+        name_match = _NAME_RE.search(normalized)
         if name_match:
             name = name_match.group(1).strip(" .,-;:")
 
     if not name:
-        name_part = re.sub(r"\b(crear|crea|producto|un|una)\b", "", text, flags=re.IGNORECASE).strip()
-        split_match = re.split(
-            r"\b(venta|precio|pvp|coste|costo|cost|cantidad|tipo)\b",
-            name_part,
-            flags=re.IGNORECASE,
-        )
+        name_part = _NAME_FILLER_RE.sub("", text).strip()
+        split_match = _NAME_END_RE.split(name_part)
         name = (
             split_match[0].strip(" ,.-") if split_match else name_part.strip(" ,.-")
         )
@@ -190,6 +266,7 @@ def parse_create_product_prompt(prompt):
     }
 
 
+@fast_path("inventory")
 def parse_inventory_prompt(prompt):
     if not prompt:
         return None
@@ -199,11 +276,7 @@ def parse_inventory_prompt(prompt):
     if not any(k in lower for k in keywords):
         return None
 
-    match = re.search(
-        r"(?:inventario|stock|existencias|cantidad|cuantos)\s*(?:de|del|de la|de los|de las)?\s*([^,;\n]+)",
-        lower,
-        flags=re.IGNORECASE,
-    )
+    match = _INVENTORY_RE.search(lower)
     name = None
     if match:
         name = match.group(1).strip(" .,-;:")
@@ -213,6 +286,26 @@ def parse_inventory_prompt(prompt):
     return {"tool": "search_products", "params": {"name": name or ""}}
 
 
+@fast_path("production")
+def parse_production_prompt(prompt):
+    if not prompt:
+        return None
+    lower = prompt.lower()
+    production_terms = [
+        "orden",
+        "órden",
+        "ordenes",
+        "órdenes",
+        "fabricación",
+        "fabricacion",
+        "mrp",
+        "producción",
+        "produccion",
+    ]
+    if not any(term in lower for term in production_terms):
+        return None
+    state = "delayed" if "retras" in lower else ""
+    return {"tool": "search_mrp_orders", "params": {"state": state}}
 
 
 class AgentCore:
@@ -228,7 +321,24 @@ class AgentCore:
         return self._handle_action(action, raw_response, tools_config)
 
     def execute_tool(self, tool, params):
-        return self._execute_tool(tool, params)
+        return self._execute_tool_coalesced(tool, params)
+
+    def _execute_tool_coalesced(self, tool, params):
+        """Herramientas de consulta: agrupa llamadas idénticas en curso."""
+        if tool not in READ_TOOLS:
+            with tracing.span("tool"):
+                return self._execute_tool(tool, params)
+        # Usuario y compañías permitidas en la clave: las reglas de registro
+        # cambian el resultado y no se comparte entre accesos distintos
+        key = make_key(
+            self.env.cr.dbname,
+            self.env.uid,
+            sorted(self.env.companies.ids),
+            tool,
+            normalize_params(params or {}),
+        )
+        with tracing.span("tool"):
+            return TOOL_FLIGHTS.do(key, self._execute_tool, tool, params)
 
     def create_notification(
         self,
@@ -264,66 +374,10 @@ class AgentCore:
 
     def _parse_response(self, raw_response):
         """Intenta extraer JSON de la respuesta del modelo."""
-        parsed = None
         _logger.info("Raw response: %s...", raw_response[:200])
 
-        try:
-
-            def _try_parse(candidate):
-                try:
-                    return json.loads(candidate)
-                except Exception:
-                    return None
-
-            def _find_json(text):
-                blocks = re.findall(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
-                for block in blocks:
-                    parsed_block = _try_parse(block)
-                    if parsed_block is not None:
-                        return parsed_block
-
-                starts = [i for i, ch in enumerate(text) if ch in "{["]
-                for start in starts:
-                    stack = []
-                    in_string = False
-                    escape = False
-                    for i in range(start, len(text)):
-                        ch = text[i]
-                        if in_string:
-                            if escape:
-                                escape = False
-                            elif ch == "\\":
-                                escape = True
-                            elif ch == '"':
-                                in_string = False
-                            continue
-                        if ch == '"':
-                            in_string = True
-                            continue
-                        if ch in "{[":
-                            stack.append(ch)
-                        elif ch in "}]":
-                            if not stack:
-                                break
-                            last = stack[-1]
-                            if (last == "{" and ch == "}") or (
-                                last == "[" and ch == "]"
-                            ):
-                                stack.pop()
-                                if not stack:
-                                    snippet = text[start : i + 1]
-                                    parsed_snippet = _try_parse(snippet)
-                                    if parsed_snippet is not None:
-                                        return parsed_snippet
-                                    break
-                            else:
-                                break
-                return None
-
-            parsed = _find_json(raw_response)
-
-        except Exception as e:
-            _logger.error("General error parsing response: %s", e)
+        # Primer objeto/array JSON válido (una sola pasada, ver json_extractor)
+        parsed = extract_json(raw_response)
 
         if parsed:
             _logger.info("Parsed successfully: %s", parsed)
@@ -414,43 +468,146 @@ class AgentCore:
         _logger.info("Returning as message: %s...", clean_response[:100])
         return {"tool": "message", "params": {"content": clean_response}}
 
-    def process(self, query, context="", model=None, history=None):
+    def process(
+        self, query, context="", model=None, history=None, use_cache=True, node_url=None
+    ):
         """
         Procesa una consulta del usuario, opcionalmente con historial.
         Args:
             query: Pregunta del usuario
             context: Contexto adicional
             model: Modelo Ollama a usar (opcional)
-            history: Lista de strings con historial previo
+            history: Lista de {"role", "content"} con historial previo
+            use_cache: False para ignorar la caché de respuestas en este turno
+            node_url: Nodo Ollama preferido por la sesión (opcional)
         Returns: dict con 'response' (texto) o 'action' (para aprobar)
         """
+        turn = self.prepare_turn(
+            query, context, model=model, history=history, node_url=node_url
+        )
+
+        with tracing.span("cache"):
+            cached = self.lookup_cached_result(turn, query, use_cache)
+        if cached:
+            return cached
+
+        # Llamar a Ollama con el modelo especificado
+        with tracing.span("llm"):
+            if turn["chat_mode"]:
+                reply = turn["ollama"].chat(
+                    turn["messages"],
+                    model=turn["model"],
+                    num_ctx=turn["num_ctx"],
+                    prefer_url=turn["node_url"],
+                    format=turn["format"],
+                )
+            else:
+                reply = {
+                    "response": turn["ollama"].generate(
+                        prompt=turn["prompt"],
+                        model=turn["model"],
+                        num_ctx=turn["num_ctx"],
+                        format=turn["format"],
+                    ),
+                    "node_url": None,
+                    "timings": {},
+                }
+        tracing.add_timings(reply["timings"])
+        result = self.finish_turn(reply["response"], turn)
+        result["timings"] = reply["timings"]
+        result["node_url"] = reply["node_url"]
+        self.store_cached_result(turn, query, result)
+        return result
+
+    @staticmethod
+    def stream_turn(turn):
+        """Eventos de streaming de Ollama para un turno preparado."""
+        if turn["chat_mode"]:
+            return turn["ollama"].chat_stream(
+                turn["messages"],
+                model=turn["model"],
+                num_ctx=turn["num_ctx"],
+                prefer_url=turn["node_url"],
+            )
+        return turn["ollama"].generate_stream(
+            turn["prompt"], model=turn["model"], num_ctx=turn["num_ctx"]
+        )
+
+    def lookup_cached_result(self, turn, query, use_cache=True):
+        """
+        Resultado desde la caché de respuestas o la semántica (si están
+        activas) o None.
+        """
+        if not use_cache:
+            return None
+        cache = ResponseCache(self.env)
+        if cache.enabled:
+            turn["cache_key"] = cache.key_for_turn(turn, query)
+            cached = cache.get(turn["cache_key"])
+            if cached:
+                result = self._handle_action(cached["action"], "", turn["expert_tools"])
+                result["expert_name"] = cached["expert_name"] or turn["expert_name"]
+                result["cached"] = True
+                return result
+
+        semantic = SemanticCache(self.env)
+        if semantic.enabled:
+            turn["semantic_cache"] = True
+            entry = semantic.get(turn, query)
+            if entry:
+                # Misma intención: se repite la acción con datos frescos, sin LLM
+                result = self.execute_approved_action(entry["action"])
+                if result.get("error"):
+                    return None
+                result["expert_name"] = entry["expert_name"] or turn["expert_name"]
+                result["cached"] = "semantic"
+                return result
+        return None
+
+    def store_cached_result(self, turn, query, result):
+        """Guarda en caché los turnos resueltos con una herramienta de consulta."""
+        action = result.get("action") or {}
+        if action.get("tool") not in READ_TOOLS:
+            return
+        if turn.get("cache_key"):
+            ResponseCache(self.env).put(turn["cache_key"], turn, query, action)
+        if turn.get("semantic_cache"):
+            SemanticCache(self.env).put(turn, query, action)
+
+    def prepare_turn(self, query, context="", model=None, history=None, node_url=None):
+        """
+        Enruta la consulta y construye el prompt sin llamar a Ollama.
+        El mensaje de sistema es idéntico byte a byte entre turnos del mismo
+        experto; la fecha y el contexto van al final, en el mensaje del
+        usuario, para que Ollama reutilice el prefijo ya evaluado.
+        Returns: dict con experto, herramientas, modelo, mensajes y prompt final.
+        """
         ollama = OllamaService(self.env)
         router = MoERouter(self.env)
 
         # 1. Enrutamiento MoE (Mixture of Experts)
-        expert_name, system_prompt_template, expert_tools = router.route(query)
+        with tracing.span("routing"):
+            expert_name, system_prompt_template, expert_tools = router.route(
+                query, ollama=ollama
+            )
         _logger.info("MoE Router: Query='%s' -> Expert='%s'", query, expert_name)
+        tracing.annotate(routing_method=router.method, routing_score=router.score)
 
+        build_started = time.monotonic()
         # Usar modelo especificado o el default
         target_model = model if model else ollama.model
 
-        # Construir prompt
-        # Incluir FECHA y HORA
-        now = datetime.now()
-        ctx_section = f"CONTEXTO RECUPERADO:\n{context}" if context else ""
-
         # Formatear el System Prompt del experto
         tools_desc = "\n".join([f"- {k}: {v}" for k, v in expert_tools.items()])
 
         # Construir el prompt final dinámicamente
         system = f"""{system_prompt_template}
-Fecha y Hora Actual: {now.strftime('%d/%m/%Y %H:%M')}
 
 HERRAMIENTAS DISPONIBLES:
 {tools_desc}
 
 REGLAS GLOBALES - OBLIGATORIAS:
-1. Si te preguntan la hora, responde con la fecha y hora indicadas arriba.
+1. Si te preguntan la hora, responde con la fecha y hora indicadas en DATOS DEL TURNO.
 2. Para consultas de búsqueda (search_products, search_mrp_orders, search_sale_orders, search_purchase_orders, search_docs, search_mail), responde SOLO con el JSON de la herramienta.
 3. Para acciones de creación, espera confirmación del usuario.
 4. Si faltan datos para una herramienta (ej: precio), PREGUNTA al usuario antes de generar el JSON. NO inventes datos.
@@ -460,22 +617,88 @@ REGLA CRÍTICA - INCUMPLIMIENTO CAUSA ERROR:
 6. **USAR EXACTAMENTE ESTA ESTRUCTURA JSON**: {{"tool": "nombre_herramienta", "params": {{"parametro": "valor"}}}}
 7. **NUNCA uses "parameters"** - Usa SIEMPRE "params" (sin errores de tipeo)
 8. **Verifica tu JSON antes de enviar** - Si tiene "parameters", reemplázalo por "params"
+"""
+
+        # Presupuesto de tokens: recortar contexto e historial a la ventana
+        response_tokens = int(
+            self.env["ir.config_parameter"]
+            .sudo()
+            .get_param("ai_production_assistant.response_tokens", RESPONSE_TOKENS)
+            or RESPONSE_TOKENS
+        )
+        budget = PromptBudget(ollama.num_ctx, response_tokens).fit(
+            system, context, history, query
+        )
+        _logger.info(
+            "Presupuesto prompt (expert=%s): %s / num_ctx=%s",
+            expert_name,
+            budget["tokens"],
+            budget["num_ctx"],
+        )
+        # Datos volátiles del turno (FECHA y HORA, contexto): al final
+        now = datetime.now()
+        turn_data = [f"Fecha y Hora Actual: {now.strftime('%d/%m/%Y %H:%M')}"]
+        if budget["context"]:
+            turn_data.append(f"CONTEXTO RECUPERADO:\n{budget['context']}")
+        if budget["tokens"]["dropped_history"]:
+            turn_data.append(
+                f"({budget['tokens']['dropped_history']} mensajes anteriores omitidos)"
+            )
+        turn_section = "DATOS DEL TURNO:\n" + "\n".join(turn_data)
 
-{ctx_section}"""
+        messages = [{"role": "system", "content": system}]
+        messages += budget["history"]
+        messages.append({"role": "user", "content": f"{query}\n\n{turn_section}"})
 
-        # Construir sección de historial
+        # Prompt plano equivalente para /api/generate
         history_section = ""
-        if history:
-            history_str = "\n".join(history)
+        if budget["history"]:
+            history_str = "\n".join(
+                "%s: %s" % ("Usuario" if m["role"] == "user" else "Asistente", m["content"])
+                for m in budget["history"]
+            )
             history_section = f"HISTORIAL CHAT:\n{history_str}\n"  # Se añade al prompt
 
         full_prompt = (
-            f"{system}\n\n{history_section}Usuario: {query}\nRespuesta (JSON o Texto):"
+            f"{system}\n{history_section}Usuario: {query}\n\n{turn_section}\n"
+            "Respuesta (JSON o Texto):"
         )
 
-        # Llamar a Ollama con el modelo especificado
-        raw_response = ollama.generate(prompt=full_prompt, model=target_model)
+        params = self.env["ir.config_parameter"].sudo()
+        chat_mode = params.get_param(
+            "ai_production_assistant.ollama_chat_mode", "True"
+        ) in ("True", "true", "1")
+        structured = params.get_param(
+            "ai_production_assistant.structured_output", "True"
+        ) in ("True", "true", "1")
+
+        tracing.add_since("prompt_build", build_started)
+
+        turn = {
+            "ollama": ollama,
+            "model": target_model,
+            "prompt": full_prompt,
+            "messages": messages,
+            "chat_mode": chat_mode,
+            "format": build_tool_schema(expert_tools) if structured else None,
+            "node_url": node_url,
+            "num_ctx": budget["num_ctx"],
+            "expert_name": expert_name,
+            "expert_prompt": system_prompt_template,
+            "expert_tools": expert_tools,
+        }
+        if router.query_vector is not None:
+            # La caché semántica reutiliza el embedding del enrutado
+            turn["query_vector"] = router.query_vector
+        return turn
 
+    def finish_turn(self, raw_response, turn):
+        """
+        Interpreta la respuesta cruda de Ollama para un turno preparado.
+        Los fallos del servicio (timeout, conexión, circuito abierto, error
+        HTTP) llegan como texto y se marcan con 'backend_error' para que la
+        cola los reintente.
+        """
         clean_raw = (raw_response or "").strip()
         if (
             not clean_raw
@@ -483,17 +706,44 @@ REGLA CRÍTICA - INCUMPLIMIENTO CAUSA ERROR:
             or clean_raw.startswith("❌")
             or clean_raw.startswith("⏱️")
         ):
-            return {"response": clean_raw or "Error de conexión con Ollama"}
+            return {
+                "response": clean_raw or "Error de conexión con Ollama",
+                "backend_error": True,
+            }
 
-        # Parsear respuesta
-        action = self._parse_response(raw_response)
+        # Parsear respuesta: salida estructurada (un solo json.loads) y,
+        # si no es válida o no se pidió, el escáner heurístico
+        action = None
+        with tracing.span("parse"):
+            if turn.get("format"):
+                action = self._parse_structured(clean_raw, turn["expert_tools"])
+            if action is None:
+                PARSE_STATS["fallback_scans"] += 1
+                action = self._parse_response(raw_response)
 
         # Ejecutar acción o devolver respuesta
         # Pasamos expert_tools para que _handle_action sepa qué validar si es necesario
-        result = self._handle_action(action, clean_raw, expert_tools)
-        result["expert_name"] = expert_name
+        result = self._handle_action(action, clean_raw, turn["expert_tools"])
+        result["expert_name"] = turn["expert_name"]
         return result
 
+    def _parse_structured(self, raw_response, expert_tools):
+        """Interpreta una respuesta generada con el schema de herramientas."""
+        try:
+            parsed = json.loads(raw_response)
+        except ValueError:
+            parsed = None
+        if (
+            isinstance(parsed, dict)
+            and parsed.get("tool") in expert_tools
+            and isinstance(parsed.get("params"), dict)
+        ):
+            PARSE_STATS["structured"] += 1
+            return parsed
+        PARSE_STATS["structured_failures"] += 1
+        _logger.warning("Salida estructurada no válida: %s...", raw_response[:200])
+        return None
+
     def _handle_action(self, action, raw_response, _tools_config=None):
         """Ejecuta la acción o devuelve respuesta, con validación de parámetros."""
         tool = action.get("tool", "message")
@@ -517,15 +767,7 @@ REGLA CRÍTICA - INCUMPLIMIENTO CAUSA ERROR:
             return {"response": content}
 
         # ACCIONES DE CONSULTA: Marcar como seguras para auto-ejecución
-        safe_tools = [
-            "search_products",
-            "search_mrp_orders",
-            "search_sale_orders",
-            "search_purchase_orders",
-            "search_docs",
-            "search_mail",
-        ]
-        if tool in safe_tools:
+        if tool in READ_TOOLS:
             # Devolver la acción para que el controlador la ejecute automáticamente
             return {"response": f"[{tool}] Preparando consulta...", "action": action}
 
@@ -896,7 +1138,7 @@ REGLA CRÍTICA - INCUMPLIMIENTO CAUSA ERROR:
         params = action_data.get("params") or action_data
 
         try:
-            return self._execute_tool(tool_name, params)
+            return self._execute_tool_coalesced(tool_name, params)
         except Exception as e:
             _logger.error("Error ejecutando acción aprobada: %s", str(e))
             return {"error": str(e)}
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+CircuitBreaker - Corte rápido ante backends caídos (Ollama, Qdrant)
+
+Un interruptor por URL base y proceso:
+- closed: las peticiones pasan; tras FAILURE_THRESHOLD fallos seguidos se abre.
+- open: se rechaza al instante y un hilo en segundo plano sondea el backend.
+- half_open: pasado OPEN_SECONDS se deja pasar una única petición de prueba;
+  si funciona se cierra y si falla vuelve a abrirse.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+
+from . import metrics
+
+_logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+FAILURE_THRESHOLD = 3
+OPEN_SECONDS = 30
+PROBE_INTERVAL = 10
+PROBE_TIMEOUT = 3
+
+_lock = threading.Lock()
+_breakers = {}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Petición rechazada sin llegar a la red: el circuito está abierto."""
+
+
+class CircuitBreaker:
+    def __init__(self, url, probe_path):
+        self.url = url
+        self.probe_path = probe_path
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def is_available(self):
+        """Indica si se aceptaría una petición (sin reservar la de prueba)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= OPEN_SECONDS
+        return not self._trial
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= OPEN_SECONDS:
+                self.state = HALF_OPEN
+                self._trial = False
+            if self.state == HALF_OPEN and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                _logger.info("Circuito %s cerrado: backend disponible", self.url)
+            self.state = CLOSED
+            self.failures = 0
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= FAILURE_THRESHOLD
+            ):
+                self._open()
+
+    def _open(self):
+        if self.state != OPEN:
+            _logger.warning(
+                "Circuito %s abierto tras %s fallos", self.url, self.failures
+            )
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._trial = False
+        if not self._probing:
+            self._probing = True
+            threading.Thread(
+                target=self._probe_loop, name="ai-breaker-probe", daemon=True
+            ).start()
+
+    def _probe_loop(self):
+        """Sondea el backend mientras el circuito no esté cerrado."""
+        try:
+            while self.state != CLOSED:
+                time.sleep(PROBE_INTERVAL)
+                try:
+                    res = requests.get(
+                        f"{self.url}{self.probe_path}",
+                        timeout=PROBE_TIMEOUT,
+                        allow_redirects=False,
+                    )
+                    if res.status_code == 200:
+                        self.record_success()
+                except Exception as e:
+                    _logger.debug("Sonda %s sin respuesta: %s", self.url, str(e))
+        finally:
+            self._probing = False
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "state": self.state,
+            "failures": self.failures,
+        }
+
+
+def get_breaker(url, probe_path="/"):
+    """Devuelve el interruptor compartido por el proceso para ``url``."""
+    key = (url or "").rstrip("/")
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.setdefault(key, CircuitBreaker(key, probe_path))
+    return breaker
+
+
+def breaker_stats():
+    return [b.as_dict() for b in list(_breakers.values())]
+
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+@metrics.register_collector
+def _collect_metrics():
+    for breaker in list(_breakers.values()):
+        metrics.BREAKER_STATE.set(_STATE_VALUES.get(breaker.state, 0), url=breaker.url)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+HttpPool - Sesiones HTTP keep-alive compartidas por proceso
+
+Cada worker de Odoo mantiene un único ``requests.Session`` por URL base,
+de modo que todas las instancias de ``OllamaService`` (y el resto de
+llamadas a Ollama) reutilizan conexiones TCP en lugar de abrir una nueva
+por petición.
+"""
+
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 2
+DEFAULT_BACKOFF = 0.3
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter que cuenta peticiones para medir la reutilización."""
+
+    def __init__(self, *args, **kwargs):
+        self.request_count = 0
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        self.request_count += 1
+        return super().send(request, *args, **kwargs)
+
+    def connection_count(self):
+        """Conexiones TCP abiertas realmente por los pools de urllib3."""
+        total = 0
+        pools = self.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                total += getattr(pool, "num_connections", 0)
+        return total
+
+
+class _PooledSession:
+    def __init__(self, base_url, pool_size, max_retries, backoff, keep_alive):
+        self.base_url = base_url
+        self.options = (pool_size, max_retries, backoff, keep_alive)
+        # Solo se reintentan errores de conexión (la petición no llegó a
+        # enviarse, cualquier método) y 502/503/504 en métodos idempotentes:
+        # un POST a /api/generate, /api/pull o un upsert de Qdrant no se repite
+        # (duplicaría trabajo en plena caída) y un timeout de lectura tampoco.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        self.adapter = _CountingAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+    def stats(self):
+        requests_sent = self.adapter.request_count
+        connections = self.adapter.connection_count()
+        return {
+            "base_url": self.base_url,
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": max(requests_sent - connections, 0),
+        }
+
+
+def _normalize(base_url):
+    return (base_url or "").rstrip("/")
+
+
+def get_session(base_url, pool_size=None, max_retries=None, backoff=None, keep_alive=None):
+    """
+    Devuelve la sesión compartida para ``base_url``.
+    Sin opciones explícitas se reutiliza la sesión existente; si las opciones
+    cambian respecto a las del pool actual, la sesión se reconstruye.
+    """
+    key = _normalize(base_url)
+    explicit = any(v is not None for v in (pool_size, max_retries, backoff, keep_alive))
+    options = (
+        max(int(pool_size or DEFAULT_POOL_SIZE), 1),
+        DEFAULT_MAX_RETRIES if max_retries is None else max(int(max_retries), 0),
+        DEFAULT_BACKOFF if backoff is None else float(backoff),
+        True if keep_alive is None else bool(keep_alive),
+    )
+    pooled = _sessions.get(key)
+    if pooled is not None and (not explicit or pooled.options == options):
+        return pooled.session
+
+    with _lock:
+        pooled = _sessions.get(key)
+        if pooled is None or (explicit and pooled.options != options):
+            # La sesión anterior no se cierra: otros hilos pueden estar
+            # usándola y sus conexiones se liberan al recolectarse.
+            pooled = _PooledSession(key, *options)
+            _sessions[key] = pooled
+            _logger.debug("Pool HTTP creado para %s (opciones: %s)", key, options)
+    return pooled.session
+
+
+def pool_stats():
+    """Contadores de reutilización de conexiones por URL base."""
+    return [pooled.stats() for pooled in list(_sessions.values())]
+
+
+def close_all():
+    """Cierra todas las sesiones del proceso (útil en tests)."""
+    with _lock:
+        for pooled in _sessions.values():
+            pooled.session.close()
+        _sessions.clear()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+IntentRouter - Preclasificación de consultas en una sola pasada
+
+Las palabras clave de las rutas rápidas (sin LLM) y de los expertos MoE se
+compilan en un único índice por tokens: la consulta se trocea una vez en
+palabras y cada palabra se busca en un diccionario (sin reescanear el texto
+por cada palabra clave, y sin falsos positivos como "mo" dentro de "cómo").
+El resultado decide a la vez la acción determinista y el experto.
+
+Los parsers de cada ruta rápida se registran con ``@fast_path``; solo se
+ejecuta el de la ruta elegida (el que extrae los parámetros).
+"""
+
+import re
+
+# Palabras clave por etiqueta. 'raíz*' acepta cualquier terminación y las
+# frases de varias palabras se comparan token a token.
+FAST_PATH_KEYWORDS = {
+    "inventory": (
+        "inventario", "inventarios", "stock", "stocks", "existencia", "existencias",
+        "cantidad", "cantidades", "cuantos",
+    ),
+    "production": (
+        "orden", "ordenes", "órden", "órdenes", "fabricación", "fabricacion", "mrp",
+        "producción", "produccion",
+    ),
+    "sales": ("venta", "ventas", "cotización", "cotizacion", "cotizaciones"),
+    "purchase": ("compra", "compras", "proveedor", "proveedores"),
+    "docs": (
+        "documentación", "documentacion", "documento", "documentos", "manual",
+        "manuales", "procedimiento", "procedimientos", "docs",
+    ),
+    "mail": ("correo", "correos", "mail", "mails", "email", "emails", "bandeja", "inbox"),
+    "create_product": ("crea*",),
+}
+EXPERT_KEYWORDS = {
+    "manufacturing": (
+        "fabricar", "orden", "ordenes", "órden", "órdenes", "fabricación",
+        "fabricacion", "producción", "produccion", "mo", "bom", "componente",
+        "componentes", "lista de materiales",
+    ),
+    "inventory": (
+        "stock", "stocks", "inventario", "inventarios", "cantidad", "cantidades",
+        "almacén", "almacen", "almacenes", "ubicación", "ubicacion", "ubicaciones",
+        "lote", "lotes",
+    ),
+    "kaizen": (
+        "mejorar", "analizar", "eficiencia", "retraso*", "problema", "problemas",
+        "optimizar", "kaizen",
+    ),
+}
+
+# Prioridad de las rutas rápidas. create_product va primero: su parser
+# solo acepta consultas con precio y coste, y así "crear ... venta 2€"
+# no acaba en el listado de ventas.
+FAST_PATH_ORDER = (
+    "create_product",
+    "inventory",
+    "production",
+    "sales",
+    "purchase",
+    "docs",
+    "mail",
+)
+EXPERT_ORDER = ("manufacturing", "inventory", "kaizen")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _compile():
+    """
+    Índices por token: palabra -> etiquetas, raíz -> etiquetas y primera
+    palabra de una frase -> [(palabras siguientes, etiquetas)].
+    """
+    entries = [(tag, kw) for tag, kws in FAST_PATH_KEYWORDS.items() for kw in kws]
+    entries += [
+        ("expert:" + expert, kw) for expert, kws in EXPERT_KEYWORDS.items() for kw in kws
+    ]
+    words, stems, phrases = {}, {}, {}
+    for tag, keyword in entries:
+        tokens = keyword.split()
+        if len(tokens) > 1:
+            tails = phrases.setdefault(tokens[0], {})
+            tails.setdefault(tuple(tokens[1:]), set()).add(tag)
+        elif keyword.endswith("*"):
+            stems.setdefault(keyword[:-1], set()).add(tag)
+        else:
+            words.setdefault(keyword, set()).add(tag)
+    return (
+        {word: frozenset(tags) for word, tags in words.items()},
+        {stem: frozenset(tags) for stem, tags in stems.items()},
+        {
+            word: [(tail, frozenset(tags)) for tail, tags in tails.items()]
+            for word, tails in phrases.items()
+        },
+    )
+
+
+_WORDS, _STEMS, _PHRASES = _compile()
+_STEM_PREFIXES = tuple(_STEMS)
+
+# intent -> (parser, nombre del experto que firma la respuesta)
+_parsers = {}
+
+
+def fast_path(intent, expert_name="Assistant"):
+    """Registra ``parser(prompt) -> acción o None`` para una ruta rápida."""
+
+    def decorator(func):
+        _parsers[intent] = (func, expert_name)
+        return func
+
+    return decorator
+
+
+def classify(prompt):
+    """Etiquetas de todas las palabras clave presentes (una pasada)."""
+    tokens = _TOKEN_RE.findall((prompt or "").lower())
+    tags = set()
+    for i, token in enumerate(tokens):
+        found = _WORDS.get(token)
+        if found:
+            tags.update(found)
+        if token.startswith(_STEM_PREFIXES):
+            for stem, stem_tags in _STEMS.items():
+                if token.startswith(stem):
+                    tags.update(stem_tags)
+        for tail, phrase_tags in _PHRASES.get(token, ()):
+            if tuple(tokens[i + 1 : i + 1 + len(tail)]) == tail:
+                tags.update(phrase_tags)
+    return tags
+
+
+def expert_for(tags):
+    """Experto MoE según las etiquetas, o None para el generalista."""
+    return next((expert for expert in EXPERT_ORDER if "expert:" + expert in tags), None)
+
+
+def route(prompt):
+    """
+    Returns: dict con 'intent' y 'action' de la ruta rápida (o None si la
+    consulta debe ir al LLM), 'expert_name' que firma esa acción y
+    'expert' MoE ('manufacturing', 'inventory', 'kaizen' o None).
+    """
+    tags = classify(prompt)
+    result = {"intent": None, "action": None, "expert_name": "Assistant", "expert": None}
+    for intent in FAST_PATH_ORDER:
+        if intent in tags and intent in _parsers:
+            parser, expert_name = _parsers[intent]
+            action = parser(prompt)
+            if action:
+                result.update(intent=intent, action=action, expert_name=expert_name)
+                break
+    result["expert"] = expert_for(tags)
+    return result
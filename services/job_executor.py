@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+JobExecutor - Ejecución en segundo plano de los turnos del asistente
+
+Pool de hilos acotado por proceso: /ai_assistant/ask deja el mensaje en
+estado 'pending' y encola aquí su procesamiento, que usa un cursor propio.
+Si la cola está llena el mensaje se queda pendiente y lo recoge el cron.
+QUEUE_METRICS mide el rendimiento de la cola de mensajes (ambas vías).
+"""
+
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32
+
+_lock = threading.Lock()
+_executor = None
+
+
+class JobExecutor:
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-job")
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self._tickets = itertools.count()
+        self._queued_since = {}
+
+    def submit(self, job_id, func, *args):
+        """
+        Encola ``func(*args)``. Returns: False si la cola está llena.
+        """
+        with self.lock:
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            ticket = next(self._tickets)
+            self._queued_since[ticket] = time.monotonic()
+        self.pool.submit(self._run, ticket, job_id, func, args)
+        return True
+
+    def _run(self, ticket, job_id, func, args):
+        with self.lock:
+            wait_ms = (time.monotonic() - self._queued_since.pop(ticket)) * 1000
+            self.queued -= 1
+            self.running += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        _logger.info("Trabajo IA %s iniciado tras %.0fms en cola", job_id, wait_ms)
+        ok = False
+        try:
+            func(*args)
+            ok = True
+        except Exception:
+            _logger.exception("Error en trabajo IA %s", job_id)
+        finally:
+            with self.lock:
+                self.running -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    def stats(self):
+        with self.lock:
+            started = self.completed + self.failed + self.running
+            oldest = min(self._queued_since.values(), default=None)
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait_ms / started, 1) if started else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 1),
+                "oldest_wait_ms": (
+                    round((time.monotonic() - oldest) * 1000, 1) if oldest else 0.0
+                ),
+            }
+
+
+class QueueMetrics:
+    """Resultados y rendimiento de la cola de mensajes (ventana de 60 s)."""
+
+    WINDOW = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.finished_at = deque()
+        self.claimed = 0
+        self.outcomes = {"done": 0, "retry": 0, "dead": 0}
+        self.total_age_s = 0.0
+        self.max_age_s = 0.0
+
+    def record_claim(self, count):
+        with self.lock:
+            self.claimed += count
+
+    def record(self, outcome, age_s):
+        """``outcome``: done, retry o dead; ``age_s``: desde que se encoló."""
+        now = time.monotonic()
+        with self.lock:
+            self.outcomes[outcome] += 1
+            if outcome != "retry":
+                self.finished_at.append(now)
+                self.total_age_s += age_s
+                self.max_age_s = max(self.max_age_s, age_s)
+            self._trim(now)
+
+    def _trim(self, now):
+        while self.finished_at and now - self.finished_at[0] > self.WINDOW:
+            self.finished_at.popleft()
+
+    def stats(self):
+        with self.lock:
+            self._trim(time.monotonic())
+            finished = self.outcomes["done"] + self.outcomes["dead"]
+            return {
+                "messages_per_min": len(self.finished_at),
+                "claimed": self.claimed,
+                "done": self.outcomes["done"],
+                "retried": self.outcomes["retry"],
+                "dead": self.outcomes["dead"],
+                "avg_age_s": round(self.total_age_s / finished, 1) if finished else 0.0,
+                "max_age_s": round(self.max_age_s, 1),
+            }
+
+
+QUEUE_METRICS = QueueMetrics()
+
+
+def get_executor(workers=None, queue_size=None):
+    """Devuelve el pool del proceso (se crea en el primer uso)."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = JobExecutor(
+                    workers or DEFAULT_WORKERS, queue_size or DEFAULT_QUEUE_SIZE
+                )
+    return _executor
+
+
+def executor_stats():
+    return _executor.stats() if _executor else {}
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+JsonExtractor - Extracción incremental del primer valor JSON de un texto
+
+Recorre el texto una sola vez (saltando con una regex a los caracteres
+relevantes) y mantiene el estado de cadenas y escapes entre fragmentos,
+así que puede alimentarse token a token desde un stream. Cada objeto o
+array cerrado se valida con json.loads solo cuando cierra a nivel
+superior; si no es JSON válido se prueban sus hijos ya cerrados, en orden.
+"""
+
+import json
+import re
+
+# Caracteres que cambian el estado del escáner
+_SPECIAL = re.compile(r'[\[\]{}"\\]')
+_OPENERS = {"}": "{", "]": "["}
+
+
+class _Frame:
+    __slots__ = ("opener", "start", "children")
+
+    def __init__(self, opener, start):
+        self.opener = opener
+        self.start = start
+        self.children = []
+
+
+class _Span:
+    __slots__ = ("start", "end", "children", "broken")
+
+    def __init__(self, start, end, children, broken):
+        self.start = start
+        self.end = end
+        self.children = children
+        self.broken = broken
+
+
+class JsonExtractor:
+    """
+    Uso:
+        extractor = JsonExtractor()
+        for token in stream:
+            extractor.feed(token)
+            if extractor.found:
+                break
+        value = extractor.finish()
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.result = None
+        # (inicio, fin) del valor encontrado dentro de self.text
+        self.span = None
+        self._stack = []
+        self._in_string = False
+        self._skip_until = 0
+
+    @property
+    def found(self):
+        return self.span is not None
+
+    def feed(self, chunk):
+        """Añade un fragmento. Returns: el valor si ya se encontró, o None."""
+        if self.found or not chunk:
+            return self.result
+        offset = len(self.text)
+        self.text += chunk
+        stack = self._stack
+        for match in _SPECIAL.finditer(self.text, offset):
+            i = match.start()
+            if i < self._skip_until:
+                continue
+            ch = match.group()
+            if not stack:
+                # Fuera de cualquier estructura solo importa la apertura
+                if ch == "{" or ch == "[":
+                    stack.append(_Frame(ch, i))
+                continue
+            if self._in_string:
+                if ch == "\\":
+                    self._skip_until = i + 2
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                stack.append(_Frame(ch, i))
+            elif ch == "}" or ch == "]":
+                frame = stack.pop()
+                node = _Span(frame.start, i + 1, frame.children, frame.opener != _OPENERS[ch])
+                if stack:
+                    stack[-1].children.append(node)
+                elif self._resolve(node):
+                    return self.result
+        return None
+
+    def finish(self):
+        """
+        Fin del texto: si quedaron estructuras sin cerrar se prueban los
+        valores completos que contienen. Returns: el valor o None.
+        """
+        if not self.found:
+            for frame in self._stack:
+                if any(self._resolve(child) for child in frame.children):
+                    break
+            self._stack = []
+        return self.result
+
+    def _resolve(self, node):
+        """Prueba el nodo y, si no es JSON válido, sus hijos en orden."""
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if not node.broken:
+                try:
+                    self.result = json.loads(self.text[node.start : node.end])
+                    self.span = (node.start, node.end)
+                    return True
+                except (ValueError, RecursionError):
+                    pass
+            pending.extend(reversed(node.children))
+        return False
+
+
+def extract_json(text):
+    """Primer objeto o array JSON válido de ``text`` (o None)."""
+    extractor = JsonExtractor()
+    extractor.feed(text or "")
+    return extractor.finish()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+LLMScheduler - Prioridad entre llamadas de generación al LLM
+
+Todas las generaciones del proceso piden un hueco antes de llamar a
+Ollama. Hay tres clases (chat interactivo, trabajos de usuario en segundo
+plano y crons), con un límite global y otro por clase; al liberarse un
+hueco entra la petición en espera con mejor prioridad efectiva, que mejora
+un nivel cada AGING_SECONDS de espera para que ninguna clase se quede sin
+turno. La clase se toma de la clave de contexto 'ai_llm_priority'.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+_logger = logging.getLogger(__name__)
+
+PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+DEFAULT_PRIORITY = "interactive"
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_CLASS_LIMITS = {"interactive": 4, "normal": 2, "background": 1}
+# Segundos de espera que equivalen a subir un nivel de prioridad
+AGING_SECONDS = 30
+
+
+class SchedulerTimeout(requests.exceptions.Timeout):
+    """No hubo hueco para la petición dentro del tiempo de espera."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "since", "seq")
+
+    def __init__(self, priority, seq):
+        self.priority = priority
+        self.since = time.monotonic()
+        self.seq = seq
+
+
+class LLMScheduler:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.max_concurrency = DEFAULT_MAX_CONCURRENCY
+        self.limits = dict(DEFAULT_CLASS_LIMITS)
+        self.running = dict.fromkeys(PRIORITIES, 0)
+        self.waiting = []
+        self.stats_by_class = {
+            name: {"acquired": 0, "timeouts": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+            for name in PRIORITIES
+        }
+        self._seq = itertools.count()
+        self._local = threading.local()
+
+    def configure(self, max_concurrency, limits):
+        with self.cond:
+            self.max_concurrency = max(max_concurrency, 1)
+            self.limits.update(
+                {name: max(limit, 1) for name, limit in limits.items() if name in PRIORITIES}
+            )
+            self.cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority=None, timeout=None):
+        """
+        Reserva un hueco para una generación. Las llamadas anidadas del
+        mismo hilo (p. ej. el fallback de /api/chat a /api/generate)
+        reutilizan el hueco ya reservado.
+        """
+        if getattr(self._local, "holding", False):
+            yield
+            return
+        priority = priority if priority in PRIORITIES else DEFAULT_PRIORITY
+        waited_ms = self._acquire(priority, timeout)
+        if waited_ms > 1000:
+            _logger.info("Petición LLM '%s' esperó %.0fms por un hueco", priority, waited_ms)
+        self._local.holding = True
+        try:
+            yield
+        finally:
+            self._local.holding = False
+            with self.cond:
+                self.running[priority] -= 1
+                self.cond.notify_all()
+
+    def _acquire(self, priority, timeout):
+        waiter = _Waiter(priority, next(self._seq))
+        deadline = waiter.since + timeout if timeout else None
+        stats = self.stats_by_class[priority]
+        with self.cond:
+            self.waiting.append(waiter)
+            try:
+                while not self._can_run(waiter):
+                    wait = AGING_SECONDS
+                    if deadline is not None:
+                        wait = min(wait, deadline - time.monotonic())
+                        if wait <= 0:
+                            stats["timeouts"] += 1
+                            raise SchedulerTimeout(
+                                f"Sin hueco en el planificador LLM tras {timeout}s"
+                            )
+                    # Despertar periódico: el envejecimiento cambia el orden
+                    self.cond.wait(wait)
+            finally:
+                self.waiting.remove(waiter)
+            self.running[priority] += 1
+            waited_ms = (time.monotonic() - waiter.since) * 1000
+            stats["acquired"] += 1
+            stats["total_wait_ms"] += waited_ms
+            stats["max_wait_ms"] = max(stats["max_wait_ms"], waited_ms)
+            # Puede haber hueco para otra clase que esperaba detrás
+            self.cond.notify_all()
+        return waited_ms
+
+    def _has_room(self, priority):
+        return (
+            sum(self.running.values()) < self.max_concurrency
+            and self.running[priority] < self.limits[priority]
+        )
+
+    def _can_run(self, waiter):
+        """Entra si hay hueco y es el primero (por prioridad efectiva) que cabe."""
+        if not self._has_room(waiter.priority):
+            return False
+        now = time.monotonic()
+        best = min(
+            (w for w in self.waiting if self._has_room(w.priority)),
+            key=lambda w: (PRIORITIES[w.priority] - (now - w.since) / AGING_SECONDS, w.seq),
+        )
+        return best is waiter
+
+    def stats(self):
+        with self.cond:
+            now = time.monotonic()
+            result = {}
+            for name, stats in self.stats_by_class.items():
+                waiters = [w for w in self.waiting if w.priority == name]
+                acquired = stats["acquired"]
+                result[name] = {
+                    "limit": self.limits[name],
+                    "running": self.running[name],
+                    "waiting": len(waiters),
+                    "oldest_wait_ms": round(
+                        max((now - w.since for w in waiters), default=0.0) * 1000, 1
+                    ),
+                    "acquired": acquired,
+                    "timeouts": stats["timeouts"],
+                    "avg_wait_ms": (
+                        round(stats["total_wait_ms"] / acquired, 1) if acquired else 0.0
+                    ),
+                    "max_wait_ms": round(stats["max_wait_ms"], 1),
+                }
+            return {"max_concurrency": self.max_concurrency, "classes": result}
+
+
+SCHEDULER = LLMScheduler()
+
+
+def scheduler_stats():
+    return SCHEDULER.stats()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+LoadBalancer - Reparto de peticiones entre varios servidores Ollama
+
+Estado por proceso de cada nodo (peticiones en curso, latencia media y
+salud). Se elige el nodo con menos peticiones en curso ponderadas por su
+peso; la latencia media desempata. Cada nodo puede limitar sus peticiones
+simultáneas; quien no encuentra hueco espera a que se libere uno.
+"""
+
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Factor de la media móvil exponencial de latencia
+EWMA_ALPHA = 0.3
+# Segundos que un nodo marcado como caído queda fuera del reparto
+DOWN_COOLDOWN = 30
+
+_lock = threading.RLock()
+# Se notifica cada vez que termina una petición (queda un hueco libre)
+_slot_freed = threading.Condition(_lock)
+_nodes = {}
+
+
+class NodeState:
+    def __init__(self, url):
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.ewma_ms = 0.0
+        self.down_until = 0.0
+
+    @property
+    def healthy(self):
+        return time.monotonic() >= self.down_until
+
+    def as_dict(self):
+        return {
+            "url": self.url,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "latency_ms": round(self.ewma_ms, 1),
+            "healthy": self.healthy,
+        }
+
+
+def node_state(url):
+    url = (url or "").rstrip("/")
+    state = _nodes.get(url)
+    if state is None:
+        with _lock:
+            state = _nodes.setdefault(url, NodeState(url))
+    return state
+
+
+def pick_node(nodes, exclude=(), prefer=None):
+    """
+    Elige un nodo entre ``nodes`` (dicts con 'url' y 'weight').
+    ``prefer`` se devuelve si está entre los candidatos sanos.
+    Si todos están caídos se prueba igualmente el mejor de ellos.
+    """
+    candidates = [n for n in nodes if n["url"] not in exclude]
+    if not candidates:
+        return None
+    healthy = [n for n in candidates if node_state(n["url"]).healthy]
+    for node in healthy:
+        if node["url"] == prefer:
+            return node
+
+    def score(node):
+        state = node_state(node["url"])
+        return ((state.in_flight + 1) / max(node.get("weight") or 1, 1), state.ewma_ms)
+
+    return min(healthy or candidates, key=score)
+
+
+def has_capacity(node):
+    """True si el nodo no ha alcanzado su 'max_concurrency' (0 = sin límite)."""
+    limit = node.get("max_concurrency") or 0
+    return not limit or node_state(node["url"]).in_flight < limit
+
+
+def wait_for_capacity(nodes, timeout):
+    """Espera a que alguno de ``nodes`` tenga hueco. Returns: False si vence."""
+    deadline = time.monotonic() + timeout
+    with _slot_freed:
+        while not any(map(has_capacity, nodes)):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _slot_freed.wait(remaining)
+    return True
+
+
+def begin(url, max_concurrency=0):
+    """
+    Registra el inicio de una petición. Returns: el instante de inicio, o
+    None si el nodo ya está en su límite de concurrencia.
+    """
+    state = node_state(url)
+    with _lock:
+        if max_concurrency and state.in_flight >= max_concurrency:
+            return None
+        state.in_flight += 1
+        state.requests += 1
+    return time.monotonic()
+
+
+def end(url, started, ok=True):
+    """Cierra una petición; ``ok=None`` la descarta sin contarla."""
+    state = node_state(url)
+    elapsed_ms = (time.monotonic() - started) * 1000
+    with _slot_freed:
+        state.in_flight = max(state.in_flight - 1, 0)
+        if ok:
+            _update_latency(state, elapsed_ms)
+        elif ok is None:
+            state.requests -= 1
+        else:
+            state.failures += 1
+        _slot_freed.notify_all()
+
+
+def mark_down(url, reason=""):
+    state = node_state(url)
+    state.down_until = time.monotonic() + DOWN_COOLDOWN
+    _logger.warning("Nodo Ollama %s fuera del reparto: %s", url, reason)
+
+
+def mark_health(url, healthy, latency_ms=None):
+    """Resultado de un health check (cron o prueba manual)."""
+    state = node_state(url)
+    if healthy:
+        state.down_until = 0.0
+        if latency_ms is not None:
+            with _lock:
+                _update_latency(state, latency_ms)
+    else:
+        mark_down(url, "health check fallido")
+
+
+def _update_latency(state, elapsed_ms):
+    if state.ewma_ms:
+        state.ewma_ms = EWMA_ALPHA * elapsed_ms + (1 - EWMA_ALPHA) * state.ewma_ms
+    else:
+        state.ewma_ms = elapsed_ms
+
+
+def nodes_stats():
+    return [state.as_dict() for state in list(_nodes.values())]
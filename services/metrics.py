@@ -0,0 +1,414 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics - Contadores, gauges e histogramas en formato Prometheus
+
+Cada proceso (worker de Odoo) acumula sus métricas en memoria y vuelca una
+instantánea JSON a su directorio de instancia como mucho cada DUMP_INTERVAL
+segundos. Contadores e histogramas se separan por base de datos (la del
+hilo que los incrementa); los gauges son del proceso.
+/ai_assistant/metrics suma las instantáneas de todos los procesos vivos
+(contadores e histogramas se suman; de los gauges recientes se toma el
+máximo) y las expone en el formato de texto de Prometheus.
+
+Al terminar un proceso (worker reciclado por limit_request/limit_memory)
+sus contadores e histogramas se acumulan en AGGREGATE_FILE en lugar de
+perderse, como en el modo multiproceso de prometheus_client: los totales
+nunca bajan y Prometheus no ve reinicios falsos. Sus gauges se descartan.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+METRICS_ROOT = os.path.join(tempfile.gettempdir(), "odoo_ai_assistant_metrics")
+# Un directorio por instancia de Odoo (ver set_namespace)
+METRICS_DIR = os.path.join(METRICS_ROOT, "default")
+AGGREGATE_FILE = "_aggregate.json"
+LOCK_FILE = "_lock"
+DUMP_INTERVAL = 5
+# Los gauges de instantáneas más antiguas no se suman (proceso inactivo)
+GAUGE_MAX_AGE = 60
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Hilos sin base de datos (p. ej. colectores al arrancar)
+NO_DB = "-"
+
+_lock = threading.Lock()
+_metrics = {}
+_collectors = []
+_last_dump = 0.0
+# pid + instante de arranque: un pid reutilizado no pisa el fichero anterior
+_PROCESS_ID = "%s-%s" % (os.getpid(), int(time.time() * 1000))
+
+
+def _reset_after_fork():
+    """El hijo hereda las muestras del padre: empezar de cero con su propio id."""
+    global _PROCESS_ID, _last_dump
+    _PROCESS_ID = "%s-%s" % (os.getpid(), int(time.time() * 1000))
+    _last_dump = 0.0
+    for metric in _metrics.values():
+        metric.samples = {}
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def set_namespace(*parts):
+    """
+    Fija el directorio de volcado a partir de datos que identifican la
+    instancia (p. ej. data_dir y puerto HTTP): varias instancias en la
+    misma máquina no mezclan sus métricas.
+    """
+    global METRICS_DIR
+    raw = json.dumps([str(part) for part in parts])
+    METRICS_DIR = os.path.join(METRICS_ROOT, hashlib.sha256(raw.encode()).hexdigest()[:12])
+
+
+def _current_db():
+    return getattr(threading.current_thread(), "dbname", None) or NO_DB
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        # base de datos -> {etiquetas: valor}
+        self.samples = {}
+        _metrics[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label) or "-") for label in self.labels)
+
+    def _db_samples(self):
+        return self.samples.setdefault(_current_db(), {})
+
+    def snapshot(self):
+        return {
+            db: [[list(key), value] for key, value in samples.items()]
+            for db, samples in self.samples.items()
+        }
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            samples = self._db_samples()
+            samples[key] = samples.get(key, 0) + amount
+        maybe_dump()
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with _lock:
+            self.samples.setdefault(NO_DB, {})[self._key(labels)] = value
+
+    def snapshot(self):
+        return [[list(key), value] for key, value in self.samples.get(NO_DB, {}).items()]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        if value is None:
+            return
+        key = self._key(labels)
+        with _lock:
+            # [cuenta por bucket..., suma, total]
+            samples = self._db_samples()
+            sample = samples.get(key)
+            if sample is None:
+                sample = samples[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+            sample[-2] += value
+            sample[-1] += 1
+        maybe_dump()
+
+
+def register_collector(func):
+    """``func()`` actualiza gauges justo antes de cada volcado."""
+    _collectors.append(func)
+    return func
+
+
+def snapshot():
+    """
+    Returns: {"dbs": {bd: {métrica: muestras}}, "gauges": {métrica: muestras}}
+    (los metadatos de cada métrica salen de _metrics, igual en todos los procesos).
+    """
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            _logger.debug("Colector de métricas con error: %s", str(e))
+    dbs, gauges = {}, {}
+    with _lock:
+        for name, metric in _metrics.items():
+            if metric.type == "gauge":
+                gauges[name] = metric.snapshot()
+                continue
+            for db, samples in metric.snapshot().items():
+                dbs.setdefault(db, {})[name] = samples
+    return {"dbs": dbs, "gauges": gauges}
+
+
+def _write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def dump():
+    """Escribe la instantánea de este proceso (escritura atómica)."""
+    global _last_dump
+    _last_dump = time.monotonic()
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        data = dict(snapshot(), time=time.time())
+        _write_json(os.path.join(METRICS_DIR, "%s.json" % _PROCESS_ID), data)
+    except OSError as e:
+        _logger.warning("No se pudieron volcar las métricas: %s", str(e))
+
+
+def maybe_dump():
+    if time.monotonic() - _last_dump >= DUMP_INTERVAL:
+        dump()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge_samples(target, metric_type, samples):
+    """Suma ``samples`` ([[etiquetas, valor]...]) en ``target`` ({tupla: valor})."""
+    for labels, value in samples:
+        key = tuple(labels)
+        current = target.get(key)
+        if current is None:
+            target[key] = value
+        elif metric_type == "gauge":
+            target[key] = max(current, value)
+        elif metric_type == "histogram":
+            target[key] = [a + b for a, b in zip(current, value)]
+        else:
+            target[key] = current + value
+
+
+def _fold_dead(paths):
+    """
+    Acumula contadores e histogramas de procesos terminados en
+    AGGREGATE_FILE y borra sus ficheros. El cerrojo evita que dos scrapes
+    simultáneos sumen dos veces el mismo proceso.
+    """
+    with open(os.path.join(METRICS_DIR, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        aggregate_path = os.path.join(METRICS_DIR, AGGREGATE_FILE)
+        aggregate = _read_json(aggregate_path) or {"dbs": {}}
+        for path in paths:
+            data = _read_json(path) if os.path.exists(path) else None
+            if data is None:
+                continue
+            for db, families in data.get("dbs", {}).items():
+                for name, samples in families.items():
+                    metric = _metrics.get(name)
+                    if metric is None:
+                        continue
+                    stored = aggregate["dbs"].setdefault(db, {}).setdefault(name, [])
+                    merged = {tuple(labels): value for labels, value in stored}
+                    _merge_samples(merged, metric.type, samples)
+                    aggregate["dbs"][db][name] = [[list(k), v] for k, v in merged.items()]
+        _write_json(aggregate_path, aggregate)
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def collect_all(dbname=None):
+    """
+    Suma las instantáneas de todos los procesos vivos (incluido este) y el
+    acumulado de los terminados, para ``dbname`` (o todas las bases).
+    """
+    dump()
+    families = {
+        name: {
+            "type": metric.type,
+            "help": metric.help,
+            "labels": list(metric.labels),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": {},
+        }
+        for name, metric in _metrics.items()
+    }
+    try:
+        filenames = os.listdir(METRICS_DIR)
+    except OSError:
+        filenames = []
+    live, dead = [], []
+    for filename in filenames:
+        if not filename.endswith(".json") or filename == AGGREGATE_FILE:
+            continue
+        path = os.path.join(METRICS_DIR, filename)
+        pid = filename[:-5].split("-")[0]
+        (live if pid.isdigit() and _pid_alive(int(pid)) else dead).append(path)
+    if dead:
+        try:
+            _fold_dead(dead)
+        except OSError as e:
+            _logger.warning("No se pudieron acumular métricas de procesos terminados: %s", e)
+
+    sources = [_read_json(path) for path in live]
+    aggregate = _read_json(os.path.join(METRICS_DIR, AGGREGATE_FILE))
+    if aggregate:
+        sources.append(dict(aggregate, time=0))
+    for data in sources:
+        if not data:
+            continue
+        for db, db_families in data.get("dbs", {}).items():
+            if dbname and db != dbname:
+                continue
+            for name, samples in db_families.items():
+                if name in families:
+                    _merge_samples(families[name]["samples"], families[name]["type"], samples)
+        if time.time() - data.get("time", 0) < GAUGE_MAX_AGE:
+            for name, samples in data.get("gauges", {}).items():
+                if name in families:
+                    _merge_samples(families[name]["samples"], "gauge", samples)
+    return families
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{%s}" % ",".join(escaped)
+
+
+def gauge_family(help_text, labels, samples):
+    """Familia calculada en el momento del scrape (p. ej. desde la base de datos)."""
+    return {
+        "type": "gauge",
+        "help": help_text,
+        "labels": list(labels),
+        "buckets": [],
+        "samples": {tuple(str(v) for v in key): value for key, value in samples.items()},
+    }
+
+
+def render(families):
+    """Formato de exposición de texto de Prometheus."""
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        lines.append("# HELP %s %s" % (name, family["help"]))
+        lines.append("# TYPE %s %s" % (name, family["type"]))
+        for labels, value in sorted(family["samples"].items()):
+            if family["type"] != "histogram":
+                lines.append("%s%s %s" % (name, _format_labels(family["labels"], labels), value))
+                continue
+            # Los buckets ya se guardan acumulados (le = menor o igual)
+            for bound, count in zip(family["buckets"], value):
+                lines.append(
+                    "%s_bucket%s %s"
+                    % (name, _format_labels(family["labels"], labels, ("le", bound)), count)
+                )
+            lines.append(
+                "%s_bucket%s %s"
+                % (name, _format_labels(family["labels"], labels, ("le", "+Inf")), value[-1])
+            )
+            lines.append("%s_sum%s %s" % (name, _format_labels(family["labels"], labels), value[-2]))
+            lines.append(
+                "%s_count%s %s" % (name, _format_labels(family["labels"], labels), value[-1])
+            )
+    return "\n".join(lines) + "\n"
+
+
+# Métricas del asistente
+REQUEST_DURATION = Histogram(
+    "ai_assistant_request_duration_seconds",
+    "Duración de los turnos del asistente",
+    ("endpoint", "expert", "outcome"),
+)
+OLLAMA_TTFT = Histogram(
+    "ai_assistant_ollama_ttft_seconds",
+    "Tiempo hasta el primer token en streaming",
+    ("model",),
+)
+OLLAMA_TOKENS_PER_SECOND = Histogram(
+    "ai_assistant_ollama_tokens_per_second",
+    "Velocidad de generación de Ollama",
+    ("model",),
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200),
+)
+OLLAMA_TOKENS = Counter(
+    "ai_assistant_ollama_tokens_total",
+    "Tokens procesados por Ollama",
+    ("model", "kind"),
+)
+WATCHDOG_DURATION = Histogram(
+    "ai_assistant_watchdog_duration_seconds",
+    "Duración de cada ejecución de watchdog",
+    ("watchdog", "check_type"),
+)
+RAG_INDEXED = Counter(
+    "ai_assistant_rag_indexed_total",
+    "Documentos indexados en Qdrant",
+    ("source",),
+)
+RAG_INDEX_DURATION = Histogram(
+    "ai_assistant_rag_index_duration_seconds",
+    "Duración de cada pasada de indexación RAG",
+    ("source",),
+)
+CACHE_LOOKUPS = Counter(
+    "ai_assistant_cache_lookups_total",
+    "Consultas a las cachés de respuestas",
+    ("cache", "result"),
+)
+BREAKER_STATE = Gauge(
+    "ai_assistant_circuit_breaker_state",
+    "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)",
+    ("url",),
+)
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging
 
+from . import intent_router
+from .semantic_router import SemanticRouter
+
 _logger = logging.getLogger(__name__)
 
 
@@ -12,49 +15,37 @@ class MoERouter:
 
     def __init__(self, env):
         self.env = env
+        # Última decisión: método ('keyword', 'semantic', 'tie_break'),
+        # puntuación y embedding normalizado de la consulta (si lo hubo)
+        self.method = "keyword"
+        self.score = None
+        self.query_vector = None
 
-    def route(self, user_query, _current_model=False):
+    def route(self, user_query, _current_model=False, ollama=None):
         """
-        Determina el experto basado en palabras clave y contexto.
+        Determina el experto basado en palabras clave y contexto. Con
+        'moe_routing_mode' = 'semantic' y un OllamaService, por similitud
+        de embeddings (las palabras clave deciden los empates).
         Retorna: (expert_name, system_prompt, tools_config)
         """
-        query_lower = user_query.lower()
+        expert = intent_router.expert_for(intent_router.classify(user_query))
+        if ollama is not None:
+            semantic = SemanticRouter(self.env)
+            if semantic.enabled:
+                expert, self.method, self.score, self.query_vector = semantic.route(
+                    user_query, ollama, expert
+                )
 
         # 1. Experto en Manufactura (MRP)
-        if any(
-            w in query_lower
-            for w in [
-                "fabricar",
-                "producción",
-                "orden",
-                "mo",
-                "lista de materiales",
-                "bom",
-                "componentes",
-            ]
-        ):
+        if expert == "manufacturing":
             return self._get_manufacturing_expert()
 
         # 2. Experto en Inventario (Stock)
-        if any(
-            w in query_lower
-            for w in ["stock", "inventario", "cantidad", "almacén", "ubicación", "lote"]
-        ):
+        if expert == "inventory":
             return self._get_inventory_expert()
 
         # 3. Experto Kaizen (Mejora Continua)
-        if any(
-            w in query_lower
-            for w in [
-                "mejorar",
-                "analizar",
-                "eficiencia",
-                "retraso",
-                "problema",
-                "optimizar",
-                "kaizen",
-            ]
-        ):
+        if expert == "kaizen":
             return self._get_kaizen_expert()
 
         # 4. Experto General (Fallback)
@@ -3,12 +3,69 @@
 OllamaService - Comunicación simplificada con Ollama
 """
 
+import json
 import logging
+import time
 
 import requests
 
+from . import load_balancer, metrics
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .http_pool import get_session
+from .llm_scheduler import SCHEDULER
+from .single_flight import SingleFlight, make_key
+
 _logger = logging.getLogger(__name__)
 
+# Registro de modelos instalados por URL base: {url: (instante, frozenset)}
+MODEL_REGISTRY_TTL = 300
+_installed_models = {}
+# Modelo de embeddings resuelto por (url, modelo preferido)
+_embedding_models = {}
+
+# Generaciones idénticas simultáneas comparten una sola llamada a Ollama
+GENERATION_FLIGHTS = SingleFlight("generation")
+
+# Límites con los que se configuró el planificador LLM del proceso
+_scheduler_settings = None
+
+# Lotes de /api/embed: tope de textos y de caracteres totales por petición
+EMBED_BATCH_SIZE = 32
+EMBED_BATCH_CHARS = 24000
+
+
+def invalidate_model_registry(base_url=None):
+    """
+    Olvida los modelos instalados (y los embeddings resueltos) de una URL,
+    o de todas si no se indica. Se llama tras sincronizar o descargar modelos.
+    """
+    if base_url is None:
+        _installed_models.clear()
+        _embedding_models.clear()
+        return
+    base_url = base_url.rstrip("/")
+    _installed_models.pop(base_url, None)
+    for key in [k for k in _embedding_models if k[0] == base_url]:
+        _embedding_models.pop(key, None)
+
+
+def flatten_messages(messages):
+    """
+    Convierte mensajes de chat en (system, prompt) para /api/generate.
+    Returns:
+        tuple: (texto de sistema o None, prompt con los turnos etiquetados)
+    """
+    system = None
+    lines = []
+    for message in messages:
+        if message["role"] == "system":
+            system = message["content"]
+        else:
+            label = "Usuario" if message["role"] == "user" else "Asistente"
+            lines.append(f"{label}: {message['content']}")
+    lines.append("Asistente:")
+    return system, "\n".join(lines)
+
 
 class OllamaService:
     """Servicio limpio para comunicación con Ollama."""
@@ -18,40 +75,146 @@ class OllamaService:
         self._load_config()
 
     def _load_config(self):
-        """Carga configuración desde Odoo."""
-        config = self.env["ai.ollama.config"].search([("active", "=", True)], limit=1)
-
-        if config:
-            self.base_url = config.url.rstrip("/")
-            self.timeout = max(config.timeout, 30)  # Mínimo 30s
-            self.num_ctx = config.num_ctx or 1024  # Por defecto bajo
-            self.temperature = config.temperature or 0.7
-            self.model = (
-                self.env["ir.config_parameter"]
-                .sudo()
-                .get_param("ai_production_assistant.selected_model", "gemma3:4b")
-            )
-            self.embedding_model = (
-                self.env["ir.config_parameter"]
-                .sudo()
-                .get_param("ai_production_assistant.embedding_model", "nomic-embed-text")
-            )
-        else:
-            # Defaults si no hay config
-            self.base_url = "http://localhost:11434"
-            self.timeout = 60
-            self.num_ctx = 1024
-            self.temperature = 0.7
-            self.model = "gemma3:4b"
-            self.embedding_model = "nomic-embed-text"
-
-    def generate(self, prompt, model=None, system=None):
+        """Carga configuración desde Odoo (caché del registro, sin consultas)."""
+        config = self.env["ai.ollama.config"]._get_service_config()
+        self.timeout = config["timeout"]
+        self.num_ctx = config["num_ctx"]
+        self.temperature = config["temperature"]
+        self.model = config["model"]
+        self.embedding_model = config["embedding_model"]
+        self.pool_size = config["pool_size"]
+        self.max_retries = config["max_retries"]
+        self.keep_alive = config["keep_alive"]
+        self.model_keep_alive = config["model_keep_alive"]
+        # Copia: la configuración cacheada es compartida
+        self.nodes = [dict(node) for node in config["nodes"]]
+        self._configure_scheduler(config)
+        # Nodo para llamadas directas (embeddings, modelos instalados)
+        reachable = [n for n in self.nodes if self._breaker(n["url"]).is_available()]
+        self.base_url = load_balancer.pick_node(reachable or self.nodes)["url"]
+
+    @staticmethod
+    def _configure_scheduler(config):
+        """Ajusta el planificador del proceso solo si cambian sus límites."""
+        global _scheduler_settings
+        settings = (
+            config["llm_max_concurrency"],
+            tuple(sorted(config["llm_class_limits"].items())),
+        )
+        if settings != _scheduler_settings:
+            _scheduler_settings = settings
+            SCHEDULER.configure(settings[0], dict(settings[1]))
+
+    @property
+    def session(self):
+        """Sesión HTTP keep-alive compartida por el proceso para esta URL."""
+        return self._session_for(self.base_url)
+
+    def _session_for(self, url):
+        return get_session(
+            url,
+            pool_size=self.pool_size,
+            max_retries=self.max_retries,
+            keep_alive=self.keep_alive,
+        )
+
+    def _breaker(self, url):
+        return get_breaker(url, "/api/tags")
+
+    def is_available(self):
+        """False si el circuito de todos los nodos está abierto."""
+        return any(self._breaker(n["url"]).is_available() for n in self.nodes)
+
+    def _post_balanced(self, path, payload, stream=False, prefer_url=None):
+        """
+        POST al nodo con menos peticiones en curso (ponderado por peso).
+        Si todos están en su límite de concurrencia se espera un hueco.
+        Si el nodo no responde (timeout o conexión) se marca como caído y
+        se repite en el siguiente; los nodos con el circuito abierto se
+        saltan sin esperar. ``prefer_url`` fija el nodo mientras esté sano
+        (afinidad de sesión). Quien llama debe cerrar el seguimiento con
+        load_balancer.end(node["url"], started, ok).
+        Returns:
+            tuple: (nodo, instante de inicio, respuesta)
+        """
+        tried = set()
+        error = None
+        while True:
+            candidates = [
+                n
+                for n in self.nodes
+                if n["url"] not in tried and self._breaker(n["url"]).is_available()
+            ]
+            if candidates and not any(map(load_balancer.has_capacity, candidates)):
+                # Todos al límite de concurrencia: esperar a que se libere un hueco
+                timeout = max(n["timeout"] for n in candidates)
+                if not load_balancer.wait_for_capacity(candidates, timeout):
+                    raise requests.exceptions.Timeout(
+                        "Servidores Ollama al límite de peticiones simultáneas"
+                    )
+            free = [n for n in candidates if load_balancer.has_capacity(n)]
+            node = load_balancer.pick_node(free or candidates, prefer=prefer_url)
+            if node is None:
+                raise error or CircuitOpenError("Circuito de Ollama abierto")
+            started = load_balancer.begin(node["url"], node.get("max_concurrency"))
+            if started is None:
+                # Otro hilo ocupó el último hueco entre la elección y el inicio
+                continue
+            tried.add(node["url"])
+            breaker = self._breaker(node["url"])
+            if not breaker.allow_request():
+                load_balancer.end(node["url"], started, ok=None)
+                continue
+            try:
+                response = self._session_for(node["url"]).post(
+                    f"{node['url']}{path}",
+                    json=payload,
+                    timeout=node["timeout"],
+                    stream=stream,
+                )
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                load_balancer.end(node["url"], started, ok=False)
+                load_balancer.mark_down(node["url"], str(e))
+                breaker.record_failure()
+                error = e
+                _logger.warning("Ollama %s sin respuesta", node["url"])
+                continue
+            breaker.record_success()
+            return node, started, response
+
+    def _request(self, method, path, **kwargs):
+        """Petición directa a base_url protegida por su circuit breaker."""
+        breaker = self._breaker(self.base_url)
+        if not breaker.allow_request():
+            raise CircuitOpenError(f"Circuito de {self.base_url} abierto")
+        try:
+            response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return response
+
+    def _flight_key(self, path, payload):
+        """Clave de agrupación: misma petición contra el mismo grupo de nodos."""
+        return make_key(path, payload, [node["url"] for node in self.nodes])
+
+    def _llm_slot(self):
+        """Hueco del planificador LLM según la prioridad del contexto."""
+        return SCHEDULER.slot(self.env.context.get("ai_llm_priority"), timeout=self.timeout)
+
+    def _options(self, num_ctx=None):
+        return {"num_ctx": num_ctx or self.num_ctx, "temperature": self.temperature}
+
+    def generate(self, prompt, model=None, system=None, num_ctx=None, format=None):
         """
         Genera respuesta con Ollama.
         Args:
             prompt: Texto a enviar
             model: Modelo (opcional, usa config por defecto)
             system: System prompt (opcional)
+            num_ctx: Ventana de contexto de esta petición (opcional)
+            format: JSON schema de la salida estructurada (opcional)
         Returns:
             str: Respuesta del modelo o mensaje de error
         """
@@ -61,34 +224,35 @@ class OllamaService:
             "model": target_model,
             "prompt": prompt,
             "stream": False,
-            "options": {"num_ctx": self.num_ctx, "temperature": self.temperature},
+            "options": self._options(num_ctx),
+            "keep_alive": self.model_keep_alive,
         }
 
         if system:
             payload["system"] = system
+        if format:
+            payload["format"] = format
 
-        url = f"{self.base_url}/api/generate"
+        return GENERATION_FLIGHTS.do(
+            self._flight_key("/api/generate", payload), self._generate, payload
+        )
 
+    def _generate(self, payload):
+        target_model = payload["model"]
         try:
-            _logger.debug("Ollama request to %s (model: %s)", url, target_model)
-
-            response = requests.post(url, json=payload, timeout=self.timeout)
-
-            if response.status_code == 200:
-                result = response.json().get("response", "")
-                _logger.debug("Ollama response: %s", result[:100])
-                return result
-
-            # Manejo de errores específicos
-            error_text = response.text[:500]
+            with self._llm_slot():
+                node, started, response = self._post_balanced("/api/generate", payload)
+                _logger.debug("Ollama request to %s (model: %s)", node["url"], target_model)
 
-            if "exit status 2" in error_text:
-                return f"⚠️ Modelo '{target_model}' corrupto. Prueba: ollama pull {target_model}"
+                try:
+                    if response.status_code == 200:
+                        result = response.json().get("response", "")
+                        _logger.debug("Ollama response: %s", result[:100])
+                        return result
 
-            if "out of memory" in error_text.lower():
-                return "⚠️ Sin memoria GPU. Cierra otras apps o usa modelo más pequeño."
-
-            return f"Error Ollama: {response.status_code}"
+                    return self._error_message(response, target_model)
+                finally:
+                    load_balancer.end(node["url"], started, ok=response.status_code == 200)
 
         except requests.exceptions.Timeout:
             return f"⏱️ Timeout ({self.timeout}s). Aumenta el timeout en configuración."
@@ -100,10 +264,288 @@ class OllamaService:
             _logger.error("Error Ollama: %s", str(e))
             return f"Error: {str(e)}"
 
+    def chat(self, messages, model=None, num_ctx=None, prefer_url=None, format=None):
+        """
+        Genera respuesta con /api/chat.
+        Args:
+            messages: Lista de {"role", "content"} (system, user, assistant)
+            prefer_url: Nodo preferido (afinidad de sesión para reusar su caché KV)
+            format: JSON schema de la salida estructurada (opcional)
+        Returns:
+            dict: {"response": str, "node_url": str|None, "timings": dict}
+        """
+        target_model = model or self.model
+        payload = {
+            "model": target_model,
+            "messages": messages,
+            "stream": False,
+            "options": self._options(num_ctx),
+            "keep_alive": self.model_keep_alive,
+        }
+        if format:
+            payload["format"] = format
+        return GENERATION_FLIGHTS.do(
+            self._flight_key("/api/chat", payload),
+            self._chat,
+            payload,
+            messages,
+            num_ctx,
+            prefer_url,
+            format,
+        )
+
+    def _chat(self, payload, messages, num_ctx, prefer_url, format):
+        target_model = payload["model"]
+        reply = {"response": "", "node_url": None, "timings": {}}
+
+        try:
+            with self._llm_slot():
+                node, started, response = self._post_balanced(
+                    "/api/chat", payload, prefer_url=prefer_url
+                )
+                reply["node_url"] = node["url"]
+                missing = False
+                try:
+                    if response.status_code == 200:
+                        data = response.json()
+                        reply["response"] = (data.get("message") or {}).get("content", "")
+                        reply["timings"] = self._timings(data)
+                        self._log_timings(node["url"], target_model, reply["timings"])
+                    elif self._endpoint_missing(response):
+                        missing = True
+                    else:
+                        reply["response"] = self._error_message(response, target_model)
+                finally:
+                    response.close()
+                    load_balancer.end(node["url"], started, ok=response.status_code == 200)
+                if missing:
+                    # Ollama sin /api/chat: mismo turno aplanado por /api/generate,
+                    # ya sin ocupar el hueco del nodo (el fallback pide el suyo)
+                    system, prompt = flatten_messages(messages)
+                    reply["response"] = self.generate(
+                        prompt, target_model, system, num_ctx, format=format
+                    )
+
+        except requests.exceptions.Timeout:
+            reply["response"] = f"⏱️ Timeout ({self.timeout}s). Aumenta el timeout en configuración."
+
+        except requests.exceptions.ConnectionError:
+            reply["response"] = "❌ No puedo conectar con Ollama. ¿Está ejecutándose?"
+
+        except Exception as e:
+            _logger.error("Error Ollama (chat): %s", str(e))
+            reply["response"] = f"Error: {str(e)}"
+
+        return reply
+
+    def generate_stream(self, prompt, model=None, system=None, num_ctx=None):
+        """
+        Genera respuesta en modo streaming (NDJSON de Ollama).
+        Yields:
+            dict: {"token": str} por cada fragmento y, al final, un evento
+            {"done": True, "response": str, "ttft_ms": float, "total_ms": float}
+        """
+        target_model = model or self.model
+
+        payload = {
+            "model": target_model,
+            "prompt": prompt,
+            "stream": True,
+            "options": self._options(num_ctx),
+            "keep_alive": self.model_keep_alive,
+        }
+
+        if system:
+            payload["system"] = system
+
+        yield from self._stream(
+            "/api/generate", payload, lambda chunk: chunk.get("response", "")
+        )
+
+    def chat_stream(self, messages, model=None, num_ctx=None, prefer_url=None):
+        """Como chat() pero en streaming; mismos eventos que generate_stream()."""
+        target_model = model or self.model
+        payload = {
+            "model": target_model,
+            "messages": messages,
+            "stream": True,
+            "options": self._options(num_ctx),
+            "keep_alive": self.model_keep_alive,
+        }
+
+        def fallback():
+            system, prompt = flatten_messages(messages)
+            return self.generate_stream(prompt, target_model, system, num_ctx)
+
+        yield from self._stream(
+            "/api/chat",
+            payload,
+            lambda chunk: (chunk.get("message") or {}).get("content", ""),
+            prefer_url=prefer_url,
+            fallback=fallback,
+        )
+
+    def _stream(self, path, payload, token_of, prefer_url=None, fallback=None):
+        """Lee el NDJSON de Ollama y emite eventos de token y uno final."""
+        target_model = payload["model"]
+        start = time.monotonic()
+        ttft_ms = None
+        parts = []
+        stats = {}
+        node = None
+        ok = False
+
+        try:
+            with self._llm_slot():
+                node, started, response = self._post_balanced(
+                    path, payload, stream=True, prefer_url=prefer_url
+                )
+                missing = False
+                with response:
+                    if response.status_code != 200:
+                        missing = bool(fallback) and self._endpoint_missing(response)
+                        if not missing:
+                            yield {
+                                "done": True,
+                                "response": self._error_message(response, target_model),
+                                "error": True,
+                            }
+                            return
+
+                    for line in response.iter_lines() if not missing else ():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("error"):
+                            yield {
+                                "done": True,
+                                "response": f"Error Ollama: {chunk['error']}",
+                                "error": True,
+                            }
+                            return
+                        token = token_of(chunk)
+                        if token:
+                            if ttft_ms is None:
+                                ttft_ms = (time.monotonic() - start) * 1000
+                            parts.append(token)
+                            yield {"token": token}
+                        if chunk.get("done"):
+                            stats = chunk
+                            ok = True
+                            break
+
+                if missing:
+                    # El hueco del nodo se libera antes del fallback, que pide el suyo
+                    load_balancer.end(node["url"], started, ok=False)
+                    node = None
+                    yield from fallback()
+                    return
+
+        except requests.exceptions.Timeout:
+            yield {
+                "done": True,
+                "response": f"⏱️ Timeout ({self.timeout}s). Aumenta el timeout en configuración.",
+                "error": True,
+            }
+            return
+
+        except requests.exceptions.ConnectionError:
+            yield {
+                "done": True,
+                "response": "❌ No puedo conectar con Ollama. ¿Está ejecutándose?",
+                "error": True,
+            }
+            return
+
+        except Exception as e:
+            _logger.error("Error Ollama (stream): %s", str(e))
+            yield {"done": True, "response": f"Error: {str(e)}", "error": True}
+            return
+
+        finally:
+            if node:
+                load_balancer.end(node["url"], started, ok=ok)
+
+        total_ms = (time.monotonic() - start) * 1000
+        timings = self._timings(stats)
+        _logger.info(
+            "Ollama stream %s (model: %s): ttft=%.0fms total=%.0fms tokens=%s",
+            node["url"],
+            target_model,
+            ttft_ms or 0,
+            total_ms,
+            stats.get("eval_count"),
+        )
+        self._log_timings(node["url"], target_model, timings)
+        if ttft_ms is not None:
+            metrics.OLLAMA_TTFT.observe(ttft_ms / 1000, model=target_model)
+        yield {
+            "done": True,
+            "response": "".join(parts),
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+            "eval_count": stats.get("eval_count"),
+            "timings": timings,
+            "node_url": node["url"],
+        }
+
+    @staticmethod
+    def _timings(stats):
+        """Tiempos de la respuesta final de Ollama (nanosegundos) en ms."""
+        def ms(key):
+            value = stats.get(key)
+            return round(value / 1e6, 1) if value else None
+
+        return {
+            "prompt_eval_count": stats.get("prompt_eval_count"),
+            "prompt_eval_ms": ms("prompt_eval_duration"),
+            "eval_count": stats.get("eval_count"),
+            "eval_ms": ms("eval_duration"),
+            "load_ms": ms("load_duration"),
+        }
+
+    @staticmethod
+    def _log_timings(node_url, model, timings):
+        _logger.info(
+            "Ollama %s (model: %s): prompt_eval=%s tok/%sms eval=%s tok/%sms load=%sms",
+            node_url,
+            model,
+            timings.get("prompt_eval_count"),
+            timings.get("prompt_eval_ms"),
+            timings.get("eval_count"),
+            timings.get("eval_ms"),
+            timings.get("load_ms"),
+        )
+        for kind in ("prompt_eval", "eval"):
+            if timings.get(kind + "_count"):
+                metrics.OLLAMA_TOKENS.inc(timings[kind + "_count"], model=model, kind=kind)
+        if timings.get("eval_count") and timings.get("eval_ms"):
+            metrics.OLLAMA_TOKENS_PER_SECOND.observe(
+                timings["eval_count"] * 1000 / timings["eval_ms"], model=model
+            )
+
+    @staticmethod
+    def _endpoint_missing(response):
+        """404 de un Ollama antiguo sin el endpoint (no de un modelo inexistente)."""
+        return response.status_code == 404 and "model" not in response.text.lower()
+
+    def _error_message(self, response, target_model):
+        """Traduce una respuesta HTTP de error de Ollama a un mensaje para el usuario."""
+        # Manejo de errores específicos
+        error_text = response.text[:500]
+
+        if "exit status 2" in error_text:
+            return f"⚠️ Modelo '{target_model}' corrupto. Prueba: ollama pull {target_model}"
+
+        if "out of memory" in error_text.lower():
+            return "⚠️ Sin memoria GPU. Cierra otras apps o usa modelo más pequeño."
+
+        return f"Error Ollama: {response.status_code}"
+
     def test_connection(self):
         """Prueba conexión con Ollama."""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 return {"status": "ok", "models": [m.get("name") for m in models]}
@@ -111,11 +553,56 @@ class OllamaService:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    def installed_models(self, force=False):
+        """
+        Modelos instalados en el servidor (caché por proceso con TTL).
+        Returns:
+            set de nombres o None si Ollama no responde
+        """
+        cached = _installed_models.get(self.base_url)
+        if cached and not force and time.monotonic() - cached[0] < MODEL_REGISTRY_TTL:
+            return cached[1]
+        try:
+            tags = self._request("GET", "/api/tags", timeout=10)
+            if tags.status_code != 200:
+                return None
+            data = tags.json().get("models", [])
+        except Exception:
+            return None
+        names = set()
+        for m in data:
+            name = m.get("name")
+            if not name:
+                continue
+            names.add(name)
+            # Ollama lista "modelo:latest"; aceptar también el nombre sin tag
+            if name.endswith(":latest"):
+                names.add(name[: -len(":latest")])
+        names = frozenset(names)
+        _installed_models[self.base_url] = (time.monotonic(), names)
+        return names
+
     def embed(self, text, model=None):
         if not text:
             return None
+        if not self._breaker(self.base_url).is_available():
+            return None
         primary = model or getattr(self, "embedding_model", None) or self.model
-        url = f"{self.base_url}/api/embeddings"
+        key = (self.base_url, primary)
+
+        # Modelo ya resuelto en una llamada anterior: sin sondear /api/tags
+        resolved = _embedding_models.get(key)
+        if resolved:
+            try:
+                vector = self._embed_with(resolved, text)
+            except Exception as e:
+                _logger.error("Error embeddings: %s", str(e))
+                vector = None
+            if vector:
+                return vector
+            # Falló: olvidar la resolución y recorrer de nuevo los candidatos
+            _embedding_models.pop(key, None)
+
         candidates = []
         if primary:
             candidates.append(primary)
@@ -125,24 +612,101 @@ class OllamaService:
             candidates.append("nomic-embed-text")
         if self.model and self.model not in candidates:
             candidates.append(self.model)
-        installed = None
-        try:
-            tags = requests.get(f"{self.base_url}/api/tags", timeout=10)
-            if tags.status_code == 200:
-                data = tags.json().get("models", [])
-                names = {m.get("name") for m in data if m.get("name")}
-                installed = names
-        except Exception:
-            installed = None
+        installed = self.installed_models(force=bool(resolved))
         try:
             for candidate in candidates:
                 if installed is not None and candidate not in installed:
                     continue
-                r = requests.post(url, json={"model": candidate, "prompt": text}, timeout=self.timeout)
-                if r.status_code == 200:
-                    return r.json().get("embedding")
+                vector = self._embed_with(candidate, text)
+                if vector:
+                    _embedding_models[key] = candidate
+                    if candidate != primary:
+                        _logger.info(
+                            "Modelo de embeddings '%s' no disponible, usando '%s'",
+                            primary,
+                            candidate,
+                        )
+                    return vector
             _logger.warning("Ollama embeddings no disponibles. Instale un modelo de embeddings como 'nomic-embed-text' o 'all-minilm'.")
             return None
         except Exception as e:
             _logger.error("Error embeddings: %s", str(e))
             return None
+
+    def _embed_with(self, model, text):
+        r = self._request(
+            "POST", "/api/embeddings", json={"model": model, "prompt": text}, timeout=self.timeout
+        )
+        if r.status_code == 200:
+            return r.json().get("embedding")
+        return None
+
+    def embed_many(self, texts, batch_size=EMBED_BATCH_SIZE, model=None):
+        """
+        Embeddings en lote con /api/embed (entrada como array).
+        Los lotes se cortan por número de textos y por caracteres totales;
+        si Ollama rechaza un lote se divide a la mitad, y si el endpoint no
+        existe (Ollama antiguo) se recurre a embed() texto a texto.
+        Returns:
+            list: un vector (o None) por cada texto, en el mismo orden
+        """
+        vectors = [None] * len(texts)
+        items = [(i, t) for i, t in enumerate(texts) if t]
+        if not items or not self._breaker(self.base_url).is_available():
+            return vectors
+
+        primary = model or getattr(self, "embedding_model", None) or self.model
+        resolved = _embedding_models.get((self.base_url, primary))
+        if not resolved:
+            # Resolver el modelo (cadena de fallback) con el primer texto
+            first_index, first_text = items.pop(0)
+            vectors[first_index] = self.embed(first_text, model=model)
+            resolved = _embedding_models.get((self.base_url, primary))
+            if not resolved:
+                return vectors
+
+        for batch in self._split_batches(items, batch_size):
+            self._embed_batch_into(resolved, batch, vectors, model)
+        return vectors
+
+    def _split_batches(self, items, batch_size):
+        batch = []
+        chars = 0
+        for item in items:
+            size = len(item[1])
+            if batch and (len(batch) >= batch_size or chars + size > EMBED_BATCH_CHARS):
+                yield batch
+                batch = []
+                chars = 0
+            batch.append(item)
+            chars += size
+        if batch:
+            yield batch
+
+    def _embed_batch_into(self, resolved, batch, vectors, model):
+        try:
+            r = self._request(
+                "POST",
+                "/api/embed",
+                json={"model": resolved, "input": [t for _i, t in batch]},
+                timeout=self.timeout,
+            )
+            embeddings = r.json().get("embeddings") if r.status_code == 200 else None
+        except Exception as e:
+            # Sin conexión no tiene sentido reintentar texto a texto
+            _logger.error("Error embeddings en lote: %s", str(e))
+            return
+
+        if embeddings and len(embeddings) == len(batch):
+            for (index, _text), vector in zip(batch, embeddings):
+                vectors[index] = vector
+            return
+
+        if r.status_code != 404 and len(batch) > 1:
+            half = len(batch) // 2
+            self._embed_batch_into(resolved, batch[:half], vectors, model)
+            self._embed_batch_into(resolved, batch[half:], vectors, model)
+            return
+
+        for index, text in batch:
+            vectors[index] = self.embed(text, model=model)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+PromptBudget - Presupuesto de tokens por sección del prompt
+
+Estima los tokens de cada sección (system, contexto, historial, consulta),
+recorta historial y contexto para que quepan en la ventana configurada.
+
+num_ctx no varía por petición: Ollama recarga el modelo al cambiarlo y
+descarta la caché KV del prefijo que reutiliza /api/chat. Se usa siempre
+la ventana configurada y solo se recorta el prompt.
+"""
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Estimación aproximada para texto en español con tokenizadores BPE
+CHARS_PER_TOKEN = 3.5
+# Tokens reservados para la respuesta
+RESPONSE_TOKENS = 256
+# Parte del espacio libre que puede ocupar el contexto recuperado
+CONTEXT_SHARE = 0.5
+# Tope por mensaje del historial
+HISTORY_MESSAGE_TOKENS = 150
+
+ELLIPSIS = " […]"
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def clip_text(text, max_tokens):
+    """Recorta ``text`` a ``max_tokens`` (aprox.), marcando el corte."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN) - len(ELLIPSIS), 0)
+    return text[:max_chars].rstrip() + ELLIPSIS if max_chars else ""
+
+
+class PromptBudget:
+    """Ajusta las secciones de un prompt a la ventana de contexto."""
+
+    def __init__(self, max_ctx, response_tokens=RESPONSE_TOKENS):
+        self.max_ctx = max_ctx
+        self.response_tokens = response_tokens
+
+    def fit(self, system, context, history, query):
+        """
+        Args:
+            system: Prompt de sistema (no se recorta)
+            context: Contexto recuperado (recortable)
+            history: Lista de {"role", "content"}, del más antiguo al más reciente
+            query: Consulta del usuario (no se recorta)
+        Returns:
+            dict con context, history, num_ctx y el desglose en 'tokens'
+            (incluidos los mensajes descartados en 'dropped_history')
+        """
+        available = self.max_ctx - self.response_tokens
+        fixed = estimate_tokens(system) + estimate_tokens(query)
+        free = max(available - fixed, 0)
+
+        context_tokens = estimate_tokens(context)
+        if context_tokens > free * CONTEXT_SHARE:
+            context = clip_text(context, int(free * CONTEXT_SHARE))
+            context_tokens = estimate_tokens(context)
+        free -= context_tokens
+
+        # Historial: del más reciente hacia atrás mientras quepa
+        kept = []
+        history_tokens = 0
+        for message in reversed(history or []):
+            content = clip_text(message["content"], HISTORY_MESSAGE_TOKENS)
+            tokens = estimate_tokens(content)
+            if history_tokens + tokens > free:
+                break
+            kept.append(dict(message, content=content))
+            history_tokens += tokens
+        kept.reverse()
+        dropped = len(history or []) - len(kept)
+
+        total = fixed + context_tokens + history_tokens
+        if total > available:
+            _logger.warning(
+                "Prompt de ~%s tokens supera la ventana de %s", total, self.max_ctx
+            )
+        return {
+            "context": context,
+            "history": kept,
+            "num_ctx": self.max_ctx,
+            "tokens": {
+                "system": estimate_tokens(system),
+                "context": context_tokens,
+                "history": history_tokens,
+                "query": estimate_tokens(query),
+                "total": total,
+                "dropped_history": dropped,
+            },
+        }
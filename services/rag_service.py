@@ -3,6 +3,7 @@
 import base64
 import logging
 import re
+from types import SimpleNamespace
 
 import requests
 
@@ -12,12 +13,18 @@ except Exception:
     def html2plaintext(value):
         return re.sub(r"<[^>]+>", " ", value or "")
 
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .intent_router import fast_path
 from .ollama_service import OllamaService
 
 
 _logger = logging.getLogger(__name__)
 
+# Registros embebidos e insertados en Qdrant por cada lote
+INDEX_BATCH_SIZE = 64
 
+
+@fast_path("docs", expert_name="DocsExpert")
 def parse_docs_prompt(prompt):
     if not prompt:
         return None
@@ -28,6 +35,7 @@ def parse_docs_prompt(prompt):
     return {"tool": "search_docs", "params": {"query": prompt.strip()}}
 
 
+@fast_path("mail", expert_name="MailExpert")
 def parse_mail_prompt(prompt):
     if not prompt:
         return None
@@ -41,8 +49,26 @@ def parse_mail_prompt(prompt):
 class VectorRagService:
     def __init__(self, env):
         self.env = env
-        self.config = env["ai.vector.config"].search([("active", "=", True)], limit=1)
+        config = env["ai.vector.config"]._get_service_config()
+        self.config = SimpleNamespace(**config) if config else None
         self.ollama = OllamaService(env)
+        self.breaker = get_breaker(self.config.url, "/readyz") if self.config else None
+
+    def is_available(self):
+        """False si no hay configuración o el circuito de Qdrant está abierto."""
+        return bool(self.config) and self.breaker.is_available()
+
+    def _request(self, method, url, **kwargs):
+        """Petición a Qdrant protegida por el circuit breaker."""
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuito de {self.config.url} abierto")
+        try:
+            res = requests.request(method, url, headers=self._headers(), **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return res
 
     def _headers(self):
         if self.config and self.config.api_key:
@@ -55,7 +81,7 @@ class VectorRagService:
     def _ensure_collection(self, vector_size):
         url = self._collection_url()
         try:
-            res = requests.get(url, headers=self._headers(), timeout=5)
+            res = self._request("GET", url, timeout=5)
             if res.status_code == 200:
                 return True
             if res.status_code != 404:
@@ -63,7 +89,7 @@ class VectorRagService:
             payload = {
                 "vectors": {"size": vector_size, "distance": "Cosine"},
             }
-            create = requests.put(url, json=payload, headers=self._headers(), timeout=10)
+            create = self._request("PUT", url, json=payload, timeout=10)
             return create.status_code in [200, 201]
         except Exception:
             return False
@@ -81,9 +107,38 @@ class VectorRagService:
             return False
         url = f"{self._collection_url()}/points?wait=true"
         payload = {"points": points}
-        res = requests.post(url, json=payload, headers=self._headers(), timeout=20)
+        try:
+            res = self._request("POST", url, json=payload, timeout=20)
+        except requests.exceptions.RequestException as e:
+            _logger.warning("Qdrant upsert error: %s", str(e))
+            return False
         return res.status_code in [200, 201]
 
+    def _index_points(self, pending):
+        """
+        Embebe e inserta en lote una lista de (point_id, content, payload).
+        Returns: número de puntos indexados
+        """
+        count = 0
+        collection_ready = False
+        for start in range(0, len(pending), INDEX_BATCH_SIZE):
+            chunk = pending[start : start + INDEX_BATCH_SIZE]
+            vectors = self.ollama.embed_many([content for _pid, content, _p in chunk])
+            points = []
+            for (point_id, _content, payload), vector in zip(chunk, vectors):
+                if not vector:
+                    continue
+                points.append({"id": point_id, "vector": vector, "payload": payload})
+            if not points:
+                continue
+            if not collection_ready:
+                if not self._ensure_collection(len(points[0]["vector"])):
+                    return count
+                collection_ready = True
+            if self._upsert_points(points):
+                count += len(points)
+        return count
+
     def index_documents(self, since=None):
         if not self.config:
             return 0
@@ -93,7 +148,7 @@ class VectorRagService:
         attachments = self.env["ir.attachment"].search_read(
             domain, ["id", "name", "mimetype", "datas", "write_date"]
         )
-        count = 0
+        pending = []
         for att in attachments:
             raw = base64.b64decode(att.get("datas") or b"")
             text = raw.decode("utf-8", errors="ignore")
@@ -102,25 +157,15 @@ class VectorRagService:
             content = self._sanitize(text)
             if len(content) < 30:
                 continue
-            vector = self._embed(content)
-            if not vector:
-                continue
-            if not self._ensure_collection(len(vector)):
-                return count
-            point = {
-                "id": f"doc_{att['id']}",
-                "vector": vector,
-                "payload": {
-                    "source": "docs",
-                    "record_id": att["id"],
-                    "title": att.get("name"),
-                    "content": content,
-                    "updated": att.get("write_date"),
-                },
+            payload = {
+                "source": "docs",
+                "record_id": att["id"],
+                "title": att.get("name"),
+                "content": content,
+                "updated": att.get("write_date"),
             }
-            if self._upsert_points([point]):
-                count += 1
-        return count
+            pending.append((f"doc_{att['id']}", content, payload))
+        return self._index_points(pending)
 
     def index_mail(self, since=None):
         if not self.config:
@@ -131,38 +176,30 @@ class VectorRagService:
         messages = self.env["mail.message"].search_read(
             domain, ["id", "subject", "body", "author_id", "write_date"]
         )
-        count = 0
+        pending = []
         for msg in messages:
             body = html2plaintext(msg.get("body") or "")
             subject = msg.get("subject") or ""
             content = self._sanitize(f"{subject}\n{body}")
             if len(content) < 30:
                 continue
-            vector = self._embed(content)
-            if not vector:
-                continue
-            if not self._ensure_collection(len(vector)):
-                return count
             author = msg.get("author_id")
-            point = {
-                "id": f"mail_{msg['id']}",
-                "vector": vector,
-                "payload": {
-                    "source": "mail",
-                    "record_id": msg["id"],
-                    "title": subject,
-                    "author": author[1] if author else "",
-                    "content": content,
-                    "updated": msg.get("write_date"),
-                },
+            payload = {
+                "source": "mail",
+                "record_id": msg["id"],
+                "title": subject,
+                "author": author[1] if author else "",
+                "content": content,
+                "updated": msg.get("write_date"),
             }
-            if self._upsert_points([point]):
-                count += 1
-        return count
+            pending.append((f"mail_{msg['id']}", content, payload))
+        return self._index_points(pending)
 
     def search(self, query, source, limit=5):
         if not self.config:
             return "⚠️ No hay configuración de Qdrant activa."
+        if not self.breaker.is_available():
+            return "⚠️ Qdrant no está disponible."
         vector = self._embed(query)
         if not vector:
             return "⚠️ No se pudo generar embedding."
@@ -176,7 +213,7 @@ class VectorRagService:
         }
         url = f"{self._collection_url()}/points/search"
         try:
-            res = requests.post(url, json=payload, headers=self._headers(), timeout=20)
+            res = self._request("POST", url, json=payload, timeout=20)
             if res.status_code != 200:
                 _logger.warning("Qdrant search error: %s", res.text[:200])
                 return "⚠️ Error consultando Qdrant."
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+ResponseCache - Caché persistente de respuestas del LLM
+
+Solo guarda turnos que se resuelven en una herramienta de consulta: se
+cachea la acción (herramienta + params), no el texto, así que los datos
+se vuelven a consultar en cada acierto.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from . import metrics
+
+_logger = logging.getLogger(__name__)
+
+# Contadores del proceso (informativos, por worker)
+CACHE_STATS = {"hits": 0, "misses": 0, "stores": 0}
+
+# Los aciertos no escriben la fila en la transacción de la petición (todas
+# las consultas calientes idénticas se bloquearían en ella): se acumulan por
+# proceso y se vuelcan con incrementos atómicos cada FLUSH_INTERVAL segundos
+FLUSH_INTERVAL = 60
+_hits_lock = threading.Lock()
+# base de datos -> {clave: aciertos pendientes}
+_pending_hits = {}
+_last_flush = {}
+
+
+def normalize_query(query):
+    return " ".join((query or "").lower().split())
+
+
+def make_cache_key(model, options, system_prompt, query, scope=None):
+    raw = json.dumps(
+        [model, options, system_prompt, normalize_query(query), scope],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Acceso a ai.response.cache con la configuración de ir.config_parameter."""
+
+    def __init__(self, env):
+        self.env = env
+        params = env["ir.config_parameter"].sudo()
+        self.enabled = params.get_param(
+            "ai_production_assistant.response_cache_enabled", "False"
+        ) in ("True", "true", "1")
+        self.ttl = int(
+            params.get_param("ai_production_assistant.response_cache_ttl", 3600) or 0
+        )
+        self.max_entries = int(
+            params.get_param("ai_production_assistant.response_cache_size", 500) or 0
+        )
+
+    def key_for_turn(self, turn, query):
+        ollama = turn["ollama"]
+        options = {"num_ctx": ollama.num_ctx, "temperature": ollama.temperature}
+        # Plantilla del experto + herramientas: sin la fecha/hora del prompt
+        system_prompt = "%s\n%s" % (
+            turn["expert_prompt"],
+            json.dumps(turn["expert_tools"], sort_keys=True, ensure_ascii=False),
+        )
+        # La acción acertada se reutiliza tal cual: no se comparte entre
+        # usuarios o compañías con reglas de registro distintas
+        scope = [self.env.uid, sorted(self.env.companies.ids)]
+        return make_cache_key(turn["model"], options, system_prompt, query, scope)
+
+    def get(self, key):
+        cached = self.env["ai.response.cache"].sudo()._lookup(key, self.ttl)
+        if cached:
+            CACHE_STATS["hits"] += 1
+            metrics.CACHE_LOOKUPS.inc(cache="response", result="hit")
+            _logger.info("Caché de respuestas: acierto %s", key[:12])
+            self._record_hit(key)
+        else:
+            CACHE_STATS["misses"] += 1
+            metrics.CACHE_LOOKUPS.inc(cache="response", result="miss")
+        return cached
+
+    def put(self, key, turn, query, action):
+        self.env["ai.response.cache"].sudo()._store(
+            key,
+            {
+                "model_name": turn["model"],
+                "expert_name": turn["expert_name"],
+                "query": query,
+                "action_json": json.dumps(action, ensure_ascii=False),
+            },
+            self.max_entries,
+        )
+        CACHE_STATS["stores"] += 1
+
+    def _record_hit(self, key):
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        with _hits_lock:
+            pending = _pending_hits.setdefault(dbname, {})
+            pending[key] = pending.get(key, 0) + 1
+            if now - _last_flush.setdefault(dbname, now) < FLUSH_INTERVAL:
+                return
+            _last_flush[dbname] = now
+            hits = _pending_hits.pop(dbname)
+        try:
+            self.env["ai.response.cache"].sudo()._flush_hits(hits)
+        except Exception as e:
+            _logger.debug("Aciertos de caché no volcados: %s", str(e))
@@ -1,37 +1,45 @@
 # -*- coding: utf-8 -*-
-import json
 import re
 
+from .json_extractor import JsonExtractor
+
 
 class ResponseParser:
-    ACTION_PATTERN = r"\[\[ACTION_DATA:\s*(.*?)\s*\]\]"
+    ACTION_MARKER = "[[ACTION_DATA:"
 
     def parse_actions(self, raw_text):
         """
         Extrae bloques [[ACTION_DATA: {...}]] del texto.
         Retorna: (clean_text, action_list)
         """
-        actions = []
-        clean_text = raw_text
-
         if not raw_text:
             return "", []
 
-        # Buscar todos los bloques de acción
-        matches = re.findall(self.ACTION_PATTERN, raw_text, re.DOTALL)
-        for match in matches:
-            try:
-                action_data = json.loads(match)
-                if isinstance(action_data, dict):
-                    actions.append(action_data)
-            except json.JSONDecodeError:
-                continue
-
-        # Eliminar los bloques del texto mostrado al usuario
-        clean_text = re.sub(
-            self.ACTION_PATTERN, "", clean_text, flags=re.DOTALL
-        ).strip()
-        return clean_text, actions
+        actions = []
+        pieces = []
+        pos = 0
+        while True:
+            start = raw_text.find(self.ACTION_MARKER, pos)
+            if start == -1:
+                break
+            body = start + len(self.ACTION_MARKER)
+            extractor = JsonExtractor()
+            extractor.feed(raw_text[body:])
+            value = extractor.finish()
+            # El JSON debe empezar justo tras el marcador (solo espacios)
+            if extractor.found and not raw_text[body : body + extractor.span[0]].strip():
+                close = raw_text.find("]]", body + extractor.span[1])
+                if isinstance(value, dict):
+                    actions.append(value)
+            else:
+                close = raw_text.find("]]", body)
+            if close == -1:
+                break
+            # Eliminar el bloque del texto mostrado al usuario
+            pieces.append(raw_text[pos:start])
+            pos = close + 2
+        pieces.append(raw_text[pos:])
+        return "".join(pieces).strip(), actions
 
     def format_html(self, text):
         """Convierte texto plano a HTML simple para Odoo."""
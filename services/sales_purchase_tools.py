@@ -2,6 +2,14 @@
 
 import re
 from datetime import datetime, timedelta
+from functools import lru_cache
+
+from .intent_router import fast_path
+
+_LAST_DAYS_RE = re.compile(r"(últimos|ultimos)\s+(\d+)\s+d[ií]as")
+_PARTNER_NOISE_RE = re.compile(
+    r"\b(este mes|mes actual|trimestre|hoy|últimos?\s+\d+\s+d[ií]as)\b", re.IGNORECASE
+)
 
 
 def resolve_date_range(text):
@@ -13,7 +21,7 @@ def resolve_date_range(text):
     if "hoy" in lower:
         return {"date_from": today.isoformat(), "date_to": today.isoformat()}
 
-    match = re.search(r"(últimos|ultimos)\s+(\d+)\s+d[ií]as", lower)
+    match = _LAST_DAYS_RE.search(lower)
     if match:
         days = int(match.group(2))
         start = today - timedelta(days=days)
@@ -31,24 +39,27 @@ def resolve_date_range(text):
     return None
 
 
+@lru_cache(maxsize=None)
+def _partner_pattern(keyword):
+    return re.compile(
+        rf"{keyword}\s*[:=]?\s*\"([^\"]+)\"|{keyword}\s*[:=]?\s*'([^']+)'|{keyword}\s+([^,;\n]+)",
+        re.IGNORECASE,
+    )
+
+
 def _extract_partner(text, keyword):
-    pattern = rf"{keyword}\s*[:=]?\s*\"([^\"]+)\"|{keyword}\s*[:=]?\s*'([^']+)'|{keyword}\s+([^,;\n]+)"
-    match = re.search(pattern, text, flags=re.IGNORECASE)
+    match = _partner_pattern(keyword).search(text)
     if not match:
         return None
     name = match.group(1) or match.group(2) or match.group(3)
     if not name:
         return None
-    name = re.sub(
-        r"\b(este mes|mes actual|trimestre|hoy|últimos?\s+\d+\s+d[ií]as)\b",
-        "",
-        name,
-        flags=re.IGNORECASE,
-    )
+    name = _PARTNER_NOISE_RE.sub("", name)
     name = name.strip(" .,-;:")
     return name or None
 
 
+@fast_path("sales", expert_name="SalesExpert")
 def parse_sale_orders_prompt(prompt):
     if not prompt:
         return None
@@ -85,6 +96,7 @@ def parse_sale_orders_prompt(prompt):
     return {"tool": "search_sale_orders", "params": params}
 
 
+@fast_path("purchase", expert_name="PurchaseExpert")
 def parse_purchase_orders_prompt(prompt):
     if not prompt:
         return None
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+SemanticCache - Caché por intención (similitud de embeddings)
+
+Guarda el embedding de cada consulta resuelta con una herramienta de
+consulta junto con su acción. Una consulta parecida (coseno por encima
+del umbral) reutiliza la acción sin llamar al LLM; la acción se vuelve a
+ejecutar para obtener datos frescos.
+"""
+
+import logging
+import threading
+import unicodedata
+
+from . import metrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logging.getLogger(__name__).warning(
+        "numpy no está instalado. La caché semántica no estará disponible."
+    )
+
+_logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Índices por (base de datos, modelo LLM, modelo de embeddings)
+_indexes = {}
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).split())
+
+
+class VectorIndex:
+    """Matriz de embeddings normalizados con expulsión LRU."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.vectors = None
+        self.entries = [None] * capacity
+        self.last_used = [0] * capacity
+        self.size = 0
+        self.tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.lock = threading.Lock()
+
+    def search(self, vector, threshold):
+        """Returns: (entrada, similitud) de la más parecida por encima del umbral."""
+        with self.lock:
+            if not self.size or len(vector) != self.vectors.shape[1]:
+                return None, 0.0
+            scores = self.vectors[: self.size] @ vector
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            if score < threshold:
+                return None, score
+            self.tick += 1
+            self.last_used[best] = self.tick
+            return self.entries[best], score
+
+    def add(self, vector, entry):
+        with self.lock:
+            if self.vectors is None or self.vectors.shape[1] != len(vector):
+                # Primer uso o cambio de dimensión (otro modelo de embeddings)
+                self.vectors = np.zeros((self.capacity, len(vector)), dtype=np.float32)
+                self.size = 0
+            if self.size < self.capacity:
+                row = self.size
+                self.size += 1
+            else:
+                row = min(range(self.capacity), key=self.last_used.__getitem__)
+            self.tick += 1
+            self.vectors[row] = vector
+            self.entries[row] = entry
+            self.last_used[row] = self.tick
+            self.stores += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def get_index(key, capacity):
+    index = _indexes.get(key)
+    if index is None or index.capacity != capacity:
+        with _lock:
+            index = _indexes.get(key)
+            if index is None or index.capacity != capacity:
+                index = _indexes[key] = VectorIndex(capacity)
+    return index
+
+
+def clear_indexes():
+    _indexes.clear()
+
+
+def semantic_cache_stats():
+    return {" / ".join(key): index.stats() for key, index in list(_indexes.items())}
+
+
+class SemanticCache:
+    """Acceso a la caché semántica con la configuración de ir.config_parameter."""
+
+    def __init__(self, env):
+        self.env = env
+        params = env["ir.config_parameter"].sudo()
+        self.enabled = np is not None and params.get_param(
+            "ai_production_assistant.semantic_cache_enabled", "False"
+        ) in ("True", "true", "1")
+        self.threshold = float(
+            params.get_param("ai_production_assistant.semantic_cache_threshold", 0.95)
+            or 0.95
+        )
+        self.capacity = int(
+            params.get_param("ai_production_assistant.semantic_cache_size", 256) or 256
+        )
+
+    def _index(self, turn):
+        ollama = turn["ollama"]
+        key = (self.env.cr.dbname, turn["model"], ollama.embedding_model)
+        return get_index(key, self.capacity)
+
+    def _embed(self, turn, query):
+        """Embedding normalizado de la consulta (se guarda en el turno)."""
+        if "query_vector" not in turn:
+            vector = turn["ollama"].embed(query)
+            if vector:
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = float(np.linalg.norm(vector))
+                vector = vector / norm if norm else None
+            turn["query_vector"] = vector
+        return turn["query_vector"]
+
+    def get(self, turn, query):
+        """Acción cacheada para una consulta equivalente, o None."""
+        vector = self._embed(turn, query)
+        if vector is None:
+            return None
+        index = self._index(turn)
+        entry, score = index.search(vector, self.threshold)
+        if entry and self._compatible(entry, turn, query):
+            index.hits += 1
+            metrics.CACHE_LOOKUPS.inc(cache="semantic", result="hit")
+            _logger.info(
+                "Caché semántica: acierto (%.3f) '%s' ~ '%s'", score, query, entry["query"]
+            )
+            return entry
+        index.misses += 1
+        metrics.CACHE_LOOKUPS.inc(cache="semantic", result="miss")
+        return None
+
+    def put(self, turn, query, action):
+        vector = self._embed(turn, query)
+        if vector is None:
+            return
+        self._index(turn).add(
+            vector,
+            {"query": query, "action": action, "expert_name": turn["expert_name"]},
+        )
+
+    @staticmethod
+    def _compatible(entry, turn, query):
+        """
+        La acción debe existir para el experto actual, y los valores de
+        texto que se copiaron de la consulta original (p. ej. el nombre
+        del producto) deben aparecer también en la nueva.
+        """
+        action = entry["action"]
+        if action.get("tool") not in turn["expert_tools"]:
+            return False
+        cached_query = _normalize(entry["query"])
+        new_query = _normalize(query)
+        for value in (action.get("params") or {}).values():
+            if isinstance(value, str) and value.strip():
+                value = _normalize(value)
+                if value in cached_query and value not in new_query:
+                    return False
+        return True
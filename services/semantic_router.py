@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+SemanticRouter - Selección de experto MoE por similitud de embeddings
+
+Cada experto tiene frases de ejemplo; se embeben una sola vez por
+(nodo, modelo de embeddings) y su media normalizada (centroide) se guarda
+en una matriz. Cada consulta se embebe y se puntúa contra todos los
+expertos con un único producto matricial. Si los dos mejores quedan a
+menos de 'margin' o el mejor no llega a 'min_score', decide la regla de
+palabras clave (intent_router).
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logging.getLogger(__name__).warning(
+        "numpy no está instalado. El enrutado semántico no estará disponible."
+    )
+
+_logger = logging.getLogger(__name__)
+
+# Experto -> frases de ejemplo ("generalist" es el asistente general)
+EXPERT_EXAMPLES = {
+    "manufacturing": [
+        "¿Qué órdenes de fabricación hay en curso?",
+        "Crea una orden de producción de 50 sillas",
+        "¿Qué componentes lleva la lista de materiales de la mesa?",
+        "Necesito fabricar más tableros esta semana",
+        "¿Qué centro de trabajo está libre para la producción?",
+        "Planifica la fabricación del pedido de estanterías",
+    ],
+    "inventory": [
+        "¿Cuánto stock queda de tornillos M8?",
+        "¿En qué ubicación del almacén está el lote 42?",
+        "Ajusta el inventario de la pintura blanca a 30 unidades",
+        "¿Qué productos tienen existencias por debajo del mínimo?",
+        "Da de alta un producto nuevo con su coste y precio",
+        "¿Cuántas unidades tenemos en el almacén principal?",
+    ],
+    "kaizen": [
+        "¿Por qué se están retrasando las órdenes?",
+        "Analiza los cuellos de botella de la línea de montaje",
+        "¿Cómo puedo mejorar la eficiencia del turno de noche?",
+        "Propón acciones para reducir los desperdicios",
+        "¿Qué problema se repite más en las órdenes retrasadas?",
+        "Optimiza los tiempos de cambio de la prensa",
+    ],
+    "generalist": [
+        "Hola, ¿qué puedes hacer?",
+        "¿Qué hora es?",
+        "Resume lo que hemos hablado",
+        "¿Qué modelo de lenguaje eres?",
+        "Busca en la documentación el procedimiento de seguridad",
+        "¿Tengo correos pendientes del proveedor?",
+    ],
+}
+
+# Sin embeddings (Ollama caído, modelo ausente) se reintenta pasado este tiempo
+RETRY_SECONDS = 300
+
+_lock = threading.Lock()
+# (url, modelo de embeddings) -> {"experts", "matrix", "built_at"} o {"failed_at"}
+_centroids = {}
+_stats = {"semantic": 0, "tie_break": 0, "keyword": 0, "route_ms": 0.0}
+
+
+def _examples_hash():
+    raw = json.dumps(EXPERT_EXAMPLES, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def build_centroids(ollama):
+    """Embebe los ejemplos (en lote) y devuelve (expertos, matriz k x d)."""
+    experts, texts, owners = list(EXPERT_EXAMPLES), [], []
+    for i, expert in enumerate(experts):
+        texts += EXPERT_EXAMPLES[expert]
+        owners += [i] * len(EXPERT_EXAMPLES[expert])
+    vectors = ollama.embed_many(texts)
+    rows = {}
+    for owner, vector in zip(owners, vectors):
+        if vector:
+            rows.setdefault(owner, []).append(vector)
+    if len(rows) != len(experts):
+        return None
+    examples = [_normalize_rows(np.asarray(rows[i], dtype=np.float32)) for i in range(len(experts))]
+    matrix = _normalize_rows(np.stack([block.mean(axis=0) for block in examples]))
+    return experts, matrix
+
+
+def get_centroids(ollama):
+    """Centroides cacheados por proceso (None si no se pueden calcular)."""
+    key = (ollama.base_url, ollama.embedding_model, _examples_hash())
+    entry = _centroids.get(key)
+    if entry and "matrix" in entry:
+        return entry["experts"], entry["matrix"]
+    if entry and time.monotonic() - entry["failed_at"] < RETRY_SECONDS:
+        return None
+    with _lock:
+        entry = _centroids.get(key)
+        if entry and "matrix" in entry:
+            return entry["experts"], entry["matrix"]
+        started = time.monotonic()
+        built = build_centroids(ollama)
+        if built is None:
+            _logger.warning("Enrutado semántico: no se pudieron embeber los ejemplos")
+            _centroids[key] = {"failed_at": time.monotonic()}
+            return None
+        _centroids[key] = {"experts": built[0], "matrix": built[1], "built_at": time.time()}
+        _logger.info(
+            "Enrutado semántico: %s centroides (%s dims) en %.0fms",
+            len(built[0]),
+            built[1].shape[1],
+            (time.monotonic() - started) * 1000,
+        )
+        return built
+
+
+def score(matrix, vector):
+    """Similitud coseno de un vector normalizado con cada centroide."""
+    return matrix @ vector
+
+
+def decide(experts, scores, keyword_expert, margin, min_score):
+    """
+    Returns: (experto o None para el generalista, método, puntuación).
+    La regla de palabras clave decide en empates y por debajo de min_score.
+    """
+    order = np.argsort(scores)[::-1]
+    best, second = int(order[0]), int(order[1]) if len(order) > 1 else None
+    best_score = float(scores[best])
+    keyword = keyword_expert or "generalist"
+    if best_score < min_score:
+        return keyword_expert, "keyword", best_score
+    if second is not None and best_score - float(scores[second]) < margin:
+        tied = {experts[best], experts[second]}
+        choice = keyword if keyword in tied else experts[best]
+        expert = None if choice == "generalist" else choice
+        return expert, "tie_break", best_score
+    expert = experts[best]
+    return (None if expert == "generalist" else expert), "semantic", best_score
+
+
+class SemanticRouter:
+    """Enrutado semántico con la configuración de ir.config_parameter."""
+
+    def __init__(self, env):
+        params = env["ir.config_parameter"].sudo()
+        self.enabled = np is not None and params.get_param(
+            "ai_production_assistant.moe_routing_mode", "keyword"
+        ) == "semantic"
+        self.margin = float(
+            params.get_param("ai_production_assistant.moe_semantic_margin", 0.03) or 0.03
+        )
+        self.min_score = float(
+            params.get_param("ai_production_assistant.moe_semantic_min_score", 0.3) or 0.3
+        )
+
+    def route(self, query, ollama, keyword_expert):
+        """
+        Returns: (experto, método, puntuación, vector normalizado de la
+        consulta o None). Sin embeddings devuelve la decisión por palabras.
+        """
+        started = time.monotonic()
+        centroids = get_centroids(ollama)
+        vector = ollama.embed(query) if centroids else None
+        if vector is None:
+            _stats["keyword"] += 1
+            return keyword_expert, "keyword", None, None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if not norm or len(vector) != centroids[1].shape[1]:
+            _stats["keyword"] += 1
+            return keyword_expert, "keyword", None, None
+        vector = vector / norm
+        scores = score(centroids[1], vector)
+        expert, method, best_score = decide(
+            centroids[0], scores, keyword_expert, self.margin, self.min_score
+        )
+        elapsed = (time.monotonic() - started) * 1000
+        _stats[method] += 1
+        _stats["route_ms"] += elapsed
+        _logger.info(
+            "MoE semántico: %s (%s, %.3f) palabras=%s puntuaciones=%s %.1fms",
+            expert or "generalist",
+            method,
+            best_score,
+            keyword_expert or "generalist",
+            {e: round(float(s), 3) for e, s in zip(centroids[0], scores)},
+            elapsed,
+        )
+        return expert, method, best_score, vector
+
+
+def semantic_router_stats():
+    routed = _stats["semantic"] + _stats["tie_break"]
+    return {
+        "centroids": [
+            " / ".join(str(part) for part in key[:2])
+            for key, entry in list(_centroids.items())
+            if "matrix" in entry
+        ],
+        "semantic": _stats["semantic"],
+        "tie_break": _stats["tie_break"],
+        "keyword": _stats["keyword"],
+        "avg_route_ms": round(_stats["route_ms"] / routed, 2) if routed else 0.0,
+    }
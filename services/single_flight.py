@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+SingleFlight - Agrupación de llamadas idénticas simultáneas
+
+Si llega una llamada con la misma clave que otra todavía en curso, no se
+repite: espera a la primera y recibe una copia de su resultado (o su
+excepción). Solo agrupa llamadas concurrentes del mismo proceso; no es una
+caché, en cuanto la primera termina la clave se libera.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+_groups = {}
+
+
+def make_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_params(params):
+    """Params comparables: textos sin mayúsculas ni espacios sobrantes."""
+    if isinstance(params, dict):
+        return {key: normalize_params(value) for key, value in params.items()}
+    if isinstance(params, list):
+        return [normalize_params(value) for value in params]
+    if isinstance(params, str):
+        return " ".join(params.lower().split())
+    return params
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.shared = 0
+        _groups[name] = self
+
+    def do(self, key, func, *args, **kwargs):
+        """Ejecuta ``func`` salvo que ya haya una llamada con ``key`` en curso."""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            _logger.debug("SingleFlight %s: esperando llamada en curso", self.name)
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = func(*args, **kwargs)
+            # Instantánea para los que esperan: el llamante puede modificar la suya
+            call.result = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "in_flight": len(self.calls),
+                "executed": self.executed,
+                "shared": self.shared,
+            }
+
+
+def single_flight_stats():
+    return {name: group.stats() for name, group in list(_groups.items())}
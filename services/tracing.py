@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Tracing - Tiempos por fase de cada turno del asistente
+
+Cada turno abre una traza en el hilo que lo atiende; el código de las
+distintas capas anota sus fases con ``span(nombre)`` sin recibir la traza
+como parámetro (fuera de una traza no hace nada). Al terminar, la traza
+se guarda en ai.request.trace. Las fases se acumulan por nombre y son
+inclusivas: 'fast_path' contiene su 'tool' y 'message_write' sus 'bus'.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+# Tiempos de Ollama que se copian a la traza (ms)
+OLLAMA_TIMINGS = {
+    "prompt_eval_ms": "prompt_eval",
+    "eval_ms": "eval",
+    "load_ms": "load",
+}
+
+
+class Trace:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.monotonic()
+        self.spans = {}
+        self.counts = {}
+        self.meta = {}
+
+    def add(self, name, ms):
+        if ms is None:
+            return
+        self.spans[name] = self.spans.get(name, 0.0) + ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def add_timings(self, timings):
+        """Duraciones devueltas por Ollama (prompt_eval, eval, load)."""
+        for key, name in OLLAMA_TIMINGS.items():
+            self.add(name, (timings or {}).get(key))
+        for key in ("prompt_eval_count", "eval_count"):
+            if (timings or {}).get(key):
+                self.counts[key] = timings[key]
+
+    @property
+    def total_ms(self):
+        return (time.monotonic() - self.started) * 1000
+
+
+def start_trace(endpoint):
+    trace = _local.trace = Trace(endpoint)
+    return trace
+
+
+def attach(trace):
+    """Reanuda en este punto una traza iniciada antes (p. ej. streaming)."""
+    _local.trace = trace
+    return trace
+
+
+def current_trace():
+    return getattr(_local, "trace", None)
+
+
+def end_trace():
+    trace = current_trace()
+    _local.trace = None
+    return trace
+
+
+@contextmanager
+def span(name):
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.monotonic() - started) * 1000)
+
+
+def add_since(name, started):
+    """Anota una fase que empezó en ``started`` (time.monotonic())."""
+    trace = current_trace()
+    if trace is not None:
+        trace.add(name, (time.monotonic() - started) * 1000)
+
+
+def annotate(**values):
+    """Datos del turno que no son tiempos (p. ej. la decisión del router)."""
+    trace = current_trace()
+    if trace is not None:
+        trace.meta.update(values)
+
+
+def add_timings(timings):
+    trace = current_trace()
+    if trace is not None:
+        trace.add_timings(timings)
@@ -7,6 +7,9 @@ import { deserializeDateTime, formatDateTime } from "@web/core/l10n/dates";
 import { user } from "@web/core/user";
 import { session } from "@web/session";
 
+// Respaldo del bus mientras hay un turno en cola (encolado por /ask_stream)
+const PENDING_POLL_MS = 3000;
+
 export class AiChat extends Component {
     static template = "ai_production_assistant.AiChat";
 
@@ -51,6 +54,7 @@ export class AiChat extends Component {
 
         onWillUnmount(() => {
             window.removeEventListener('ai-avatar-changed', this._onAvatarChanged.bind(this));
+            clearTimeout(this._pollTimer);
             this.state.isThinking = false;
         });
     }
@@ -143,7 +147,7 @@ export class AiChat extends Component {
             const serverMessages = await this.orm.searchRead(
                 "ai.assistant.message",
                 [['session_id', '=', this.state.sessionId]],
-                ['id', 'role', 'content', 'pending_action', 'create_date', 'expert_name'],
+                ['id', 'role', 'content', 'state', 'pending_action', 'create_date', 'expert_name'],
                 { order: 'create_date asc', limit: 100 }
             );
 
@@ -176,6 +180,8 @@ export class AiChat extends Component {
                     role: m.role,
                     text: cleanText,
                     pendingAction: m.pending_action ? this._safeParseJson(m.pending_action) : null,
+                    // Turno encolado en segundo plano: la respuesta llega por el bus
+                    pending: m.state === "pending" || m.state === "processing",
                     time: formatDateTime(deserializeDateTime(m.create_date), { format: "HH:mm" }),
                     expert: m.expert_name || "IA"
                 };
@@ -190,7 +196,7 @@ export class AiChat extends Component {
 
             const lastServerMsg = mappedMessages[mappedMessages.length - 1];
             if (lastServerMsg) {
-                if (lastServerMsg.role === "assistant") this.state.isThinking = false;
+                if (lastServerMsg.role === "assistant") this.state.isThinking = lastServerMsg.pending;
                 if (lastServerMsg.role === "user") this.state.isThinking = true;
             }
 
@@ -233,7 +239,7 @@ export class AiChat extends Component {
             // Apagar 'Thinking' si llegó respuesta assistant
             const lastMsg = mappedMessages[mappedMessages.length - 1];
             if (lastMsg && lastMsg.role === 'assistant' && this.state.isThinking) {
-                if (hasChanges) this.state.isThinking = false;
+                if (hasChanges && !lastMsg.pending) this.state.isThinking = false;
             }
 
         } catch (e) {
@@ -349,8 +355,15 @@ export class AiChat extends Component {
 
             if (!response.ok) throw new Error(`HTTP ${response.status}`);
 
-            const data = await response.json();
-            if (data.error) throw new Error(data.error);
+            const contentType = response.headers.get("Content-Type") || "";
+            if (contentType.includes("text/event-stream")) {
+                await this._consumeStream(response, tempId + 1);
+            } else {
+                // Rutas deterministas, caché o turno encolado (202, sin nodos
+                // disponibles): este último llega por el bus o el sondeo
+                const data = await response.json();
+                if (data.error) throw new Error(data.error);
+            }
 
             // Recargar mensajes desde BD para sincronizar IDs y respuestas
             // (El backend ya guardó todo)
@@ -366,8 +379,73 @@ export class AiChat extends Component {
                 text: `⚠️ Error de conexión: ${err.message}. (Pero el servidor podría estar procesando)`
             });
         } finally {
-            this.state.isThinking = false;
+            const lastMsg = this.state.messages[this.state.messages.length - 1];
+            this.state.isThinking = Boolean(lastMsg && lastMsg.pending);
+            this._schedulePendingPoll();
+        }
+    }
+
+    async _consumeStream(response, streamId) {
+        // Burbuja temporal que se rellena con los tokens según llegan
+        this.state.messages.push({
+            id: streamId,
+            role: "assistant",
+            text: "",
+            time: new Date().toLocaleTimeString().slice(0, 5),
+            expert: "IA",
+        });
+        const bubble = this.state.messages[this.state.messages.length - 1];
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = "";
+        let rawText = "";
+        let final = null;
+
+        try {
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split("\n\n");
+                buffer = events.pop();
+                for (const event of events) {
+                    if (!event.startsWith("data: ")) continue;
+                    const payload = this._safeParseJson(event.slice(6));
+                    if (!payload) continue;
+                    if (payload.token) {
+                        rawText += payload.token;
+                        // Las llamadas a herramientas llegan como JSON: no mostrarlo a medias
+                        const trimmed = rawText.trimStart();
+                        bubble.text = /^(\{|\[|```)/.test(trimmed) ? "Preparando consulta..." : rawText;
+                        this.scrollToBottom();
+                    } else if (payload.done) {
+                        final = payload;
+                    }
+                }
+            }
+        } finally {
+            // El mensaje definitivo ya está persistido: quitar la burbuja temporal
+            const idx = this.state.messages.findIndex(m => m.id === streamId);
+            if (idx !== -1) this.state.messages.splice(idx, 1);
         }
+
+        if (final) {
+            const t = final.timings || {};
+            console.log(
+                `[AI Chat] TTFT: ${final.ttft_ms} ms · Total: ${final.total_ms} ms · ` +
+                `Prompt eval: ${t.prompt_eval_count} tok / ${t.prompt_eval_ms} ms`
+            );
+            if (final.error) throw new Error(final.error);
+        }
+    }
+
+    _schedulePendingPoll() {
+        clearTimeout(this._pollTimer);
+        if (!this.state.isThinking) return;
+        this._pollTimer = setTimeout(async () => {
+            await this._loadMessages(true);
+            this._schedulePendingPoll();
+        }, PENDING_POLL_MS);
     }
 
     async confirmAction(msgIndex) {
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+# Tests de Odoo (odoo-bin --test-tags ai_production_assistant). Los tests
+# sin Odoo de services/ están en tests/unit y se ejecutan con pytest.
+from . import test_ai_queue
+from . import test_ai_watchdog
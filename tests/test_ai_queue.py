@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la cola de mensajes: reserva (_claim) y reintentos (_record_failure)
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+from ..models.ai_assistant import AIBackendError
+
+
+@tagged("post_install", "-at_install")
+class TestAIQueue(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Message = cls.env["ai.assistant.message"]
+        cls.session = cls.env["ai.assistant.session"].create({"name": "Cola"})
+        cls.env["ir.config_parameter"].sudo().set_param(
+            "ai_production_assistant.queue_max_attempts", 2
+        )
+
+    def _pending(self):
+        return self.Message.create(
+            {
+                "session_id": self.session.id,
+                "role": "assistant",
+                "state": "pending",
+                "raw_prompt": "¿Qué órdenes van con retraso?",
+            }
+        )
+
+    def _expire(self, message, minutes):
+        message.write({"claimed_at": fields.Datetime.now() - timedelta(minutes=minutes)})
+
+    def test_claim_takes_message_once(self):
+        message = self._pending()
+        self.assertEqual(message._claim(), message)
+        self.assertEqual(message.state, "processing")
+        self.assertEqual(message.attempt_count, 1)
+        # Ya reservado: otro worker no lo coge
+        self.assertFalse(message._claim())
+
+    def test_claim_ignores_other_messages(self):
+        message = self._pending()
+        done = self.Message.create(
+            {"session_id": self.session.id, "role": "assistant", "raw_prompt": "Hola"}
+        )
+        self.assertFalse(done._claim())
+        self.assertEqual(message.state, "pending")
+
+    def test_claim_takes_expired_lease(self):
+        message = self._pending()
+        message._claim()
+        self._expire(message, 60)
+        self.assertEqual(message._claim(), message)
+        self.assertEqual(message.attempt_count, 2)
+
+    def test_failure_returns_to_queue_with_backoff(self):
+        message = self._pending()
+        message._claim()
+        message._record_failure("timeout")
+        self.assertEqual(message.state, "pending")
+        self.assertEqual(message.last_error, "timeout")
+        # Dentro de la espera (queue_retry_backoff * intentos) no se reintenta
+        self.assertFalse(message._claim())
+        self._expire(message, 5)
+        self.assertEqual(message._claim(), message)
+
+    def test_failure_after_last_attempt_is_dead_letter(self):
+        message = self._pending()
+        message._claim()
+        message._record_failure("timeout")
+        self._expire(message, 5)
+        message._claim()
+        message._record_failure("conexión rechazada")
+        self.assertEqual(message.state, "error")
+        self.assertEqual(message.last_error, "conexión rechazada")
+        self.assertIn("conexión rechazada", message.content)
+        self._expire(message, 60)
+        self.assertFalse(message._claim())
+
+    def test_backend_error_is_retried(self):
+        message = self._pending()
+        message._claim()
+        with patch.object(
+            type(self.Message), "_run_agent", side_effect=AIBackendError("Ollama no responde")
+        ):
+            message.process_message()
+        self.assertEqual(message.state, "pending")
+        self.assertEqual(message.last_error, "Ollama no responde")
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de los watchdogs: evaluación (_evaluate) completa e incremental y
+disparo por eventos
+"""
+
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+from ..models import ai_watchdog
+
+
+@tagged("post_install", "-at_install")
+class TestAIWatchdogEvaluate(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Partner = cls.env["res.partner"]
+        cls.alert = [("ref", "=", "AI-WD-ALERT")]
+        cls.p1, cls.p2, cls.p3 = cls.Partner.create(
+            [
+                {"name": "Alerta 1", "ref": "AI-WD-ALERT"},
+                {"name": "Alerta 2", "ref": "AI-WD-ALERT"},
+                {"name": "Correcto", "ref": "AI-WD-OK"},
+            ]
+        )
+        cls.watchdog = cls.env["ai.watchdog"].create(
+            {
+                "name": "Contactos en alerta",
+                "model_id": cls.env["ir.model"]._get_id("res.partner"),
+                "check_type": "custom_domain",
+                "domain_filter": "[('ref', 'like', 'AI-WD-')]",
+            }
+        )
+
+    def _incremental(self, offenders, last_check):
+        self.watchdog.write(
+            {
+                "incremental": True,
+                "offending_ids": json.dumps(sorted(offenders)),
+                "last_check": last_check,
+            }
+        )
+
+    def test_full_without_incremental_only_counts(self):
+        offenders, count, scanned = self.watchdog._evaluate(self.Partner, self.alert, True)
+        self.assertIsNone(offenders)
+        self.assertEqual(count, 2)
+        self.assertEqual(scanned, 3)
+
+    def test_full_incremental_materializes_offenders(self):
+        self.watchdog.incremental = True
+        offenders, count, scanned = self.watchdog._evaluate(self.Partner, self.alert, True)
+        self.assertEqual(offenders, {self.p1.id, self.p2.id})
+        self.assertEqual(count, 2)
+        self.assertEqual(scanned, 3)
+
+    def test_incremental_only_checks_candidates(self):
+        # last_check posterior a los cambios: ningún registro se considera modificado
+        self._incremental([self.p1.id], fields.Datetime.now() + timedelta(hours=1))
+        offenders, count, scanned = self.watchdog._evaluate(self.Partner, self.alert, False)
+        # p2 también cumple el dominio, pero no estaba en alerta ni ha cambiado
+        self.assertEqual(offenders, {self.p1.id})
+        self.assertEqual((count, scanned), (1, 1))
+
+        offenders, count, scanned = self.watchdog._evaluate(
+            self.Partner, self.alert, False, extra_candidates=[self.p2.id]
+        )
+        self.assertEqual(offenders, {self.p1.id, self.p2.id})
+        self.assertEqual(scanned, 2)
+
+    def test_incremental_drops_resolved_and_adds_changed(self):
+        self._incremental([self.p1.id], fields.Datetime.now() - timedelta(hours=1))
+        self.p1.ref = "AI-WD-OK"
+        self.p3.ref = "AI-WD-ALERT"
+        offenders, count, scanned = self.watchdog._evaluate(self.Partner, self.alert, False)
+        # Todos los contactos del test se escribieron en esta transacción
+        self.assertEqual(offenders, {self.p2.id, self.p3.id})
+        self.assertEqual(count, 2)
+
+    def test_incremental_without_candidates(self):
+        self._incremental([], fields.Datetime.now() + timedelta(hours=1))
+        self.assertEqual(
+            self.watchdog._evaluate(self.Partner, self.alert, False), (set(), 0, 0)
+        )
+
+
+@tagged("post_install", "-at_install")
+class TestAIWatchdogEvents(TransactionCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Watchdog = cls.env["ai.watchdog"]
+        cls.watchdog = cls.Watchdog.create(
+            {
+                "name": "Contactos (eventos)",
+                "model_id": cls.env["ir.model"]._get_id("res.partner"),
+                "check_type": "custom_domain",
+                "event_trigger": True,
+                "event_debounce": 20,
+            }
+        )
+
+    def test_event_models_follow_configuration(self):
+        self.assertEqual(self.Watchdog._event_models().get("res.partner"), 20)
+        self.watchdog.event_debounce = 5
+        self.assertEqual(self.Watchdog._event_models().get("res.partner"), 5)
+        self.watchdog.event_trigger = False
+        self.assertNotIn("res.partner", self.Watchdog._event_models())
+
+    def test_changes_schedule_event_run(self):
+        with patch.object(type(self.Watchdog), "_schedule_event_run") as schedule:
+            partner = self.env["res.partner"].create({"name": "Nuevo"})
+            schedule.assert_called_with(20)
+            schedule.reset_mock()
+            partner.name = "Renombrado"
+            schedule.assert_called_with(20)
+            schedule.reset_mock()
+            # Modelos no vigilados no programan nada
+            self.env["res.partner.category"].create({"name": "Etiqueta"})
+            schedule.assert_not_called()
+
+    def test_event_trigger_requires_incremental(self):
+        with self.assertRaises(ValidationError):
+            self.watchdog.incremental = False
+
+    def test_schedule_waits_for_commit(self):
+        Trigger = self.env["ir.cron.trigger"]
+        cron = self.env.ref("ai_production_assistant.ir_cron_ai_watchdog_events")
+        before = Trigger.search_count([("cron_id", "=", cron.id)])
+        ai_watchdog._scheduled.pop(self.env.cr.dbname, None)
+        self.env.cr.postcommit.data.pop("ai_watchdog_event", None)
+        self.Watchdog._schedule_event_run(20)
+        self.Watchdog._schedule_event_run(20)
+        # Un solo disparo por transacción; la ventana se abre al confirmar
+        self.assertEqual(Trigger.search_count([("cron_id", "=", cron.id)]), before + 1)
+        self.assertNotIn(self.env.cr.dbname, ai_watchdog._scheduled)
+
+    def test_event_run_only_for_changed_models(self):
+        other = self.Watchdog.create(
+            {
+                "name": "Etiquetas (eventos)",
+                "model_id": self.env["ir.model"]._get_id("res.partner.category"),
+                "check_type": "custom_domain",
+                "event_trigger": True,
+            }
+        )
+        later = fields.Datetime.now() + timedelta(hours=1)
+        (self.watchdog | other).write({"last_check": later})
+        self.assertFalse(self.watchdog._has_changes())
+        self.watchdog.last_check = fields.Datetime.now()
+        self.env["res.partner"].create({"name": "Nuevo"})
+        self.assertTrue(self.watchdog._has_changes())
+
+        with patch.object(type(self.Watchdog), "_run_check") as run_check:
+            self.Watchdog._cron_run_event_watchdogs()
+        self.assertEqual(run_check.call_count, 1)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Comparación con la cascada anterior de parsers del controlador + escaneo
+de palabras clave de MoERouter: el clasificador de intención debe decidir
+lo mismo salvo en los cambios deliberados (DELIBERATE_CHANGES). También
+imprime la latencia por consulta de ambos, a título informativo.
+
+Uso: python tests/unit/bench_intent_router.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import intent_router
+from services.agent_core import parse_create_product_prompt, parse_inventory_prompt
+from services.rag_service import parse_docs_prompt, parse_mail_prompt
+from services.sales_purchase_tools import (
+    parse_purchase_orders_prompt,
+    parse_sale_orders_prompt,
+)
+
+
+def legacy_route(prompt):
+    """Algoritmo anterior de AiController.ask + MoERouter.route (referencia)."""
+    intent = None
+    if parse_inventory_prompt(prompt):
+        intent = "inventory"
+    elif any(
+        t in prompt.lower()
+        for t in ["orden", "órden", "ordenes", "órdenes", "fabricación", "fabricacion",
+                  "mrp", "producción", "produccion"]
+    ):
+        intent = "production"
+    elif parse_sale_orders_prompt(prompt):
+        intent = "sales"
+    elif parse_purchase_orders_prompt(prompt):
+        intent = "purchase"
+    elif parse_docs_prompt(prompt):
+        intent = "docs"
+    elif parse_mail_prompt(prompt):
+        intent = "mail"
+    elif parse_create_product_prompt(prompt):
+        intent = "create_product"
+
+    query_lower = prompt.lower()
+    if any(w in query_lower for w in ["fabricar", "producción", "orden", "mo",
+                                      "lista de materiales", "bom", "componentes"]):
+        expert = "manufacturing"
+    elif any(w in query_lower for w in ["stock", "inventario", "cantidad", "almacén",
+                                        "ubicación", "lote"]):
+        expert = "inventory"
+    elif any(w in query_lower for w in ["mejorar", "analizar", "eficiencia", "retraso",
+                                        "problema", "optimizar", "kaizen"]):
+        expert = "kaizen"
+    else:
+        expert = None
+    return intent, expert
+
+
+def new_route(prompt):
+    result = intent_router.route(prompt)
+    return result["intent"], result["expert"]
+
+
+# Consultas de ejemplo sin etiquetar: la referencia es lo que decide la
+# cascada anterior (legacy_route), no una etiqueta escrita a mano
+CORPUS = [
+    "¿Cuánto stock hay de tornillos M8?",
+    "existencias de la mesa de roble",
+    "haz inventario",
+    "cantidad de tablero en el almacén principal",
+    "órdenes de fabricación retrasadas",
+    "ver producción de hoy",
+    "estado del mrp",
+    "ventas este mes",
+    "ventas cliente Acme pendientes",
+    "cotizaciones enviadas",
+    "compras últimos 7 días",
+    "compras proveedor Global Supplies",
+    "buscar en documentación el procedimiento de calibración",
+    "dónde está el manual de la prensa",
+    "revisar el correo urgente",
+    "¿tengo emails sin leer en la bandeja?",
+    "crear barra de pan, venta 1.20€, coste 0.60€, alimento",
+    'crea producto: nombre "bollo", precio 2.5, costo 1',
+    "crea un producto con stock, precio 3 y coste 1",
+    "¿cómo puedo mejorar la eficiencia de la línea?",
+    "analizar el problema de calidad del lote 42",
+    "hay retrasos en la línea 2",
+    "piezas retrasadas en la línea 2",
+    "necesito fabricar 20 sillas",
+    "¿qué componentes lleva la lista de materiales de la silla?",
+    "hola, ¿qué modelo eres?",
+    "muéstrame los pedidos de ayer",
+    "cómo va todo",
+    "recrear el informe del mes",
+    "necesito las coordenadas del almacén",
+    "ordenador de la oficina roto",
+    "prepara un resumen de la semana",
+]
+
+# Diferencias buscadas con la cascada: consulta -> (ruta rápida, experto)
+DELIBERATE_CHANGES = {
+    # Plurales/acentos: 'órdenes' no contenía 'orden' ni 'producción'
+    "órdenes de fabricación retrasadas": ("production", "manufacturing"),
+    # Límites de palabra: 'mo' dentro de 'últimos', 'cómo', 'modelo'
+    "compras últimos 7 días": ("purchase", None),
+    "¿cómo puedo mejorar la eficiencia de la línea?": (None, "kaizen"),
+    "hola, ¿qué modelo eres?": (None, None),
+    "cómo va todo": (None, None),
+    # Límites de palabra: 'orden' dentro de 'coordenadas', 'ordenador'
+    "necesito las coordenadas del almacén": (None, "inventory"),
+    "ordenador de la oficina roto": (None, None),
+    # create_product antes que ventas/inventario (su parser exige precio y coste)
+    "crear barra de pan, venta 1.20€, coste 0.60€, alimento": ("create_product", None),
+    "crea un producto con stock, precio 3 y coste 1": ("create_product", "inventory"),
+}
+
+
+def compare():
+    """
+    Returns: (coincidencias con la cascada, cambios deliberados aplicados,
+    diferencias no documentadas [(consulta, cascada, nuevo)]).
+    """
+    same = deliberate = 0
+    unexpected = []
+    for prompt in CORPUS:
+        legacy, new = legacy_route(prompt), new_route(prompt)
+        if prompt in DELIBERATE_CHANGES:
+            if new == DELIBERATE_CHANGES[prompt]:
+                deliberate += 1
+            else:
+                unexpected.append((prompt, legacy, new))
+        elif new == legacy:
+            same += 1
+        else:
+            unexpected.append((prompt, legacy, new))
+    return same, deliberate, unexpected
+
+
+def main():
+    total = len(CORPUS)
+    same, deliberate, unexpected = compare()
+    print(f"Igual que la cascada: {same}/{total - len(DELIBERATE_CHANGES)}")
+    print(f"Cambios deliberados: {deliberate}/{len(DELIBERATE_CHANGES)}")
+    for prompt, legacy, new in unexpected:
+        print(f"    diferencia no documentada: {prompt!r} cascada={legacy} nuevo={new}")
+
+    # Solo informativo: ambas rutas cuestan del orden de 10 µs por consulta
+    runs = 200
+    for name, router in (("cascada", legacy_route), ("intención", new_route)):
+        seconds = timeit.timeit(lambda: [router(prompt) for prompt in CORPUS], number=runs)
+        print(f"{name:10} {seconds / (runs * total) * 1e6:8.1f} µs/consulta")
+
+
+if __name__ == "__main__":
+    main()
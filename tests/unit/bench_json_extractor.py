@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: escáner antiguo (reinicio en cada llave) frente al
+extractor de una sola pasada, con salidas patológicas del modelo.
+
+Uso: python tests/unit/bench_json_extractor.py
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.json_extractor import extract_json
+
+
+def legacy_find_json(text):
+    """Algoritmo anterior de AgentCore._parse_response (referencia)."""
+
+    def _try_parse(candidate):
+        try:
+            return json.loads(candidate)
+        except Exception:
+            return None
+
+    starts = [i for i, ch in enumerate(text) if ch in "{["]
+    for start in starts:
+        stack = []
+        in_string = False
+        escape = False
+        for i in range(start, len(text)):
+            ch = text[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+                continue
+            if ch == '"':
+                in_string = True
+                continue
+            if ch in "{[":
+                stack.append(ch)
+            elif ch in "}]":
+                if not stack:
+                    break
+                last = stack[-1]
+                if (last == "{" and ch == "}") or (last == "[" and ch == "]"):
+                    stack.pop()
+                    if not stack:
+                        parsed = _try_parse(text[start : i + 1])
+                        if parsed is not None:
+                            return parsed
+                        break
+                else:
+                    break
+    return None
+
+
+TOOL = '{"tool": "search_products", "params": {"name": "mesa"}}'
+
+CASES = {
+    "prosa con llaves sin cerrar (4 KB)": "Usa {campo o [lista " * 200 + TOOL,
+    "objetos inválidos repetidos (4 KB)": "{a: 1} [b, c] " * 280 + TOOL,
+    "anidamiento profundo sin cerrar": "[" * 3000 + TOOL,
+    "respuesta normal": "Claro, busco la mesa. " + TOOL,
+}
+
+
+def main():
+    print(f"{'caso':40} {'antiguo':>12} {'nuevo':>12} {'mejora':>8}")
+    for name, text in CASES.items():
+        assert legacy_find_json(text) == extract_json(text), name
+        runs = 5
+        old = timeit.timeit(lambda: legacy_find_json(text), number=runs) / runs
+        new = timeit.timeit(lambda: extract_json(text), number=runs) / runs
+        print(f"{name:40} {old * 1000:10.2f}ms {new * 1000:10.2f}ms {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ Test para verificar que las herramientas de búsqueda se ejecuten automáticamen
 import sys
 import os
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from services.agent_core import AgentCore, parse_create_product_prompt, parse_inventory_prompt
 from services.sales_purchase_tools import (
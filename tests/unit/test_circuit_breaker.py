@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests del interruptor de backends (services/circuit_breaker.py)
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import circuit_breaker
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _breaker():
+    breaker = CircuitBreaker("http://ollama.test:11434", "/api/tags")
+    # Sin hilo de sondeo: el test decide cuándo vuelve el backend
+    breaker._probing = True
+    return breaker
+
+
+def _open(breaker):
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def _wait_open_seconds(breaker):
+    breaker.opened_at -= circuit_breaker.OPEN_SECONDS
+
+
+def test_open_half_open_closed():
+    breaker = _breaker()
+    _open(breaker)
+    assert not breaker.allow_request()
+    assert not breaker.is_available()
+
+    _wait_open_seconds(breaker)
+    assert breaker.is_available()
+    # Una sola petición de prueba en half_open
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert breaker.allow_request()
+
+
+def test_failed_trial_reopens():
+    breaker = _breaker()
+    _open(breaker)
+    _wait_open_seconds(breaker)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count():
+    breaker = _breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
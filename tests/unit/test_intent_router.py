@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests del clasificador de intención (services/intent_router.py)
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import agent_core  # noqa: F401  (registra los parsers)
+from services.intent_router import classify, route
+
+from bench_intent_router import compare
+
+
+def test_fast_path_and_expert_in_one_pass():
+    result = route("órdenes de fabricación retrasadas")
+    assert result["intent"] == "production"
+    assert result["action"] == {"tool": "search_mrp_orders", "params": {"state": "delayed"}}
+    assert result["expert"] == "manufacturing"
+
+
+def test_word_boundaries():
+    assert classify("¿cómo va todo?") == set()
+    assert "production" not in classify("ordenador de la oficina")
+    assert "expert:manufacturing" in classify("crear una mo nueva")
+
+
+def test_create_product_before_sales():
+    result = route("crear barra de pan, venta 1.20€, coste 0.60€, alimento")
+    assert result["intent"] == "create_product"
+    assert result["action"]["params"]["price"] == 1.2
+
+
+def test_falls_through_when_parser_rejects():
+    # "crea" sin precio ni coste: el parser lo rechaza y pasa a inventario
+    result = route("crea un informe de stock de tornillos")
+    assert result["intent"] == "inventory"
+    assert result["expert_name"] == "Assistant"
+
+
+def test_expert_name_and_phrases():
+    assert route("ventas este mes")["expert_name"] == "SalesExpert"
+    assert route("componentes de la lista de materiales")["expert"] == "manufacturing"
+    assert route("hola")["action"] is None
+
+
+def test_same_decisions_as_baseline_cascade():
+    # Referencia: la cascada anterior, no etiquetas escritas con el cambio
+    _same, _deliberate, unexpected = compare()
+    assert not unexpected
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests del extractor incremental de JSON (services/json_extractor.py)
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.json_extractor import JsonExtractor, extract_json
+from services.response_parser import ResponseParser
+
+
+def test_extract_first_object():
+    text = 'Claro, aquí tienes: {"tool": "search_products", "params": {"name": "mesa"}} ¿algo más?'
+    assert extract_json(text) == {"tool": "search_products", "params": {"name": "mesa"}}
+
+
+def test_braces_inside_strings():
+    text = 'Respuesta: {"tool": "message", "params": {"content": "usa {llaves} y ] sueltos \\" aquí"}}'
+    assert extract_json(text)["params"]["content"] == 'usa {llaves} y ] sueltos " aquí'
+
+
+def test_invalid_outer_falls_back_to_inner():
+    text = '{ver nota: {"tool": "search_mrp_orders", "params": {"state": "delayed"}} }'
+    assert extract_json(text)["tool"] == "search_mrp_orders"
+
+
+def test_unclosed_prose_brace():
+    text = 'Formato {tool, params... y luego [1, 2, 3] fin'
+    assert extract_json(text) == [1, 2, 3]
+
+
+def test_fenced_block():
+    text = 'Texto\n```json\n{"tool": "search_docs", "params": {"query": "iso"}}\n```'
+    assert extract_json(text)["params"] == {"query": "iso"}
+
+
+def test_no_json():
+    assert extract_json("Hola, ¿en qué puedo ayudarte?") is None
+    assert extract_json("") is None
+
+
+def test_stream_split_tokens():
+    raw = 'Vale {"tool": "message", "params": {"content": "a\\\\b \\"c\\""}} resto'
+    extractor = JsonExtractor()
+    value = None
+    for i in range(0, len(raw), 3):
+        value = extractor.feed(raw[i : i + 3])
+        if extractor.found:
+            break
+    assert value == {"tool": "message", "params": {"content": 'a\\b "c"'}}
+    assert raw[extractor.span[0] : extractor.span[1]].startswith('{"tool"')
+
+
+def test_parse_actions_nested_brackets():
+    raw = 'Hecho.\n[[ACTION_DATA: {"tool": "create_bom", "params": {"components": [[1, 2]]}}]]\nFin'
+    clean, actions = ResponseParser().parse_actions(raw)
+    assert actions == [{"tool": "create_bom", "params": {"components": [[1, 2]]}}]
+    assert clean == "Hecho.\n\nFin"
+
+
+def test_parse_actions_invalid_block_is_removed():
+    clean, actions = ResponseParser().parse_actions("A [[ACTION_DATA: {roto]] B")
+    assert actions == []
+    assert clean == "A  B"
+
+
+if __name__ == "__main__":
+    for name, func in list(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print(f"✅ {name}")
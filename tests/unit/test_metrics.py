@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests de la agregación de métricas entre procesos (services/metrics.py)
+"""
+
+import sys
+import os
+import json
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import metrics
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ROOT", str(tmp_path))
+    monkeypatch.setattr(metrics, "METRICS_DIR", metrics.METRICS_DIR)
+    metrics.set_namespace("test", tmp_path)
+    for metric in (metrics.CACHE_LOOKUPS, metrics.REQUEST_DURATION):
+        monkeypatch.setattr(metric, "samples", {})
+    os.makedirs(metrics.METRICS_DIR, exist_ok=True)
+    monkeypatch.setattr(threading.current_thread(), "dbname", "db1", raising=False)
+
+
+def _dead_process(name, dbs):
+    # pid inexistente: su fichero debe acumularse y borrarse
+    path = os.path.join(metrics.METRICS_DIR, name)
+    with open(path, "w") as f:
+        json.dump({"time": 0, "dbs": dbs, "gauges": {}}, f)
+    return path
+
+
+def _hits(families):
+    return families["ai_assistant_cache_lookups_total"]["samples"].get(("response", "hit"), 0)
+
+
+def test_dead_workers_do_not_reset_counters(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    metrics.CACHE_LOOKUPS.inc(cache="response", result="hit")
+    dead = {"db1": {"ai_assistant_cache_lookups_total": [[["response", "hit"], 5]]}}
+    path = _dead_process("999999999-1.json", dead)
+
+    assert _hits(metrics.collect_all("db1")) == 6
+    assert not os.path.exists(path)
+    # El acumulado se mantiene en los siguientes scrapes
+    assert _hits(metrics.collect_all("db1")) == 6
+
+    _dead_process("999999998-1.json", dead)
+    metrics.CACHE_LOOKUPS.inc(cache="response", result="hit")
+    assert _hits(metrics.collect_all("db1")) == 12
+
+
+def test_databases_are_separated(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    metrics.CACHE_LOOKUPS.inc(cache="response", result="hit")
+    metrics.REQUEST_DURATION.observe(0.2, endpoint="ask", expert="-", outcome="llm")
+    monkeypatch.setattr(threading.current_thread(), "dbname", "db2")
+    metrics.CACHE_LOOKUPS.inc(3, cache="response", result="hit")
+
+    assert _hits(metrics.collect_all("db1")) == 1
+    assert _hits(metrics.collect_all("db2")) == 3
+    histogram = metrics.collect_all("db1")["ai_assistant_request_duration_seconds"]
+    assert histogram["samples"][("ask", "-", "llm")][-1] == 1
+    assert "ai_assistant_request_duration_seconds_count" in metrics.render(
+        metrics.collect_all("db1")
+    )
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests del enrutado semántico de expertos (services/semantic_router.py)
+"""
+
+import sys
+import os
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services import semantic_router
+from services.semantic_router import EXPERT_EXAMPLES, decide, get_centroids
+
+EXPERTS = list(EXPERT_EXAMPLES)
+
+
+class FakeOllama:
+    """Embeddings deterministas: un eje por experto según sus ejemplos."""
+
+    base_url = "http://fake:11434"
+    embedding_model = "fake-embed"
+
+    def __init__(self):
+        self.batches = 0
+        self.axis = {
+            text: i for i, expert in enumerate(EXPERTS) for text in EXPERT_EXAMPLES[expert]
+        }
+
+    def _vector(self, text):
+        vector = [0.05] * len(EXPERTS)
+        vector[self.axis.get(text, EXPERTS.index("generalist"))] = 1.0
+        return vector
+
+    def embed_many(self, texts):
+        self.batches += 1
+        return [self._vector(t) for t in texts]
+
+    def embed(self, text):
+        return self._vector(text)
+
+
+def test_centroids_built_once():
+    semantic_router._centroids.clear()
+    ollama = FakeOllama()
+    experts, matrix = get_centroids(ollama)
+    get_centroids(ollama)
+    assert ollama.batches == 1
+    assert experts == EXPERTS
+    assert np.allclose(np.linalg.norm(matrix, axis=1), 1.0)
+
+
+def test_decide_semantic_and_tie_break():
+    scores = np.array([0.80, 0.40, 0.30, 0.20], dtype=np.float32)
+    expert, method, score = decide(EXPERTS, scores, "kaizen", 0.03, 0.3)
+    assert (expert, method) == ("manufacturing", "semantic")
+    assert abs(score - 0.8) < 1e-6
+
+    tied = np.array([0.60, 0.59, 0.10, 0.10], dtype=np.float32)
+    expert, method, _score = decide(EXPERTS, tied, "inventory", 0.03, 0.3)
+    assert (expert, method) == ("inventory", "tie_break")
+
+
+def test_low_score_and_generalist():
+    low = np.array([0.10, 0.12, 0.05, 0.11], dtype=np.float32)
+    assert decide(EXPERTS, low, None, 0.03, 0.3)[:2] == (None, "keyword")
+
+    general = np.array([0.20, 0.10, 0.10, 0.90], dtype=np.float32)
+    assert decide(EXPERTS, general, "manufacturing", 0.03, 0.3)[:2] == (None, "semantic")
@@ -12,6 +12,8 @@ import requests
 from odoo import models, fields, api
 from odoo.exceptions import UserError
 
+from ..services.http_pool import get_session
+
 _logger = logging.getLogger(__name__)
 
 try:
@@ -23,6 +25,9 @@ except ImportError:
     )
 
 
+OLLAMA_LOCAL_URL = "http://localhost:11434"
+
+
 class InstallationWizard(models.TransientModel):
     _name = "ai.installation.wizard"
     _description = "Asistente de Instalación - Configuración Automática"
@@ -283,8 +288,8 @@ class InstallationWizard(models.TransientModel):
 
                 # Verificar si el servicio está ejecutándose
                 try:
-                    response = requests.get(
-                        "http://localhost:11434/api/tags", timeout=5
+                    response = get_session(OLLAMA_LOCAL_URL).get(
+                        f"{OLLAMA_LOCAL_URL}/api/tags", timeout=5
                     )
                     if response.status_code == 200:
                         result["ollama_status"] = "running"
@@ -310,7 +315,9 @@ class InstallationWizard(models.TransientModel):
         current_log = self.installation_log or ""  # Asegurarse de que sea una cadena
         try:
             # Aumentar tiempo de espera para hardware más lento (I5 2013)
-            response = requests.get("http://localhost:11434/api/tags", timeout=20)
+            response = get_session(OLLAMA_LOCAL_URL).get(
+                f"{OLLAMA_LOCAL_URL}/api/tags", timeout=20
+            )
             if response.status_code == 200:
                 models_data = response.json()
                 model_names = [